@@ -0,0 +1,146 @@
+"""
+色块提取方式的性能对比
+
+对同一批画面分别使用轮廓查找(findContours + contourArea)与连通域标记(connectedComponentsWithStats)
+提取每种颜色面积最大的色块，统计耗时并检查两种方式得到的色块是否一致
+
+用法:
+    python benchmark/blob_extraction.py [录制画面所在目录或视频文件] [--repeat N]
+    目录中可以是png/jpg图片或npy数组；不指定时使用带噪点的合成画面
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'modules'))
+
+from Config import color_ranges
+from modules.ColorClassifier import ColorClassifier, blob_extractors
+from modules.FrameSource import FrameSource, MemorySource, make_source
+
+
+class NoisyBlobSource(MemorySource):
+    """
+    带有大量彩色噪点的合成画面来源，模拟反光、杂乱的地面
+    """
+
+    def __init__(self, count: int = 30, seed: int = 0) -> None:
+        """
+        Args:
+            count(int): 画面数量
+            seed(int): 随机种子
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.count = count
+        self.seed = seed
+
+    def open(self) -> None:
+        rng = np.random.default_rng(self.seed)
+        colors = [(0, 0, 255), (255, 0, 0), (0, 255, 255)]
+        self.frames = []
+        for _ in range(self.count):
+            frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+            noise = rng.random((480, 640)) < 0.02
+            frame[noise] = np.array(colors, dtype=np.uint8)[rng.integers(0, 3, int(noise.sum()))]
+            for color in colors:
+                x, y = rng.integers(40, 560), rng.integers(40, 400)
+                cv2.circle(frame, (int(x), int(y)), int(rng.integers(20, 60)), color, -1)
+            self.frames.append(frame)
+        super().open()
+
+
+def read_frames(source: FrameSource, limit: int = None) -> list:
+    """
+    从画面来源中读取画面，回放来源读到末尾为止
+
+    Args:
+        source(FrameSource): 画面来源
+        limit(int): 最多读取的帧数，循环的画面来源需指定
+
+    Returns:
+        list: BGR画面列表
+    """
+    source.open()
+    frames = []
+    while limit is None or len(frames) < limit:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(frame)
+    source.release()
+    return frames
+
+
+def run(frames: list, repeat: int = 5, min_area: int = 800) -> None:
+    """
+    对比两种色块提取方式的耗时与结果
+
+    Args:
+        frames(list): BGR画面列表
+        repeat(int): 重复次数
+        min_area(int): 最小色块面积
+
+    Returns:
+        None
+    """
+    classifier = ColorClassifier(color_ranges)
+    masks = []
+    for frame in frames:
+        labels = classifier.classify_bgr(frame)
+        masks.append([classifier.mask(labels, color_name) for color_name in color_ranges])
+
+    contour_counts = [len(cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0])
+                      for frame_masks in masks for mask in frame_masks]
+    print(f'画面数: {len(frames)}，平均每种颜色的轮廓数: {np.mean(contour_counts):.1f}')
+
+    results = {}
+    for mode, extract_blob in blob_extractors.items():
+        timings = []
+        for _ in range(repeat):
+            for frame_masks in masks:
+                start = time.perf_counter()
+                for mask in frame_masks:
+                    extract_blob(mask, min_area)
+                timings.append(time.perf_counter() - start)
+        results[mode] = [[extract_blob(mask, min_area) for mask in frame_masks] for frame_masks in masks]
+        timings = np.array(timings) * 1000
+        print(f'{mode:>10}: 平均 {timings.mean():.3f} ms/帧  p50 {np.percentile(timings, 50):.3f} ms  '
+              f'p95 {np.percentile(timings, 95):.3f} ms')
+
+    # 以外接矩形中心判断两种方式选出的是否为同一色块
+    same, total = 0, 0
+    for frame_contours, frame_components in zip(results['contours'], results['components']):
+        for blob_a, blob_b in zip(frame_contours, frame_components):
+            total += 1
+            if blob_a is None or blob_b is None:
+                same += blob_a is None and blob_b is None
+                continue
+            center_a = (blob_a[1] + blob_a[3] // 2, blob_a[2] + blob_a[4] // 2)
+            center_b = (blob_b[1] + blob_b[3] // 2, blob_b[2] + blob_b[4] // 2)
+            same += center_a == center_b
+    print(f'色块一致率: {same}/{total}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='色块提取方式性能对比')
+    parser.add_argument('source', nargs='?', default=None, help='录制画面所在目录或视频文件，不指定时使用合成画面')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    parser.add_argument('--min-area', type=int, default=800, help='最小色块面积')
+    args = parser.parse_args()
+
+    if args.source:
+        frames = read_frames(make_source(args.source))
+    else:
+        source = NoisyBlobSource()
+        frames = read_frames(source, source.count)
+    run(frames, repeat=args.repeat, min_area=args.min_area)
@@ -0,0 +1,220 @@
+"""
+识别方法的耗时基准测试
+
+将录制的画面或合成画面逐帧送入Camera的各个识别方法，统计每次调用的p50/p95/p99耗时、每秒处理的帧数，
+并用tracemalloc统计每次调用的内存分配情况。结果可以保存为JSON，方便在不同提交之间对比
+
+用法:
+    python benchmark/detectors.py                                  # 使用合成画面
+    python benchmark/detectors.py frames/ --json after.json        # 使用录制的画面目录或视频文件
+    python benchmark/detectors.py --json after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'modules'))
+
+from Config import my_logger
+from modules.Detection import Camera
+from modules.FrameSource import FrameSource, MemorySource, make_source
+
+# 参与测试的识别方法
+DETECTORS = [
+    'detect_colors_bigmeter',
+    'detect_colors_platform',
+    'recognite_qr_info',
+    'detect_circles',
+    'detect_circles_platform_low',
+    'recognize_lines_to_correct_location',
+    'measure_lines',
+]
+
+
+class SyntheticSource(MemorySource):
+    """
+    合成画面来源，画面中包含红色色块、同心圆环与白色胶带线，使各识别方法都能走完整的处理流程
+    """
+
+    def __init__(self, count: int = 8, seed: int = 0) -> None:
+        """
+        Args:
+            count(int): 循环使用的不同画面数量
+            seed(int): 随机种子
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.count = count
+        self.seed = seed
+
+    def open(self) -> None:
+        rng = np.random.default_rng(self.seed)
+        self.frames = []
+        for _ in range(self.count):
+            frame = np.full((480, 640, 3), 120, dtype=np.uint8)
+            frame = cv2.add(frame, rng.integers(0, 20, frame.shape, dtype=np.uint8))
+            center = (450 + int(rng.integers(-5, 6)), 240 + int(rng.integers(-5, 6)))
+            for radius in range(110, 150, 6):
+                cv2.circle(frame, center, radius, (20, 20, 20), 3, cv2.LINE_AA)
+            cv2.line(frame, (340, 0), (380, 479), (255, 255, 255), 14, cv2.LINE_AA)
+            cv2.rectangle(frame, (200, 330), (300, 420), (0, 0, 220), -1)
+            self.frames.append(frame)
+        super().open()
+
+
+def benchmark_detector(camera: Camera, name: str, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    """
+    测试单个识别方法
+
+    Args:
+        camera(Camera): 已打开的摄像头
+        name(str): 识别方法名
+        iterations(int): 计时的调用次数
+        warmup(int): 预热调用次数
+        alloc_iterations(int): 统计内存分配的调用次数，与计时分开进行，避免tracemalloc影响计时
+
+    Returns:
+        dict: 统计结果
+    """
+    detector = getattr(camera, name)
+    for _ in range(warmup):
+        detector()
+
+    timings = []
+    first_seq = camera.frame_seq
+    total_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        detector()
+        timings.append(time.perf_counter() - start)
+    total_time = time.perf_counter() - total_start
+    frames = camera.frame_seq - first_seq
+
+    # tracemalloc只能统计调用结束时仍存活的内存块数与调用过程中的内存峰值
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    for _ in range(alloc_iterations):
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        detector()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        peaks.append(peak - base)
+        blocks.append(sum(stat.count_diff for stat in after.compare_to(before, 'filename')))
+    tracemalloc.stop()
+
+    timings = np.array(timings) * 1000
+    return {
+        'iterations': iterations,
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'max_ms': float(timings.max()),
+        'calls_per_s': iterations / total_time,
+        'frames_per_call': frames / iterations,
+        'frames_per_s': frames / total_time,
+        'alloc_peak_kib': float(np.mean(peaks) / 1024) if peaks else None,
+        'alloc_net_blocks': float(np.mean(blocks)) if blocks else None,
+    }
+
+
+def run(source: FrameSource, detectors: list, iterations: int = 50, warmup: int = 3,
+        alloc_iterations: int = 5) -> dict:
+    """
+    依次测试各识别方法
+
+    Args:
+        source(FrameSource): 画面来源，应使用尽快读取的回放来源
+        detectors(list): 识别方法名列表
+        iterations(int): 每个方法计时的调用次数
+        warmup(int): 每个方法的预热调用次数
+        alloc_iterations(int): 每个方法统计内存分配的调用次数
+
+    Returns:
+        dict: 包含运行环境与各方法统计结果的字典
+    """
+    camera = Camera(source=source)
+    camera.open()
+    camera.debug = False
+
+    results = {}
+    for name in detectors:
+        my_logger.info(f'正在测试{name}')
+        results[name] = benchmark_detector(camera, name, iterations, warmup, alloc_iterations)
+    camera.release()
+
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'source': type(source).__name__,
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'detectors': results,
+    }
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    """
+    打印测试结果，给出基准结果时同时打印p50耗时的变化
+
+    Args:
+        report(dict): run返回的结果
+        baseline(dict): 之前保存的结果
+
+    Returns:
+        None
+    """
+    header = f'{"detector":<38}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"fps":>9}{"peak KiB":>10}{"blocks":>8}'
+    if baseline is not None:
+        header += f'{"Δp50":>9}'
+    print(header)
+    for name, stats in report['detectors'].items():
+        line = (f'{name:<38}{stats["p50_ms"]:>9.2f}{stats["p95_ms"]:>9.2f}{stats["p99_ms"]:>9.2f}'
+                f'{stats["frames_per_s"]:>9.1f}{stats["alloc_peak_kib"]:>10.0f}{stats["alloc_net_blocks"]:>8.1f}')
+        if baseline is not None:
+            old = baseline['detectors'].get(name)
+            line += f'{(stats["p50_ms"] / old["p50_ms"] - 1) * 100:>+8.1f}%' if old else f'{"-":>9}'
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='识别方法耗时基准测试')
+    parser.add_argument('source', nargs='?', default=None, help='录制的画面目录或视频文件，不指定时使用合成画面')
+    parser.add_argument('--detectors', nargs='+', default=DETECTORS, choices=DETECTORS, help='参与测试的识别方法')
+    parser.add_argument('--iterations', type=int, default=50, help='每个方法计时的调用次数')
+    parser.add_argument('--warmup', type=int, default=3, help='每个方法的预热调用次数')
+    parser.add_argument('--alloc-iterations', type=int, default=5, help='每个方法统计内存分配的调用次数')
+    parser.add_argument('--json', default=None, help='保存结果的JSON文件')
+    parser.add_argument('--compare', default=None, help='用于对比的历史结果JSON文件')
+    args = parser.parse_args()
+
+    source = make_source(args.source, pace='fast', loop=True) if args.source else SyntheticSource()
+    report = run(source, args.detectors, args.iterations, args.warmup, args.alloc_iterations)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,180 @@
+"""
+单帧指令编码的上位机耗时对比
+
+不连接下位机，只统计从调用到写入串口(空串口)为止的上位机耗时:
+- legacy: 原__send_serial_msg的实现，每次构建MoveMode列表做成员判断，经if/elif链构建列表帧并转换为bytes，
+  用f-string格式化日志
+- struct: frozenset判断模式、struct打包进复用的bytearray、日志只在需要输出时格式化(Protocol.py)
+分别在日志级别为INFO(调试日志被丢弃)与DEBUG(调试日志被格式化，输出到空sink)时测试，并检查两种实现编码出的帧是否一致
+
+用法:
+    python benchmark/encoder.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'modules'))
+
+from Config import my_logger, MoveMode
+from modules.Protocol import COMMAND_LOGS, FrameEncoder, FrameText, command_value
+
+# 一组典型的单帧指令: (模式, 距离, 角度)
+COMMANDS = [
+    (MoveMode.Forward, 0.3, None),
+    (MoveMode.Leftward, 0.15, None),
+    (MoveMode.Turnleft, None, 90),
+    (MoveMode.Bigarm, None, 110),
+    (MoveMode.Forearm, None, 25),
+    (MoveMode.Frontpaws, None, 0),
+    (MoveMode.Cirque, None, 80),
+    (MoveMode.Calibration, None, None),
+]
+
+
+class NullSerial:
+    """
+    只记录最后一次写入内容的空串口
+    """
+
+    def __init__(self) -> None:
+        self.last = b''
+
+    def write(self, data: bytes) -> int:
+        self.last = data
+        return len(data)
+
+
+def legacy_send(port: NullSerial, mode: MoveMode, distance: float = None, rotation_angle: int = None) -> None:
+    """
+    原__send_serial_msg中从检查参数到写入串口的部分
+    """
+    buffer = []
+    log_msg = f''
+
+    if mode in [MoveMode.Forward, MoveMode.Backward, MoveMode.Leftward, MoveMode.Rightward, MoveMode.Topleft,
+                MoveMode.Topright, MoveMode.Lowerleft, MoveMode.Lowerright]:
+        if distance is None:
+            raise ValueError
+        if -32.768 <= distance <= 32.767:
+            pass
+        else:
+            my_logger.warning(f"距离设置范围过大，目前支持[-32.768, 32.767] m。截取距离的低十六位")
+
+    elif mode in [MoveMode.Turnleft, MoveMode.Turnright]:
+        if rotation_angle is None:
+            raise ValueError
+        rotation_angle = abs(rotation_angle)
+
+    elif mode in [MoveMode.Calibration, MoveMode.Servo, MoveMode.Highest, MoveMode.Advance]:
+        pass
+
+    elif mode in [MoveMode.Bigarm, MoveMode.Forearm, MoveMode.Frontpaws, MoveMode.Hindpaws, MoveMode.Frontdoor,
+                  MoveMode.Backdoor, MoveMode.Cirque]:
+        if rotation_angle is None:
+            raise ValueError
+        rotation_angle = abs(rotation_angle)
+        if rotation_angle > 180:
+            rotation_angle %= 180
+            my_logger.warning(f"舵机模式下，输入的角度不在[-180，180]之间，将取值为{rotation_angle}")
+
+    if mode in [MoveMode.Forward, MoveMode.Backward, MoveMode.Leftward, MoveMode.Rightward, MoveMode.Topleft,
+                MoveMode.Topright, MoveMode.Lowerleft, MoveMode.Lowerright]:
+        dis_mm = int(distance * 1000)
+        buffer = [0xFF, mode.value, dis_mm // 256, dis_mm % 256, 0xFE]
+        log_msg = f'动作模式为{mode.name}，使用米作为单位，原始移动距离为{distance}m。'
+
+    elif mode in [MoveMode.Turnleft, MoveMode.Turnright]:
+        rotation_angle_ = abs(int(rotation_angle))
+        buffer = [0xFF, mode.value, rotation_angle // 256, rotation_angle % 256, 0xFE]
+        log_msg = f'动作模式为旋转，使用度作为单位，原始输入为{rotation_angle_}度'
+
+    elif mode == MoveMode.Calibration:
+        buffer = [0xFF, mode.value, 30, 2, 0xFE]
+        log_msg = f'动作模式为校准'
+
+    elif mode in [MoveMode.Bigarm, MoveMode.Forearm, MoveMode.Frontpaws, MoveMode.Hindpaws, MoveMode.Frontdoor,
+                  MoveMode.Backdoor, MoveMode.Cirque]:
+        rotation_angle_ = abs(int(rotation_angle))
+        buffer = [0xFF, mode.value, 0, rotation_angle_, 0xFE]
+        log_msg = f'{mode.name}参数为{rotation_angle_}'
+
+    if mode not in [MoveMode.Servo, MoveMode.Highest, MoveMode.Advance]:
+        send_num = port.write(bytes(buffer))
+        my_logger.debug(f"向下位机发送了{send_num}个字节的数据，数据内容为{buffer}。" + log_msg)
+
+
+def struct_send(port: NullSerial, encoder: FrameEncoder, mode: MoveMode, distance: float = None,
+                rotation_angle: int = None) -> None:
+    """
+    MoveControl中从检查参数到写入串口的部分
+    """
+    value = command_value(mode, distance, rotation_angle)
+    frame = encoder.encode(mode, value)
+    send_num = port.write(frame)
+    my_logger.debug(COMMAND_LOGS[mode], send_num, FrameText(frame), mode.name, distance, value)
+
+
+def check_frames() -> None:
+    """
+    检查两种实现编码出的帧是否一致
+
+    Returns:
+        None
+    """
+    legacy_port, struct_port = NullSerial(), NullSerial()
+    encoder = FrameEncoder()
+    for mode, distance, angle in COMMANDS:
+        legacy_send(legacy_port, mode, distance, angle)
+        struct_send(struct_port, encoder, mode, distance, angle)
+        assert legacy_port.last == bytes(struct_port.last), (mode, list(legacy_port.last), list(struct_port.last))
+
+
+def run(repeat: int = 20000) -> None:
+    """
+    分别在INFO与DEBUG日志级别下测试两种实现的每条指令耗时
+
+    Args:
+        repeat(int): 每种实现发送整组指令的次数
+
+    Returns:
+        None
+    """
+    check_frames()
+
+    port = NullSerial()
+    encoder = FrameEncoder()
+    methods = {
+        'legacy': lambda mode, distance, angle: legacy_send(port, mode, distance, angle),
+        'struct': lambda mode, distance, angle: struct_send(port, encoder, mode, distance, angle),
+    }
+
+    print(f'{"log level":<10}{"legacy us":>12}{"struct us":>12}{"speedup":>10}')
+    for level in ('INFO', 'DEBUG'):
+        # 替换为空sink，只统计格式化日志的耗时，不统计写文件的耗时
+        my_logger.remove()
+        my_logger.add(lambda message: None, level=level)
+
+        timings = {}
+        for name, method in methods.items():
+            for mode, distance, angle in COMMANDS:
+                method(mode, distance, angle)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for mode, distance, angle in COMMANDS:
+                    method(mode, distance, angle)
+            timings[name] = (time.perf_counter() - start) / (repeat * len(COMMANDS)) * 1e6
+        print(f'{level:<10}{timings["legacy"]:>12.2f}{timings["struct"]:>12.2f}'
+              f'{timings["legacy"] / timings["struct"]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='单帧指令编码耗时对比')
+    parser.add_argument('--repeat', type=int, default=20000, help='发送整组指令的次数')
+    args = parser.parse_args()
+
+    run(repeat=args.repeat)
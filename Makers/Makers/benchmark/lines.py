@@ -0,0 +1,240 @@
+"""
+巡线直线检测方式的性能与精度对比
+
+生成已知角度与位置的胶带线合成画面(部分画面带有横向胶带与噪点)，分别测试:
+- legacy: 逐条直线在Python中计算端点与角度的原实现
+- standard: 数组运算的标准Hough变换
+- probabilistic: 数组运算的概率Hough变换
+统计直线检测与拟合的耗时(边缘图预先计算)与角度误差，以及recognize_lines_to_correct_location端到端的耗时与角度、位置误差；
+另外用随机生成的N条直线单独对比端点计算与角度滤除部分，并检查两种实现得到的端点是否一致
+
+用法:
+    python benchmark/lines.py [--count N] [--repeat N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'modules'))
+
+from Config import line_params
+from modules.Detection import Camera
+from modules.FrameSource import MemorySource
+
+# 与recognize_lines_to_correct_location一致的裁剪范围
+CROP_X = (250, 450)
+
+
+class LineSource(MemorySource):
+    """
+    胶带线合成画面来源，同时记录每帧直线的真实角度与底边x坐标(裁剪后的坐标)
+    """
+
+    def __init__(self, count: int = 40, seed: int = 0) -> None:
+        """
+        Args:
+            count(int): 循环使用的不同画面数量
+            seed(int): 随机种子
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.count = count
+        self.seed = seed
+        self.truth = []
+
+    def open(self) -> None:
+        rng = np.random.default_rng(self.seed)
+        self.frames = []
+        self.truth = []
+        for index in range(self.count):
+            frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+            frame = cv2.add(frame, rng.integers(0, 30, frame.shape, dtype=np.uint8))
+            top_x = int(rng.integers(300, 400))
+            bottom_x = int(rng.integers(300, 400))
+            cv2.line(frame, (top_x, 0), (bottom_x, 479), (255, 255, 255), 14, cv2.LINE_AA)
+            if index % 2:
+                # 横向胶带，应被角度阈值滤除
+                y = int(rng.integers(100, 380))
+                cv2.line(frame, (0, y), (639, y + int(rng.integers(-3, 4))), (255, 255, 255), 14, cv2.LINE_AA)
+            self.frames.append(frame)
+            self.truth.append((math.degrees(math.atan((bottom_x - top_x) / 479)), bottom_x - CROP_X[0]))
+        super().open()
+
+
+def edge_image(frame: np.ndarray) -> np.ndarray:
+    """
+    与recognize_lines_to_correct_location相同的预处理，得到裁剪后画面的边缘图
+    """
+    frame = frame[:, CROP_X[0]:CROP_X[1]]
+    _, binary_image = cv2.threshold(frame, 210, 255, cv2.THRESH_BINARY)
+    kernel = np.ones((5, 5), np.uint8)
+    dilated_image = cv2.dilate(cv2.erode(binary_image, kernel, iterations=2), kernel, iterations=2)
+    return cv2.Canny(dilated_image, 50, 150, apertureSize=3)
+
+
+def legacy_line_points(edges: np.ndarray) -> np.ndarray or None:
+    """
+    原实现: 逐条直线在Python中计算端点与角度
+    """
+    return legacy_filter(cv2.HoughLines(edges, 1, np.pi / 180, line_params['threshold']))
+
+
+def legacy_filter(lines: np.ndarray or None) -> np.ndarray or None:
+    threshold = line_params['horizontal_angle_threshold']
+    all_points = []
+    if lines is not None:
+        for line in lines:
+            rho, theta = line[0]
+            a = np.cos(theta)
+            b = np.sin(theta)
+            x0 = a * rho
+            y0 = b * rho
+            x1 = int(x0 + 1000 * (-b))
+            y1 = int(y0 + 1000 * (a))
+            x2 = int(x0 - 1000 * (-b))
+            y2 = int(y0 - 1000 * (a))
+            dx = x2 - x1
+            dy = y2 - y1
+            angle = math.degrees(math.atan(dy / dx)) if dx != 0 else 90.0
+            if threshold < abs(angle) < (180 - threshold):
+                all_points.append((x1, y1))
+                all_points.append((x2, y2))
+    if len(all_points) > 1:
+        return np.array(all_points, dtype=np.int32)
+    return None
+
+
+def fit_angle(points: np.ndarray or None) -> float or None:
+    if points is None:
+        return None
+    vx, vy, _, _ = cv2.fitLine(points, cv2.DIST_L2, 0, 0.01, 0.01).ravel()
+    return math.degrees(math.atan(vx / vy)) if vy != 0 else 90.0
+
+
+def run(count: int = 40, repeat: int = 5) -> None:
+    """
+    对比各直线检测方式的耗时与精度
+
+    Args:
+        count(int): 合成画面数量
+        repeat(int): 重复次数
+
+    Returns:
+        None
+    """
+    source = LineSource(count)
+    camera = Camera(source=source)
+    camera.open()
+    camera.debug = False
+    edges = [edge_image(frame) for frame in source.frames]
+    line_counts = [0 if lines is None else len(lines)
+                   for lines in (cv2.HoughLines(e, 1, np.pi / 180, line_params['threshold']) for e in edges)]
+    print(f'画面数: {count}，标准Hough变换平均每帧直线数: {np.mean(line_counts):.1f}')
+
+    def vectorised(mode):
+        def extract(edge):
+            camera.line_mode = mode
+            return camera._line_points(edge)
+        return extract
+
+    methods = {
+        'legacy': legacy_line_points,
+        'standard': vectorised('standard'),
+        'probabilistic': vectorised('probabilistic'),
+    }
+
+    print(f'{"method":<15}{"fit p50 ms":>12}{"fit p95 ms":>12}{"fit err":>9}{"fit miss":>10}'
+          f'{"call p50 ms":>13}{"angle err":>11}{"x err":>8}{"miss":>6}')
+    for name, extract in methods.items():
+        timings = []
+        for _ in range(repeat):
+            for edge in edges:
+                start = time.perf_counter()
+                fit_angle(extract(edge))
+                timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1000
+
+        angles = [fit_angle(extract(edge)) for edge in edges]
+        angle_errors = [abs(angle - truth[0]) for angle, truth in zip(angles, source.truth) if angle is not None]
+        fit_err = f'{np.mean(angle_errors):.2f}°' if angle_errors else '-'
+        fit_miss = count - len(angle_errors)
+
+        # 端到端测试，legacy只测试直线检测部分
+        call_p50, angle_err, x_err, misses = '-', '-', '-', 0
+        if name != 'legacy':
+            camera.line_mode = name
+            call_timings, angle_errors, x_errors = [], [], []
+            for _ in range(count):
+                start = time.perf_counter()
+                bottom_x, angle = camera.recognize_lines_to_correct_location(max_attempts=1)
+                call_timings.append(time.perf_counter() - start)
+                true_angle, true_x = source.truth[(camera.frame_seq - 1) % count]
+                if angle is None:
+                    misses += 1
+                    continue
+                angle_errors.append(abs(angle - true_angle))
+                x_errors.append(abs(bottom_x - true_x))
+            call_p50 = f'{np.percentile(call_timings, 50) * 1000:.3f}'
+            angle_err = f'{np.mean(angle_errors):.2f}°' if angle_errors else '-'
+            x_err = f'{np.mean(x_errors):.1f}' if x_errors else '-'
+        print(f'{name:<15}{np.percentile(timings, 50):>12.3f}{np.percentile(timings, 95):>12.3f}'
+              f'{fit_err:>9}{fit_miss:>10}{call_p50:>13}{angle_err:>11}{x_err:>8}{misses:>6}')
+
+    camera.release()
+
+
+def run_filter(counts: tuple = (2, 20, 50, 100), repeat: int = 200, seed: int = 0) -> None:
+    """
+    只对比直线端点计算与角度滤除部分，输入为随机生成的N条(rho, theta)直线，模拟地面胶带较多时的情况
+
+    Args:
+        counts(tuple): 直线数量
+        repeat(int): 重复次数
+        seed(int): 随机种子
+
+    Returns:
+        None
+    """
+    rng = np.random.default_rng(seed)
+    threshold = line_params['horizontal_angle_threshold']
+    print(f'{"lines":>6}{"legacy ms":>12}{"vectorised ms":>16}{"speedup":>10}')
+    for count in counts:
+        lines = np.empty((count, 1, 2), dtype=np.float32)
+        lines[:, 0, 0] = rng.uniform(-200, 200, count)
+        lines[:, 0, 1] = rng.uniform(0, np.pi, count)
+
+        # 两种实现得到的端点应完全一致
+        legacy_points = legacy_filter(lines)
+        points = Camera._non_horizontal_points(Camera._hough_segments(lines), threshold)
+        assert (legacy_points is None and points is None) or np.array_equal(legacy_points, points)
+
+        timings = {}
+        for name, method in (('legacy', legacy_filter),
+                             ('vectorised', lambda l: Camera._non_horizontal_points(Camera._hough_segments(l), threshold))):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                method(lines)
+            timings[name] = (time.perf_counter() - start) / repeat * 1000
+        print(f'{count:>6}{timings["legacy"]:>12.3f}{timings["vectorised"]:>16.3f}'
+              f'{timings["legacy"] / timings["vectorised"]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='巡线直线检测方式对比')
+    parser.add_argument('--count', type=int, default=40, help='合成画面数量')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    args = parser.parse_args()
+
+    run(count=args.count, repeat=args.repeat)
+    print()
+    run_filter()
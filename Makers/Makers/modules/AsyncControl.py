@@ -0,0 +1,226 @@
+"""
+提供MoveControl与Camera的asyncio接口的模块
+
+主要功能包括:
+- AsyncMoveControl: 每条运动、舵机指令立即按调用顺序开始发送，返回可await的Future
+- AsyncCamera: 各识别方法在后台线程中执行，返回可await的Future
+
+运动与识别分别在各自的单线程执行器中执行，因此同一设备的调用保持调用顺序，不同设备之间可以同时进行，例如:
+
+    async def grab(motion: AsyncMoveControl, vision: AsyncCamera):
+        # 小车移动的同时识别二维码
+        _, qr_code = await asyncio.gather(motion.move_X(0.3), asyncio.wait_for(vision.recognite_qr_info(), 3))
+
+asyncio.wait_for超时只会取消等待，已经开始的指令或识别会在后台线程中继续执行完，之后的调用排在其后
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from Config import MoveMode, GrabMode
+from modules.Detection import Camera
+from modules.MoveControl import MoveControl
+
+
+class AsyncMoveControl:
+    """
+    MoveControl的asyncio接口
+
+    每个方法在调用时(而不是在await时)就把指令交给运动线程，因此不await也会按调用顺序执行；
+    带序号协议下submit在指令写入串口后即可继续发送下一条，收到动作完成反馈时返回的Future完成
+
+    方法:
+        submit: 发送单帧指令，收到动作完成反馈时完成
+        flush: 等待所有已发送的指令执行完毕
+        wait_for_start_cmd: 等待下位机发送启动指令
+        move_X、move_Y、move_Topleft_Lowerright、move_Topright_Lowerleft、rotate、calibration: 运动指令
+        servo、bigarm、forearm、frontpaws、hindpaws、frontdoor、backdoor、cirque、pose、run_sequence、highest、advance:
+            舵机指令
+        close: 停止运动线程，关闭串口
+    """
+
+    def __init__(self, control: MoveControl) -> None:
+        """
+        Args:
+            control(MoveControl): 已初始化的MoveControl
+
+        Returns:
+            None
+        """
+        self.control = control
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='AsyncMoveControl')
+
+    def _run(self, method, *args, **kwargs) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    def submit(self, mode: MoveMode, distance: float = None, rotation_angle: int = None) -> asyncio.Future:
+        """
+        发送单帧指令，参数同MoveControl.submit
+
+        Returns:
+            asyncio.Future: 收到动作完成反馈时完成，结果为反馈的接收时间戳
+        """
+        sent = self._run(self.control.submit, mode, distance=distance, rotation_angle=rotation_angle)
+        return asyncio.ensure_future(self._acknowledged(sent))
+
+    async def _acknowledged(self, sent: asyncio.Future) -> float:
+        # 按指令的期限等待反馈，超时时重发或报错，见MoveControl.wait_ack
+        future = await sent
+        return await asyncio.get_running_loop().run_in_executor(None, self.control.wait_ack, future)
+
+    def flush(self, timeout: float = None) -> asyncio.Future:
+        """
+        等待此前提交的所有指令执行完毕
+
+        Args:
+            timeout(float): 每条指令的最长等待时间，单位为秒，None表示按各指令的期限等待
+
+        Returns:
+            asyncio.Future: 所有指令执行完毕时完成
+        """
+        return self._run(self.control.flush, timeout)
+
+    def wait_for_start_cmd(self, timeout: float = None) -> asyncio.Future:
+        """
+        等待下位机的开启指令，不占用运动线程
+
+        Args:
+            timeout(float): 最长等待时间，单位为秒，None表示一直等待，超时抛出TimeoutError
+
+        Returns:
+            asyncio.Future: 收到开启指令时完成
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(None, self.control.wait_for_start_cmd, timeout)
+
+    def move_X(self, distance: float) -> asyncio.Future:
+        return self._run(self.control.move_X, distance)
+
+    def move_Y(self, distance: float) -> asyncio.Future:
+        return self._run(self.control.move_Y, distance)
+
+    def move_Topleft_Lowerright(self, distance: float) -> asyncio.Future:
+        return self._run(self.control.move_Topleft_Lowerright, distance)
+
+    def move_Topright_Lowerleft(self, distance: float) -> asyncio.Future:
+        return self._run(self.control.move_Topright_Lowerleft, distance)
+
+    def rotate(self, angle: int) -> asyncio.Future:
+        return self._run(self.control.rotate, angle)
+
+    def calibration(self) -> asyncio.Future:
+        return self._run(self.control.calibration)
+
+    def servo(self, grab_mode: GrabMode) -> asyncio.Future:
+        return self._run(self.control.servo, grab_mode)
+
+    def bigarm(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.bigarm, angle, force=force)
+
+    def forearm(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.forearm, angle, force=force)
+
+    def frontpaws(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.frontpaws, angle, force=force)
+
+    def hindpaws(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.hindpaws, angle, force=force)
+
+    def frontdoor(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.frontdoor, angle, force=force)
+
+    def backdoor(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.backdoor, angle, force=force)
+
+    def cirque(self, angle: int, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.cirque, angle, force=force)
+
+    def pose(self, pose: dict, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.pose, pose, force=force)
+
+    def run_sequence(self, sequence: str or tuple, force: bool = False) -> asyncio.Future:
+        return self._run(self.control.run_sequence, sequence, force=force)
+
+    def highest(self) -> asyncio.Future:
+        return self._run(self.control.highest)
+
+    def advance(self) -> asyncio.Future:
+        return self._run(self.control.advance)
+
+    def close(self) -> None:
+        """
+        等待运动线程中已提交的调用执行完后停止线程，并关闭串口
+
+        Returns:
+            None
+        """
+        self._executor.shutdown(wait=True)
+        self.control.close()
+
+
+class AsyncCamera:
+    """
+    Camera的asyncio接口，各识别方法在识别线程中按调用顺序执行，参数与返回值与Camera中的同名方法一致
+
+    方法:
+        read、detect_colors_bigmeter、detect_colors_platform、recognite_qr_info、
+        detect_rings、detect_circles、detect_circles_platform_low、detect_circles_from_high、measure_lines、
+        recognize_lines_to_correct_location: 识别方法
+        close: 停止识别线程
+    """
+
+    def __init__(self, camera: Camera) -> None:
+        """
+        Args:
+            camera(Camera): 已打开的Camera
+
+        Returns:
+            None
+        """
+        self.camera = camera
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='AsyncCamera')
+
+    def _run(self, method, *args, **kwargs) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    def read(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.read, *args, **kwargs)
+
+    def detect_colors_bigmeter(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.detect_colors_bigmeter, *args, **kwargs)
+
+    def detect_colors_platform(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.detect_colors_platform, *args, **kwargs)
+
+    def recognite_qr_info(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.recognite_qr_info, *args, **kwargs)
+
+    def detect_rings(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.detect_rings, *args, **kwargs)
+
+    def detect_circles(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.detect_circles, *args, **kwargs)
+
+    def detect_circles_platform_low(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.detect_circles_platform_low, *args, **kwargs)
+
+    def detect_circles_from_high(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.detect_circles_from_high, *args, **kwargs)
+
+    def measure_lines(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.measure_lines, *args, **kwargs)
+
+    def recognize_lines_to_correct_location(self, *args, **kwargs) -> asyncio.Future:
+        return self._run(self.camera.recognize_lines_to_correct_location, *args, **kwargs)
+
+    def close(self) -> None:
+        """
+        等待识别线程中已提交的调用执行完后停止线程，摄像头需另外释放
+
+        Returns:
+            None
+        """
+        self._executor.shutdown(wait=True)
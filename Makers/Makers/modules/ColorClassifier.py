@@ -0,0 +1,177 @@
+"""
+提供基于查找表的HSV颜色分类功能的模块
+
+主要功能包括:
+- 将Config.color_ranges中的颜色区间一次性编译为查找表
+- 单次遍历为每个像素打上颜色标签
+"""
+
+import cv2
+import numpy as np
+from Config import color_ranges
+
+
+class ColorClassifier:
+    """
+    基于查找表的颜色分类器
+
+    标签0表示不属于任何颜色，其余标签按color_ranges中颜色的顺序从1开始编号；若区间重叠，以先出现的颜色为准。
+    编译时会根据区间的形式选择查表方式:
+    - 所有区间的S、V范围相同时(目前的配置即是如此)，颜色只由H决定，用一张H->标签的查找表加一次S、V范围判断即可完成分类
+    - 否则每个区间占用一个二进制位，H、S、V各有一张位查找表，三个通道的查表结果按位与后再映射为标签
+
+    方法:
+        __init__: 编译颜色区间
+        classify: 将HSV图像转换为颜色标签图
+        classify_bgr: 将BGR图像转换为颜色标签图
+        mask: 从颜色标签图中取出某一颜色的掩膜
+    """
+
+    def __init__(self, ranges: dict = None) -> None:
+        """
+        编译颜色区间
+
+        Args:
+            ranges(dict): 颜色区间，格式与Config.color_ranges一致，默认使用Config.color_ranges
+
+        Returns:
+            None
+        """
+        ranges = color_ranges if ranges is None else ranges
+
+        self.color_names = list(ranges.keys())
+        self.labels = {color_name: index + 1 for index, color_name in enumerate(self.color_names)}
+
+        range_list = [(color_name, lower, upper) for color_name, bounds in ranges.items() for lower, upper in bounds]
+        values = np.arange(256)
+
+        sv_bounds = {(tuple(lower[1:]), tuple(upper[1:])) for _, lower, upper in range_list}
+        self._hue_only = len(sv_bounds) == 1
+
+        if self._hue_only:
+            (sv_lower, sv_upper), = sv_bounds
+            hue_label = np.zeros(256, dtype=np.uint8)
+            # 倒序写入，使先出现的颜色覆盖后出现的颜色
+            for color_name, lower, upper in reversed(range_list):
+                hue_label[(values >= lower[0]) & (values <= upper[0])] = self.labels[color_name]
+            self._hue_label = hue_label
+            self._sv_lower = np.array((0,) + sv_lower, dtype=np.uint8)
+            self._sv_upper = np.array((255,) + sv_upper, dtype=np.uint8)
+        else:
+            if len(range_list) > 8:
+                raise ValueError(f'颜色区间共{len(range_list)}个，按位查找表最多支持8个区间')
+
+            channel_luts = [np.zeros(256, dtype=np.uint8) for _ in range(3)]
+            for bit, (_, lower, upper) in enumerate(range_list):
+                for channel in range(3):
+                    channel_luts[channel][(values >= lower[channel]) & (values <= upper[channel])] |= np.uint8(1 << bit)
+
+            # 取最低的置位位对应的颜色作为标签
+            bit_label = np.zeros(256, dtype=np.uint8)
+            for pattern in range(1, 1 << len(range_list)):
+                bit = (pattern & -pattern).bit_length() - 1
+                bit_label[pattern] = self.labels[range_list[bit][0]]
+
+            self._channel_luts = channel_luts
+            self._bit_label = bit_label
+
+    def classify(self, hsv: np.ndarray) -> np.ndarray:
+        """
+        将HSV图像转换为颜色标签图
+
+        Args:
+            hsv(np.ndarray): HSV图像，uint8类型
+
+        Returns:
+            np.ndarray: 与输入同尺寸的单通道标签图
+        """
+        if self._hue_only:
+            labels = cv2.LUT(cv2.extractChannel(hsv, 0), self._hue_label)
+            sv_mask = cv2.inRange(hsv, self._sv_lower, self._sv_upper)
+            return cv2.bitwise_and(labels, labels, mask=sv_mask)
+
+        h_bits, s_bits, v_bits = [cv2.LUT(channel, lut) for channel, lut in zip(cv2.split(hsv), self._channel_luts)]
+        bits = cv2.bitwise_and(cv2.bitwise_and(h_bits, s_bits), v_bits)
+        return cv2.LUT(bits, self._bit_label)
+
+    def classify_bgr(self, frame: np.ndarray) -> np.ndarray:
+        """
+        将BGR图像转换为颜色标签图
+
+        Args:
+            frame(np.ndarray): BGR图像
+
+        Returns:
+            np.ndarray: 与输入同尺寸的单通道标签图
+        """
+        return self.classify(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV))
+
+    def mask(self, labels: np.ndarray, color_name: str) -> np.ndarray:
+        """
+        从颜色标签图中取出某一颜色的掩膜
+
+        Args:
+            labels(np.ndarray): classify返回的标签图
+            color_name(str): 颜色名
+
+        Returns:
+            np.ndarray: 二值掩膜，属于该颜色的像素为255
+        """
+        return cv2.compare(labels, self.labels[color_name], cv2.CMP_EQ)
+
+
+def largest_blob_contours(mask: np.ndarray, min_area: float) -> tuple or None:
+    """
+    通过轮廓查找获得掩膜中面积最大的色块，面积为外轮廓包围的面积
+
+    Args:
+        mask(np.ndarray): 二值掩膜
+        min_area(float): 最小色块面积，色块面积需大于该值
+
+    Returns:
+        tuple: (面积, x, y, w, h)，没有符合条件的色块时返回None
+    """
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    max_area = min_area
+    max_contour = None
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > max_area:
+            max_area = area
+            max_contour = contour
+
+    if max_contour is None:
+        return None
+    return (max_area,) + tuple(cv2.boundingRect(max_contour))
+
+
+def largest_blob_components(mask: np.ndarray, min_area: float) -> tuple or None:
+    """
+    通过连通域标记获得掩膜中面积最大的色块，一次调用即得到所有连通域的面积与外接矩形，不逐个遍历轮廓
+    面积为连通域的像素数，与外轮廓面积相比会略大(包含边界像素)，但不包含色块内部的空洞
+
+    Args:
+        mask(np.ndarray): 二值掩膜
+        min_area(float): 最小色块面积，色块面积需大于该值
+
+    Returns:
+        tuple: (面积, x, y, w, h)，没有符合条件的色块时返回None
+    """
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return None
+
+    # 第0个连通域为背景
+    index = int(np.argmax(stats[1:, cv2.CC_STAT_AREA])) + 1
+    x, y, w, h, area = stats[index]
+    if area <= min_area:
+        return None
+    return int(area), int(x), int(y), int(w), int(h)
+
+
+# 色块提取方式
+blob_extractors = {
+    'contours': largest_blob_contours,
+    'components': largest_blob_components,
+}
@@ -5,6 +5,7 @@
 """
 
 import enum
+import os
 import sys
 from loguru import logger
 
@@ -42,6 +43,8 @@ class MoveMode(enum.IntEnum):
         Cirque: 圆环
 
         Highest: 调高
+        Advance: 前进姿态
+        Pose: 多舵机姿态，一帧同时设置多个舵机的角度，格式见Protocol.py
     """
     Forward = 1
     Backward = 2
@@ -66,6 +69,7 @@ class MoveMode(enum.IntEnum):
 
     Highest = 20
     Advance = 21
+    Pose = 22
 
 
 class GrabMode(enum.IntEnum):
@@ -91,6 +95,80 @@ class GrabMode(enum.IntEnum):
     Put_Circle = 12
 
 
+# 舵机运动耗时模型参数，舵机指令收到反馈后等待 settle + 转动角度 / rate 秒，最多等待max秒
+# rate: 转速，单位为度/秒，0表示不按角度计算，总是等待max秒
+# settle: 稳定时间，单位为秒
+# max: 最长等待时间，即原先固定的等待时间，当前角度未知(启动、校准或重连后)时也等待该时间
+# 可以用实测数据通过ServoTiming.py重新拟合rate与settle
+servo_motion = {
+    MoveMode.Bigarm: {'rate': 400, 'settle': 0.1, 'max': 0.4},
+    MoveMode.Forearm: {'rate': 400, 'settle': 0.1, 'max': 0.4},
+    MoveMode.Frontpaws: {'rate': 400, 'settle': 0.05, 'max': 0.2},
+    MoveMode.Hindpaws: {'rate': 400, 'settle': 0.1, 'max': 0.4},
+    MoveMode.Frontdoor: {'rate': 0, 'settle': 0.0, 'max': 0.0},
+    MoveMode.Backdoor: {'rate': 400, 'settle': 0.1, 'max': 0.4},
+    MoveMode.Cirque: {'rate': 400, 'settle': 0.1, 'max': 0.4},
+}
+
+
+# 等待动作完成反馈的期限参数，期限 = margin + scale * 预计耗时，超过期限仍未收到反馈时重发或报错，见Latency.py
+# 预计耗时: 运动为 overhead + 距离 / speed，旋转为 overhead + 旋转参数 / turn_speed，舵机与姿态帧为servo，校准为calibration
+# 按log/interface_log.log拟合(tools/log_stats.py --by-value): 底盘指令即使距离或角度为0也要约2.01s，
+# 最慢约3s(Turnleft 0的p95为2.81s)；1900mm约4s，旋转1440约3s。speed、turn_speed取得低于实际速度，宁可期限偏长
+# retransmits: 超时后的最多重发次数，只有舵机与姿态帧(绝对角度，重复执行结果不变)会重发，运动与旋转超时直接报错
+ack_deadline_params = {
+    'margin': 2.0,
+    'scale': 1.0,
+    'speed': 0.5,
+    'turn_speed': 720,
+    'overhead': 2.0,
+    'servo': 1.0,
+    'calibration': 10.0,
+    'retransmits': 2,
+}
+
+
+# 底盘运动合并参数，见MotionBuffer.py
+# diagonal: 是否把相邻且距离相等的前后、左右运动合并为一次斜向运动。
+#     会把折线路径变为斜线，且下位机斜向运动的距离含义未经实测确认，默认关闭
+# diagonal_tolerance: 前后与左右距离之差不超过该值(米)时视为相等
+# diagonal_scale: 斜向运动距离 = 单方向距离 * diagonal_scale，下位机按斜边长度计算距离时为sqrt(2)
+# max_distance: 合并后的距离上限(米)，即帧中16位参数能表示的范围
+# max_rotation: 合并后的旋转参数上限，即帧中16位参数能表示的范围(rotate的参数不是度，720为90°)
+motion_buffer_params = {
+    'diagonal': False,
+    'diagonal_tolerance': 0.005,
+    'diagonal_scale': 2 ** 0.5,
+    'max_distance': 32.767,
+    'max_rotation': 0xFFFF,
+}
+
+
+# 任务时间线记录，见Trace.py
+# enabled: 是否记录，关闭时各埋点几乎没有开销
+# path: 运行结束时保存的Chrome trace文件，可在chrome://tracing或https://ui.perfetto.dev中打开
+trace_params = {
+    'enabled': False,
+    'path': 'Makers/log/trace.json',
+}
+
+
+# 舵机动作序列文件，格式见GrabSequence.py
+grab_sequence_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grab_sequences.json')
+
+
+class Feedback(enum.IntEnum):
+    """
+    该类用于封装下位机反馈帧的类型，反馈帧格式为[0xFF, 类型, 数据..., 0xFE]，数据中不能出现0xFF与0xFE
+
+    枚举成员:
+        ActionDone: 动作执行完毕
+        Start: 启动指令
+    """
+    ActionDone = 0x01
+    Start = 0x10
+
+
 class ColorSerial(enum.IntEnum):
     """
     该类用于封装颜色信息
@@ -120,6 +198,45 @@ color_ranges = {
 }
 
 
+# 圆环检测参数，按平台高度命名，新增平台只需新增一组参数
+# crop_x: 画面左侧裁掉的宽度
+# preprocess: 'blur'为中值滤波后转灰度(支持图像金字塔)，'edges'为二值化、腐蚀膨胀后进行Canny边缘检测
+# blur_ksize、min_dist、param1、param2、min_radius、max_radius: 中值滤波核大小与HoughCircles参数
+# window: 圆心需位于画面中心±window倍宽高的范围内，None表示不限制
+ring_profiles = {
+    'default': {'crop_x': 130, 'preprocess': 'blur', 'blur_ksize': 5, 'min_dist': 100,
+                'param1': 60, 'param2': 60, 'min_radius': 100, 'max_radius': 200, 'window': 0.25},
+    'platform_low': {'crop_x': 130, 'preprocess': 'blur', 'blur_ksize': 5, 'min_dist': 100,
+                     'param1': 50, 'param2': 50, 'min_radius': 50, 'max_radius': 200, 'window': 0.25},
+    'high': {'crop_x': 0, 'preprocess': 'edges', 'blur_ksize': 0, 'min_dist': 30,
+             'param1': 50, 'param2': 30, 'min_radius': 100, 'max_radius': 200, 'window': None},
+}
+
+
+# 巡线直线检测参数
+# threshold: 标准Hough变换的累加器阈值
+# p_threshold、min_line_length、max_line_gap: 概率Hough变换的累加器阈值、最短线段长度与线段合并的最大间隔
+# horizontal_angle_threshold: 与水平方向夹角不超过该角度(度)的直线不参与拟合
+# inlier_angle: 计算置信度时，与拟合直线夹角不超过该角度(度)的直线视为同向直线
+line_params = {
+    'threshold': 150,
+    'p_threshold': 60,
+    'min_line_length': 80,
+    'max_line_gap': 20,
+    'horizontal_angle_threshold': 2,
+    'inlier_angle': 3,
+}
+
+
+# 多帧颜色投票参数
+# 每帧中每种颜色的权重为 min(色块面积 / full_area, 1) * 色块填充率(面积 / 外接矩形面积)，未检测到色块的帧为"无颜色"记1，
+# 因此每帧给任一结果增加的权重都不超过1。当第一名与第二名的累计权重之差大于剩余帧数时，
+# 剩余的帧即使全部投给第二名也无法改变结果，此时停止读帧；否则读满max_attempts帧
+color_vote = {
+    'full_area': 6000,
+}
+
+
 if __name__ == '__main__':
     # 测试日志输出
     my_logger.info('logger_test')
@@ -7,11 +7,22 @@
 - 物体识别
 """
 import math
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
 
 import cv2
 from pyzbar.pyzbar import decode
 import numpy as np
-from Config import my_logger, color_ranges, ColorSerial
+from Config import my_logger, color_ranges, color_vote, line_params, ring_profiles, ColorSerial
+from modules.ColorClassifier import ColorClassifier, blob_extractors
+from modules.FrameSource import FrameSource, V4LSource, make_source
+from modules.Trace import traced
+
+# 巡线结果: 拟合直线与竖直方向的夹角(度)、与画面底边交点的x坐标、相对画面中心的横向偏差(像素)、
+# 画面采集时间戳(time.monotonic)、画面序号与置信度(0~1)
+LineMeasurement = namedtuple('LineMeasurement', ['angle', 'bottom_x', 'offset', 'timestamp', 'seq', 'confidence'])
 
 
 class Camera:
@@ -24,17 +35,23 @@ class Camera:
         __init__: 进行摄像头初始化
         open: 打开摄像头
         release: 释放摄像头资源
+        latest_frame: 获取后台线程采集到的最新帧及其时间戳、序号
+        read: 读取一帧画面，可要求画面采集时间晚于指定时刻
         detect_colors: 识别传入图像的颜色
         detect_colors_central: 仅当色块位于中心时才返回颜色
         recognite_qr_info: 识别二维码
+        detect_rings: 按参数配置检测圆环，detect_circles等方法均基于此方法
+        measure_lines: 识别地面胶带线，一次得到角度、横向偏差、时间戳与置信度，结果按画面序号缓存
     """
 
-    def __init__(self, device: int = 0) -> None:
+    def __init__(self, device: int = 0, threaded: bool = True, source: FrameSource = None) -> None:
         """
         初始化摄像头
 
         Args:
-            device(int): 摄像头序号
+            device(int): 摄像头序号，未指定source时使用该序号的实时摄像头
+            threaded(bool): 是否启用后台取帧线程，启用后各识别方法无需再连续读帧清空缓存
+            source(FrameSource): 画面来源，可以是视频文件或画面目录回放，详情见FrameSource.py
 
         Returns:
             None
@@ -50,9 +67,38 @@ class Camera:
 
         my_logger.info(f'开始初始化摄像头')
         self.device_id = device
+        self.source = source
         self.cap = None
         self._debug = False
 
+        # 后台取帧线程持续将画面写入最新帧槽位，同时记录采集时间戳(time.monotonic)与序号
+        self.threaded = threaded
+        self.flush_frames = 4
+        self.frame_seq = 0
+        self.frame_time = 0.0
+        self._grab_thread = None
+        self._grab_running = False
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None
+        self._latest_seq = 0
+        self._latest_time = 0.0
+
+        # 颜色区间只在初始化时编译一次
+        self.color_classifier = ColorClassifier(color_ranges)
+        self._blob_mode = 'contours'
+
+        # 圆检测使用的图像金字塔层数，0表示直接在原画面上检测，1表示先在1/2画面上检测，2表示1/4
+        self.circle_pyramid_levels = 0
+
+        # 巡线使用的直线检测方式，以及按画面序号缓存的巡线结果
+        self._line_mode = 'standard'
+        self.line_cache_size = 8
+        self._line_cache = OrderedDict()
+
+        # 取帧前调用的函数，返回True表示小车刚刚运动过，此时只使用之后采集的画面；
+        # 用于在识别前发送MotionBuffer中暂存的底盘运动
+        self.before_capture = None
+
         my_logger.info(f'初始化摄像头成功！')
 
     @property
@@ -66,6 +112,20 @@ class Camera:
         else:
             raise TypeError
 
+    @property
+    def blob_mode(self) -> str:
+        """
+        色块提取方式，'contours'为轮廓查找，'components'为连通域标记
+        """
+        return self._blob_mode
+
+    @blob_mode.setter
+    def blob_mode(self, value) -> None:
+        if value in blob_extractors:
+            self._blob_mode = value
+        else:
+            raise ValueError(f'不支持的色块提取方式: {value}')
+
     def open(self) -> None:
         """
         打开摄像头，类在初始化后不会自动打开摄像头，需要手动调用该方法打开摄像头
@@ -75,16 +135,18 @@ class Camera:
         """
         if self.cap is None:
             my_logger.info(f"开启摄像头中......")
-            self.cap = cv2.VideoCapture(self.device_id)
-            if not self.cap.isOpened():
-                raise RuntimeError("摄像头打开失败")
+            self.cap = self.source if self.source is not None else V4LSource(self.device_id)
+            self.cap.open()
             my_logger.info(f"摄像头成功打开")
-        self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_width, self.frame_height = self.cap.frame_size
 
         self.center_x = self.frame_width // 2
         self.center_y = self.frame_height // 2
 
+        # 尽快回放时逐帧读取，不启用后台取帧线程，以免跳过画面
+        if self.threaded and self.cap.realtime:
+            self._start_grabber()
+
     def release(self) -> None:
         """
         关闭摄像头，在程序结束时需要调用该方法释放摄像头
@@ -93,6 +155,7 @@ class Camera:
             None
         """
         my_logger.info(f'正在关闭摄像头')
+        self._stop_grabber()
         if self.cap is not None:
             self.cap.release()
             self.cap = None
@@ -100,25 +163,131 @@ class Camera:
         else:
             my_logger.warning('摄像头未打开，不需释放')
 
-    def detect_colors_bigmeter(self, min_area: int = 800, max_attempts: int = 5) -> str:
+    def _start_grabber(self) -> None:
+        """
+        启动后台取帧线程
+
+        Returns:
+            None
+        """
+        if self._grab_thread is not None:
+            return
+        self._grab_running = True
+        self._grab_thread = threading.Thread(target=self._grab_loop, name='camera-grabber', daemon=True)
+        self._grab_thread.start()
+        my_logger.info(f'后台取帧线程已启动')
+
+    def _stop_grabber(self) -> None:
+        """
+        停止后台取帧线程，并唤醒所有等待新帧的调用者
+
+        Returns:
+            None
+        """
+        self._grab_running = False
+        if self._grab_thread is not None:
+            self._grab_thread.join(timeout=1.0)
+            self._grab_thread = None
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+
+    def _grab_loop(self) -> None:
+        """
+        后台取帧线程主体，持续读取画面，使驱动缓存中不会积压旧帧
+
+        Returns:
+            None
+        """
+        while self._grab_running:
+            ret, frame = self.cap.read()
+            timestamp = time.monotonic()
+            if not ret:
+                time.sleep(0.005)
+                continue
+            with self._frame_cond:
+                self._latest_frame = frame
+                self._latest_time = timestamp
+                self._latest_seq += 1
+                self._frame_cond.notify_all()
+
+    def latest_frame(self, newer_than: float = None, timeout: float = 1.0) -> tuple or None:
+        """
+        获取最新帧槽位中的画面，槽位中的画面会被多个调用者共享
+
+        Args:
+            newer_than(float): 要求画面采集时间(time.monotonic)晚于该时刻，None表示不作要求
+            timeout(float): 等待满足条件的新帧的最长时间，单位为秒
+
+        Returns:
+            tuple: (序号, 采集时间戳, 画面)，超时或取帧线程未运行时返回None
+        """
+        deadline = time.monotonic() + timeout
+        with self._frame_cond:
+            while self._latest_frame is None or (newer_than is not None and self._latest_time <= newer_than):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._grab_running:
+                    return None
+                self._frame_cond.wait(remaining)
+            return self._latest_seq, self._latest_time, self._latest_frame
+
+    def read(self, newer_than: float = None, timeout: float = 1.0) -> tuple:
+        """
+        读取一帧画面，并将其序号与采集时间戳记录在self.frame_seq与self.frame_time中
+        未启用后台取帧线程时，若要求的时刻晚于上一帧的采集时间，则先连续读取self.flush_frames帧清空缓存，
+        尽快回放的画面来源没有缓存，不需清空
+
+        Args:
+            newer_than(float): 要求画面采集时间(time.monotonic)晚于该时刻，None表示不作要求
+            timeout(float): 等待新帧的最长时间，单位为秒，仅在启用后台取帧线程时有效
+
+        Returns:
+            tuple: (ret, frame)，与cv2.VideoCapture.read()一致
+        """
+        if self.before_capture is not None and self.before_capture():
+            newer_than = time.monotonic()
+
+        if self._grab_thread is None:
+            if newer_than is not None and newer_than > self.frame_time and self.cap.realtime:
+                for _ in range(self.flush_frames):
+                    self.cap.read()
+            ret, frame = self.cap.read()
+            if ret:
+                self.frame_seq += 1
+                self.frame_time = time.monotonic()
+            return ret, frame
+
+        latest = self.latest_frame(newer_than=newer_than, timeout=timeout)
+        if latest is None:
+            return False, None
+        self.frame_seq, self.frame_time, frame = latest
+        return True, frame
+
+    @traced('camera')
+    def detect_colors_bigmeter(self, min_area: int = 800, max_attempts: int = 5, vote: bool = False) -> str:
         detected_colors = None
         """
         识别颜色，调试模式下会显示摄像头画面并实时框选
 
         Args:
             min_area(int): 最小检测色块面积
-            max_attempts(int): 每次执行此方法时识别次数
+            max_attempts(int): 每次执行此方法时识别次数，投票模式下为最多读取的帧数
+            vote(bool): 是否使用多帧序贯投票，结果确定后即提前停止读帧
 
         Returns:
             color_name(str): 检测到的颜色名
         """
+        if vote:
+            return self._vote_colors(160, min_area, max_attempts)
+
         attempts = 0
         while attempts < max_attempts:
-            ret, frame = self.cap.read()  # 从摄像头读取一帧
-            frame = frame[:, 160:]
+            ret, frame = self.read(newer_than=self.frame_time)  # 从摄像头读取一帧
             if not ret:
+                # 摄像头卡住或回放的画面已读完时读取会失败，也计入尝试次数
                 my_logger.info('未读取到摄像头画面')
+                attempts += 1
                 continue
+            frame = frame[:, 160:]
 
             detected_colors, frame = self._detect_color_common(frame, min_area)
 
@@ -131,28 +300,37 @@ class Camera:
             else:
                 attempts += 1
 
+        if detected_colors is None:
+            return None
         most_detected_color = max(detected_colors, key=detected_colors.get)
         return most_detected_color if detected_colors[most_detected_color] > 0 else None
         
-    def detect_colors_platform(self, min_area: int = 800, max_attempts: int = 5) -> str:
+    @traced('camera')
+    def detect_colors_platform(self, min_area: int = 800, max_attempts: int = 5, vote: bool = False) -> str:
         detected_colors = None
         """
         识别颜色，调试模式下会显示摄像头画面并实时框选
 
         Args:
             min_area(int): 最小检测色块面积
-            max_attempts(int): 每次执行此方法时识别次数
+            max_attempts(int): 每次执行此方法时识别次数，投票模式下为最多读取的帧数
+            vote(bool): 是否使用多帧序贯投票，结果确定后即提前停止读帧
 
         Returns:
             color_name(str): 检测到的颜色名
         """
+        if vote:
+            return self._vote_colors(0, min_area, max_attempts)
+
         attempts = 0
         while attempts < max_attempts:
-            ret, frame = self.cap.read()  # 从摄像头读取一帧
-            frame = frame[:, :]
+            ret, frame = self.read(newer_than=self.frame_time)  # 从摄像头读取一帧
             if not ret:
+                # 摄像头卡住或回放的画面已读完时读取会失败，也计入尝试次数
                 my_logger.info('未读取到摄像头画面')
+                attempts += 1
                 continue
+            frame = frame[:, :]
 
             detected_colors, frame = self._detect_color_common(frame, min_area)
 
@@ -165,38 +343,101 @@ class Camera:
             else:
                 attempts += 1
 
+        if detected_colors is None:
+            return None
         most_detected_color = max(detected_colors, key=detected_colors.get)
         my_logger.info(f'recognize color: {most_detected_color}')
         return most_detected_color if detected_colors[most_detected_color] > 0 else None
 
+    def _vote_colors(self, x_offset: int, min_area: int, max_attempts: int) -> str or None:
+        """
+        多帧序贯投票识别颜色，每帧按色块面积与填充率加权，参数见Config.color_vote
+        剩余的帧即使全部投给第二名也无法改变结果时即停止读帧，最多读取max_attempts帧
+
+        Args:
+            x_offset(int): 画面左侧裁掉的宽度
+            min_area(int): 最小检测色块面积
+            max_attempts(int): 最多读取的帧数
+
+        Returns:
+            color_name(str): 检测到的颜色名，无颜色时返回None
+        """
+        scores = {color_name: 0.0 for color_name in color_ranges}
+        scores[None] = 0.0
+
+        frames = 0
+        while frames < max_attempts:
+            ret, frame = self.read(newer_than=self.frame_time)
+            # 读取失败也计入帧数，保证最多读取max_attempts次
+            frames += 1
+            if not ret:
+                my_logger.info('未读取到摄像头画面')
+                continue
+
+            blobs, frame = self._detect_color_blobs(frame[:, x_offset:], min_area)
+            for color_name, (area, _, _, w, h) in blobs.items():
+                scores[color_name] += min(area / color_vote['full_area'], 1.0) * area / (w * h)
+            if not blobs:
+                scores[None] += 1.0
+
+            if self.debug:
+                cv2.imshow("frame", frame)
+                k = cv2.waitKey(1) & 0xFF
+                if k == 27:
+                    cv2.destroyWindow("frame")
+                    break
+
+            # 每帧中每种结果的权重都不超过1，剩余的帧最多能使第二名增加max_attempts - frames
+            first, second = sorted(scores.values(), reverse=True)[:2]
+            if first - second > max_attempts - frames:
+                break
+
+        most_detected_color = max(scores, key=scores.get)
+        if scores[most_detected_color] == 0:
+            # 所有读取都失败，没有任何投票
+            most_detected_color = None
+        my_logger.info(f'投票结果: {most_detected_color}，共读取{frames}帧')
+        return most_detected_color
+
     def _detect_color_common(self, frame, min_area, central_only=False, y_threshold=50):
         detected_colors = {'red': 0, 'blue': 0, 'yellow': 0}
+        blobs, frame = self._detect_color_blobs(frame, min_area, central_only, y_threshold)
+        for color_name in blobs:
+            detected_colors[color_name] += 1
+
+        return detected_colors, frame
+
+    def _detect_color_blobs(self, frame, min_area, central_only=False, y_threshold=50):
+        """
+        获取画面中每种颜色面积最大的色块，并将色块中心记录到self.location_x与self.location_y中
+
+        Args:
+            frame: BGR画面
+            min_area: 最小检测色块面积
+            central_only: 是否只保留中心点y坐标在画面中心阈值范围内的色块
+            y_threshold: 中心点y轴的允许偏移量
+
+        Returns:
+            tuple: ({颜色名: (面积, x, y, w, h)}, 画面)
+        """
+        blobs = {}
         height, width, _ = frame.shape
         center_x, center_y = width // 2, height // 2  # 计算中心点坐标
 
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        # 单次遍历得到颜色标签图，各颜色的掩膜均从标签图中取出
+        labels = self.color_classifier.classify_bgr(frame)
 
-        for color_name, ranges in color_ranges.items():
-            masks = [cv2.inRange(hsv, np.array(lower, dtype="uint8"), np.array(upper, dtype="uint8")) for (lower, upper)
-                     in ranges]
-            mask = cv2.bitwise_or(*masks) if len(masks) > 1 else masks[0]
+        extract_blob = blob_extractors[self.blob_mode]
 
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for color_name in color_ranges:
+            blob = extract_blob(self.color_classifier.mask(labels, color_name), min_area)
 
-            max_area = min_area
-            max_contour = None
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > max_area:
-                    max_area = area
-                    max_contour = contour
-
-            if max_contour is not None and max_area >= min_area:
-                x, y, w, h = cv2.boundingRect(max_contour)
+            if blob is not None:
+                _, x, y, w, h = blob
                 block_center_x, block_center_y = x + w // 2, y + h // 2  # 色块中心点
                 # 只有当色块中心点的y坐标在中心点y坐标的阈值范围内时才计数
                 if not central_only or (abs(block_center_y - center_y) < y_threshold):
-                    detected_colors[color_name] += 1
+                    blobs[color_name] = blob
 
                     self.location_x = block_center_x
                     self.location_y = block_center_y
@@ -205,7 +446,7 @@ class Camera:
                         cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
                         cv2.putText(frame, color_name, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
-        return detected_colors, frame
+        return blobs, frame
 
     '''
     def detect_colors_central(self, min_area: int = 800, max_attempts: int = 5, y_threshold: int = 150) -> str:
@@ -246,6 +487,7 @@ class Camera:
         return most_detected_color if detected_colors[most_detected_color] > 0 else None
     '''
 
+    @traced('camera')
     def recognite_qr_info(self, data_len: int = -1, max_attempts: int = 10) -> str or None:
         """
         识别二维码
@@ -256,13 +498,18 @@ class Camera:
         Returns:
             ColorSerial: 二维码中的颜色信息
         """
-        for _ in range(4):
-            _, _ = self.cap.read()
+        # 只使用调用之后采集的画面，不再连续读帧清空缓存
+        newer_than = time.monotonic()
         data = ""
         data_flag = False
         attempts = 0
         while attempts < max_attempts:
-            _, frame = self.cap.read()
+            ret, frame = self.read(newer_than=newer_than)
+            if not ret:
+                my_logger.info('未读取到摄像头画面')
+                attempts += 1
+                continue
+            newer_than = self.frame_time
             for barcode in decode(frame):
                 data_ = barcode.data.decode('utf-8')
                 (x, y, w, h) = barcode.rect
@@ -305,67 +552,167 @@ class Camera:
         else:
             return None
 
-    def detect_circles(self, max_attempts: int = 1) -> bool:
-        attempts = 0
-        # 计算帧中心点
-        frame_center = (self.frame_width / 2, self.frame_height / 2)
+    def _hough_circles(self, frame, blur_ksize: int, min_dist: float, param1: float, param2: float,
+                       min_radius: int, max_radius: int) -> np.ndarray or None:
+        """
+        中值滤波后进行霍夫圆检测，返回值格式与cv2.HoughCircles一致
 
-        for _ in range(3):
-            _, _ = self.cap.read()
+        self.circle_pyramid_levels大于0时，先将画面缩小2^levels倍，用缩放后的参数找出候选圆；
+        再在原画面中包含所有候选圆心及其周围max_radius范围的区域内，以完整的半径范围重新检测，
+        得到与直接检测相同的圆心，并将圆心换算回原画面坐标；区域内没有检测到圆时使用换算回原画面的候选圆。
+        候选圆靠近画面边缘或max_radius相对画面较小时，区域小于原画面，可以减少滤波与霍夫变换的计算量
 
-        while attempts < max_attempts:
-            ret, frame = self.cap.read()
-            frame = frame[:, 130:]
-            if not ret:
-                my_logger.error('无法读取视频流')
-                return False
+        Args:
+            frame: BGR画面
+            blur_ksize(int): 中值滤波核大小
+            min_dist(float): 圆心之间的最小距离
+            param1(float): Canny边缘检测的高阈值
+            param2(float): 圆心累加器阈值
+            min_radius(int): 最小半径
+            max_radius(int): 最大半径
 
-            # 转换为灰度图
-            # img_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        Returns:
+            np.ndarray: 形状为(1, N, 3)的(x, y, r)数组，未检测到时返回None
+        """
+        levels = self.circle_pyramid_levels
+        if levels <= 0:
+            gray = cv2.cvtColor(cv2.medianBlur(frame, blur_ksize), cv2.COLOR_BGR2GRAY)
+            return cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, 1, min_dist,
+                                    param1=param1, param2=param2, minRadius=min_radius, maxRadius=max_radius)
+
+        scale = 2 ** levels
+        small = frame
+        for _ in range(levels):
+            small = cv2.pyrDown(small)
+        small = cv2.cvtColor(cv2.medianBlur(small, 3), cv2.COLOR_BGR2GRAY)
+        candidates = cv2.HoughCircles(small, cv2.HOUGH_GRADIENT, 1, min_dist / scale,
+                                      param1=param1, param2=param2 / scale,
+                                      minRadius=max(min_radius // scale - 1, 1), maxRadius=max_radius // scale + 1)
+        if candidates is None:
+            return None
 
-            # 中值滤波去噪
-            dst_img = cv2.medianBlur(frame, 5)
-            cimg = cv2.cvtColor(dst_img, cv2.COLOR_BGR2GRAY)
-            # cimg = dst_img
+        # 能为圆心投票的边缘点与圆心的距离不超过max_radius，候选区域在每个候选圆心周围留出max_radius以及
+        # 缩放误差与滤波所需的边缘，区域内圆心附近的累加器与原画面上的相同，因此精确定位的结果与直接检测一致。
+        # 所有候选圆共用一个区域，精确定位最多相当于在原画面上检测一次
+        candidates = candidates[0] * scale
+        height, width = frame.shape[:2]
+        margin = max_radius + 2 * scale + blur_ksize
+        x0, y0 = (max(int(value), 0) for value in candidates[:, :2].min(axis=0) - margin)
+        x1, y1 = (int(value) for value in np.minimum(candidates[:, :2].max(axis=0) + margin, (width, height)))
+        roi = cv2.cvtColor(cv2.medianBlur(frame[y0:y1, x0:x1], blur_ksize), cv2.COLOR_BGR2GRAY)
+        circles = cv2.HoughCircles(roi, cv2.HOUGH_GRADIENT, 1, min_dist,
+                                   param1=param1, param2=param2, minRadius=min_radius, maxRadius=max_radius)
+        if circles is None:
+            # 精确定位失败时使用换算回原画面的候选圆
+            return candidates[np.newaxis]
+        circles = circles[0] + np.array([x0, y0, 0], dtype=np.float32)
+
+        refined = []
+        for x, y, r in candidates:
+            # 取距候选圆心最近的圆，min_dist内没有圆时保留候选圆
+            distances = np.hypot(circles[:, 0] - x, circles[:, 1] - y)
+            nearest = int(np.argmin(distances))
+            refined.append(circles[nearest] if distances[nearest] < min_dist else (x, y, r))
+        return np.array([refined], dtype=np.float32)
+
+    def _ring_candidates(self, frame, params: dict) -> np.ndarray or None:
+        """
+        按参数配置对画面进行预处理并进行霍夫圆检测
 
-            # 圆检测
-            circles = cv2.HoughCircles(cimg, cv2.HOUGH_GRADIENT, 1, 100,
-                                       param1=60, param2=60, minRadius=100, maxRadius=200)
+        Args:
+            frame: 裁剪后的BGR画面
+            params(dict): Config.ring_profiles中的一组参数
 
-            closest_circle = None
-            min_distance = float('inf')
+        Returns:
+            np.ndarray: 形状为(1, N, 3)的(x, y, r)数组，未检测到时返回None
+        """
+        if params['preprocess'] == 'edges':
+            # 二值化、腐蚀膨胀后进行Canny边缘检测
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            _, binary_image = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+            kernel = np.ones((3, 3), np.uint8)
+            eroded_image = cv2.erode(binary_image, kernel, iterations=2)
+            dilated_image = cv2.dilate(eroded_image, kernel, iterations=8)
+            edges = cv2.Canny(dilated_image, 50, 150, apertureSize=3)
+            return cv2.HoughCircles(edges, cv2.HOUGH_GRADIENT, 1, params['min_dist'],
+                                    param1=params['param1'], param2=params['param2'],
+                                    minRadius=params['min_radius'], maxRadius=params['max_radius'])
 
-            if circles is not None:
-                circles = np.uint16(np.around(circles))
-                for i in circles[0, :]:
-                    center = (i[0], i[1])
-                    radius = i[2]
+        # 中值滤波去噪后进行圆检测，启用图像金字塔时先在缩小的画面上检测，再在原画面的候选区域内精确定位
+        return self._hough_circles(frame, params['blur_ksize'], params['min_dist'],
+                                   param1=params['param1'], param2=params['param2'],
+                                   min_radius=params['min_radius'], max_radius=params['max_radius'])
 
-                    # 检查圆是否在中心区域内
-                    if (frame_center[0] - self.frame_width * 0.25 < center[0] < frame_center[0] + self.frame_width * 0.25 and
-                            frame_center[1] - self.frame_height * 0.25 < center[1] < frame_center[1] + self.frame_height * 0.25):
+    def _closest_ring(self, circles: np.ndarray or None, window: float or None) -> tuple or None:
+        """
+        从候选圆中选出圆心位于中心区域内且距画面中心最近的圆
 
-                        # 计算圆心到图像中心的距离
-                        distance_to_center = np.sqrt(
-                            (center[0] - frame_center[0]) ** 2 + (center[1] - frame_center[1]) ** 2)
+        Args:
+            circles(np.ndarray): HoughCircles格式的候选圆
+            window(float): 圆心需位于画面中心±window倍宽高的范围内，None表示不限制
 
-                        # 如果当前圆比之前记录的更近，则更新最近的圆
-                        if distance_to_center < min_distance:
-                            min_distance = distance_to_center
-                            closest_circle = (center, radius)
+        Returns:
+            tuple: ((x, y), r)，没有符合条件的圆时返回None
+        """
+        if circles is None:
+            return None
+
+        circles = np.uint16(np.around(circles[0]))
+        # 与裁剪前一致，中心点使用整幅画面的尺寸计算
+        frame_size = np.array([self.frame_width, self.frame_height], dtype=np.float64)
+        frame_center = frame_size / 2
+        centers = circles[:, :2].astype(np.float64)
+
+        if window is not None:
+            inside = np.all((centers > frame_center - frame_size * window) &
+                            (centers < frame_center + frame_size * window), axis=1)
+            circles, centers = circles[inside], centers[inside]
+            if len(circles) == 0:
+                return None
+
+        distances = np.hypot(centers[:, 0] - frame_center[0], centers[:, 1] - frame_center[1])
+        x, y, r = circles[np.argmin(distances)]
+        return (int(x), int(y)), int(r)
+
+    @traced('camera')
+    def detect_rings(self, profile: str = 'default', max_attempts: int = 1) -> bool:
+        """
+        检测圆环，将距画面中心最近的圆环圆心记录到self.location_x与self.location_y中
+
+        Args:
+            profile(str): Config.ring_profiles中的参数配置名
+            max_attempts(int): 最大尝试次数
+
+        Returns:
+            bool: 是否检测到圆环
+        """
+        params = ring_profiles[profile]
+        attempts = 0
+
+        # 只使用调用之后采集的画面，不再连续读帧清空缓存
+        newer_than = time.monotonic()
+
+        while attempts < max_attempts:
+            ret, frame = self.read(newer_than=newer_than)
+            if not ret:
+                my_logger.error('无法读取视频流')
+                return False
+            newer_than = self.frame_time
+            frame = frame[:, params['crop_x']:]
+
+            closest_circle = self._closest_ring(self._ring_candidates(frame, params), params['window'])
 
             if closest_circle is not None:
                 center, radius = closest_circle
                 self.location_x, self.location_y = center
-                # 绘制圆心
-                cv2.circle(frame, center, 1, (0, 100, 100), 3)
-                # 绘制圆轮廓
-                cv2.circle(frame, center, radius, (255, 0, 0), 3)
-                # 添加文本"circle"
-                cv2.putText(frame, "circle", (center[0] - 40, center[1] + 40),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
 
             if self.debug:
+                if closest_circle is not None:
+                    # 绘制圆心、圆轮廓并添加文本"circle"
+                    cv2.circle(frame, center, 1, (0, 100, 100), 3)
+                    cv2.circle(frame, center, radius, (255, 0, 0), 3)
+                    cv2.putText(frame, "circle", (center[0] - 40, center[1] + 40),
+                                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
                 cv2.imshow("frame", frame)
                 k = cv2.waitKey(1) & 0xFF
                 if k == 27:  # 按ESC键退出
@@ -381,235 +728,241 @@ class Camera:
 
         my_logger.info(f'未检测到圆环')
         return False
-        
+
+    def detect_circles(self, max_attempts: int = 1) -> bool:
+        return self.detect_rings('default', max_attempts)
+
     def detect_circles_platform_low(self, max_attempts: int = 1) -> bool:
-        attempts = 0
-        # 计算帧中心点
-        frame_center = (self.frame_width / 2, self.frame_height / 2)
+        return self.detect_rings('platform_low', max_attempts)
 
-        for _ in range(4):
-            _, _ = self.cap.read()
+    def detect_circles_from_high(self, max_attempts: int = 1) -> bool:
+        return self.detect_rings('high', max_attempts)
 
-        while attempts < max_attempts:
-            ret, frame = self.cap.read()
-            frame = frame[:, 130:]
-            if not ret:
-                my_logger.error('无法读取视频流')
-                return False
+    @property
+    def line_mode(self) -> str:
+        """
+        巡线直线检测方式，'standard'为标准Hough变换(无限长直线)，'probabilistic'为概率Hough变换(线段)
+        """
+        return self._line_mode
 
-            # 转换为灰度图
-            # img_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    @line_mode.setter
+    def line_mode(self, value) -> None:
+        if value in ('standard', 'probabilistic'):
+            self._line_mode = value
+        else:
+            raise ValueError(f'不支持的直线检测方式: {value}')
 
-            # 中值滤波去噪
-            dst_img = cv2.medianBlur(frame, 5)
-            cimg = cv2.cvtColor(dst_img, cv2.COLOR_BGR2GRAY)
-            # cimg = dst_img
+    @staticmethod
+    def _hough_segments(lines: np.ndarray) -> np.ndarray:
+        """
+        将标准Hough变换得到的(rho, theta)直线转换为端点，取法线足点沿直线方向±1000像素的两点
 
-            # 圆检测
-            circles = cv2.HoughCircles(cimg, cv2.HOUGH_GRADIENT, 1, 100,
-                                       param1=50, param2=50, minRadius=50, maxRadius=200)
+        Args:
+            lines(np.ndarray): cv2.HoughLines的返回值，形状为N×1×2
 
-            closest_circle = None
-            min_distance = float('inf')
+        Returns:
+            np.ndarray: N×4的int32数组，每行为(x1, y1, x2, y2)
+        """
+        rho = lines[:, 0, 0]
+        theta = lines[:, 0, 1]
+        a = np.cos(theta)
+        b = np.sin(theta)
+        x0 = a * rho
+        y0 = b * rho
+        # astype与int()一样向零取整
+        return np.stack((x0 - 1000 * b, y0 + 1000 * a, x0 + 1000 * b, y0 - 1000 * a), axis=1).astype(np.int32)
+
+    @staticmethod
+    def _non_horizontal_points(segments: np.ndarray, threshold: float) -> np.ndarray or None:
+        """
+        滤除与水平方向夹角不超过threshold度的线段，返回其余线段的端点
 
-            if circles is not None:
-                circles = np.uint16(np.around(circles))
-                for i in circles[0, :]:
-                    center = (i[0], i[1])
-                    radius = i[2]
+        Args:
+            segments(np.ndarray): N×4的线段数组，每行为(x1, y1, x2, y2)
+            threshold(float): 角度阈值，单位为度
 
-                    # 检查圆是否在中心区域内
-                    if (frame_center[0] - self.frame_width * 0.25 < center[0] < frame_center[0] + self.frame_width * 0.25 and
-                            frame_center[1] - self.frame_height * 0.25 < center[1] < frame_center[1] + self.frame_height * 0.25):
+        Returns:
+            np.ndarray: 2N×2的int32端点数组，每条线段的两个端点依次排列，没有剩余线段时返回None
+        """
+        dx = (segments[:, 2] - segments[:, 0]).astype(np.float64)
+        dy = (segments[:, 3] - segments[:, 1]).astype(np.float64)
+        vertical = dx == 0
+        angle = np.abs(np.where(vertical, 90.0, np.degrees(np.arctan(dy / np.where(vertical, 1.0, dx)))))
 
-                        # 计算圆心到图像中心的距离
-                        distance_to_center = np.sqrt(
-                            (center[0] - frame_center[0]) ** 2 + (center[1] - frame_center[1]) ** 2)
+        keep = (threshold < angle) & (angle < 180 - threshold)
+        if not keep.any():
+            return None
+        return segments[keep].reshape(-1, 2)
 
-                        # 如果当前圆比之前记录的更近，则更新最近的圆
-                        if distance_to_center < min_distance:
-                            min_distance = distance_to_center
-                            closest_circle = (center, radius)
+    def _line_points(self, edges: np.ndarray) -> np.ndarray or None:
+        """
+        按line_mode在边缘图中检测直线，滤除接近水平的直线，返回参与拟合的端点
 
-            if closest_circle is not None:
-                center, radius = closest_circle
-                self.location_x, self.location_y = center
-                # 绘制圆心
-                cv2.circle(frame, center, 1, (0, 100, 100), 3)
-                # 绘制圆轮廓
-                cv2.circle(frame, center, radius, (255, 0, 0), 3)
-                # 添加文本"circle"
-                cv2.putText(frame, "circle", (center[0] - 40, center[1] + 40),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+        Args:
+            edges(np.ndarray): Canny边缘图
 
-            if self.debug:
-                cv2.imshow("frame", frame)
-                k = cv2.waitKey(1) & 0xFF
-                if k == 27:  # 按ESC键退出
-                    cv2.destroyWindow("frame")
-                    break
-            else:
-                attempts += 1
+        Returns:
+            np.ndarray: int32端点数组，没有可用的直线时返回None
+        """
+        if self.line_mode == 'standard':
+            lines = cv2.HoughLines(edges, 1, np.pi / 180, line_params['threshold'])
+            if lines is None:
+                return None
+            segments = self._hough_segments(lines)
+        else:
+            segments = cv2.HoughLinesP(edges, 1, np.pi / 180, line_params['p_threshold'],
+                                       minLineLength=line_params['min_line_length'],
+                                       maxLineGap=line_params['max_line_gap'])
+            if segments is None:
+                return None
+            segments = segments[:, 0, :]
 
-            # 检查是否检测到圆
-            if closest_circle is not None and not self.debug:
-                my_logger.info(f'检测到圆环')
-                return True
+        return self._non_horizontal_points(segments, line_params['horizontal_angle_threshold'])
 
-        my_logger.info(f'未检测到圆环')
-        return False
-        
-    def detect_circles_from_high(self):
-        # 从摄像头读取一帧
-        ret, img = self.cap.read()
+    def _measure_line_frame(self, frame: np.ndarray) -> tuple or None:
+        """
+        在一帧画面中识别胶带线并拟合直线
 
-        if not ret:
-            print("无法从摄像头读取图像，请检查摄像头是否连接")
-            return False
+        置信度为与拟合直线夹角不超过line_params['inlier_angle']度的直线所占比例，
+        且同向直线少于两条(胶带两侧边缘)时按比例降低
 
-        # 将图像转换为灰度图
-        gray_img = cv2.cvtColor(img)
+        Args:
+            frame(np.ndarray): 已裁剪的BGR画面
 
-        # 二值化处理
-        ret, binary_image = cv2.threshold(gray_img, 127, 255, cv2.THRESH_BINARY)
+        Returns:
+            tuple: (拟合直线与竖直方向的夹角, 与底边交点的x坐标, 置信度, (vx, vy, x0, y0))，未识别到直线时返回None
+        """
+        ret, binary_image = cv2.threshold(frame, 210, 255, cv2.THRESH_BINARY)
 
-        # 定义腐蚀和膨胀的核
-        kernel = np.ones((3, 3), np.uint8)
+        # 定义一个5x5的核
+        kernel = np.ones((5, 5), np.uint8)
 
-        # 腐蚀和膨胀操作
+        # 对图像进行腐蚀操作
         eroded_image = cv2.erode(binary_image, kernel, iterations=2)
-        dilated_image = cv2.dilate(eroded_image, kernel, iterations=8)
+        dilated_image = cv2.dilate(eroded_image, kernel, iterations=2)
 
-        # Canny边缘检测
+        # 边缘检测
         edges = cv2.Canny(dilated_image, 50, 150, apertureSize=3)
 
-        # 霍夫变换检测圆
-        circles = cv2.HoughCircles(edges, cv2.HOUGH_GRADIENT, dp=1, minDist=30,
-                                   param1=50, param2=30, minRadius=100, maxRadius=200)
-
-        if circles is not None:
-            circles = np.round(circles[0, :]).astype("int")
+        points = self._line_points(edges)
+        if points is None:
+            return None
 
-            closest_circle = None
-            min_distance = float('inf')
+        vx, vy, x0, y0 = cv2.fitLine(points, cv2.DIST_L2, 0, 0.01, 0.01).ravel()
 
-            for (x, y, r) in circles:
-                distance_to_center = np.sqrt((x - img.shape[1] / 2) ** 2 + (y - img.shape[0] / 2) ** 2)
+        if vy != 0:
+            fitted_line_angle = math.degrees(math.atan(vx / vy))
+        else:
+            fitted_line_angle = 90.0
 
-                if distance_to_center < min_distance:
-                    min_distance = distance_to_center
-                    closest_circle = (x, y, r)
+        bottom_y = frame.shape[0] - 1
+        bottom_x = int((bottom_y - y0) * vx / vy + x0)
+        bottom_x = max(0, min(bottom_x, frame.shape[1] - 1))
 
-            if closest_circle is not None:
-                x, y, r = closest_circle
-                self.location_x, self.location_y = x, y
+        # 参与拟合的直线均不接近水平，dy不为0
+        segments = points.reshape(-1, 4).astype(np.float64)
+        line_angles = np.degrees(np.arctan((segments[:, 2] - segments[:, 0]) / (segments[:, 3] - segments[:, 1])))
+        inliers = np.count_nonzero(np.abs(line_angles - fitted_line_angle) <= line_params['inlier_angle'])
+        confidence = float(inliers / len(segments) * min(inliers / 2, 1.0))
 
-                # 在原始图像上绘制圆周和圆心
-                cv2.circle(img, (x, y), r, (0, 255, 0), 2)
-                cv2.circle(img, (x, y), 2, (0, 0, 255), 3)
+        return fitted_line_angle, bottom_x, confidence, (vx, vy, x0, y0)
 
-                if self.debug:
-                    cv2.imshow('Detected Circles', img)
-                    cv2.waitKey(0)
+    @traced('camera')
+    def measure_lines(self, max_attempts: int = 5, newer_than: float = None) -> LineMeasurement or None:
+        """
+        识别地面上的胶带线，一次得到角度、底边位置、横向偏差、画面时间戳与置信度
 
-                return True
-            else:
-                print("没有找到合适的圆")
-        else:
-            print("没有检测到圆")
+        每帧的识别结果按画面序号缓存，缓存中已有满足newer_than要求的结果时直接返回，不再读取画面；
+        同一帧画面被重复查询时也不会重复识别。默认只使用调用之后采集的画面，总是重新识别；
+        要复用之前的识别结果，需显式传入更早的时刻，如上一次识别前记录的时刻(小车在此之后没有运动时)
 
-        return False
+        Args:
+            max_attempts(int): 最大尝试帧数，未检测到直线的帧也计入尝试次数
+            newer_than(float): 要求画面采集时间(time.monotonic)晚于该时刻，None表示调用时刻
 
-    def recognize_lines_to_correct_location(self, max_attempts: int = 5) -> float or None:
-        attempts = 0
+        Returns:
+            LineMeasurement: 识别结果，所有帧均未识别到直线时返回None
+        """
+        if self.before_capture is not None:
+            self.before_capture()
+        if newer_than is None:
+            newer_than = time.monotonic()
 
-        for _ in range(4):
-            _, _ = self.cap.read()
+        # 未检测到直线的帧在缓存中为None
+        cached = [measurement for measurement in self._line_cache.values()
+                  if measurement is not None and measurement.timestamp > newer_than]
+        if cached and not self.debug:
+            return max(cached, key=lambda measurement: measurement.seq)
 
+        attempts = 0
+        measurement = None
         while attempts < max_attempts:
-            ret, frame = self.cap.read()
+            ret, frame = self.read(newer_than=newer_than)
+            if not ret:
+                my_logger.error('无法读取视频流')
+                attempts += 1
+                continue
+            newer_than = self.frame_time
             frame = frame[:, 250:450]
-            
+
             (h, w, c) = frame.shape
             self.lines_central_x = w // 2
             self.lines_central_y = h // 2
 
-            ret, binary_image = cv2.threshold(frame, 210, 255, cv2.THRESH_BINARY)
-
-            # 定义一个5x5的核
-            kernel = np.ones((5, 5), np.uint8)
-
-            # 对图像进行腐蚀操作
-            eroded_image = cv2.erode(binary_image, kernel, iterations=2)
-            dilated_image = cv2.dilate(eroded_image, kernel, iterations=2)
-
-            # 边缘检测
-            edges = cv2.Canny(dilated_image, 50, 150, apertureSize=3)
-
-            # 使用Hough变换检测直线
-            lines = cv2.HoughLines(edges, 1, np.pi / 180, 150)
-
-            horizontal_angle_threshold = 2
-            all_points = []
-
-            if lines is not None:
-                for line in lines:
-                    rho, theta = line[0]
-                    a = np.cos(theta)
-                    b = np.sin(theta)
-                    x0 = a * rho
-                    y0 = b * rho
-                    x1 = int(x0 + 1000 * (-b))
-                    y1 = int(y0 + 1000 * (a))
-                    x2 = int(x0 - 1000 * (-b))
-                    y2 = int(y0 - 1000 * (a))
-
-                    dx = x2 - x1
-                    dy = y2 - y1
-                    if dx != 0:
-                        angle = math.degrees(math.atan(dy / dx))
-                    else:
-                        angle = 90.0
-
-                    if horizontal_angle_threshold < abs(angle) < (180 - horizontal_angle_threshold):
-                        all_points.append((x1, y1))
-                        all_points.append((x2, y2))
-
-            # 如果有足够的点来进行拟合
-            if len(all_points) > 1:
-                points = np.array(all_points)
-                vx, vy, x0, y0 = cv2.fitLine(points, cv2.DIST_L2, 0, 0.01, 0.01)
-
-                if vy != 0:
-                    fitted_line_angle = math.degrees(math.atan(vx / vy))
-                else:
-                    fitted_line_angle = 90.0
+            if self.frame_seq in self._line_cache:
+                result = self._line_cache[self.frame_seq]
+            else:
+                result = self._measure_line_frame(frame)
+                if result is not None:
+                    angle, bottom_x, confidence, _ = result
+                    result = LineMeasurement(angle, bottom_x, bottom_x - self.lines_central_x,
+                                             self.frame_time, self.frame_seq, confidence)
+                self._line_cache[self.frame_seq] = result
+                while len(self._line_cache) > self.line_cache_size:
+                    self._line_cache.popitem(last=False)
+
+            if result is None:
+                if not self.debug:
+                    attempts += 1
+                continue
+            measurement = result
 
+            if self.debug:
+                vx, vy, x0, y0 = self._measure_line_frame(frame)[3]
                 # 获取两个端点
                 lefty = int((-x0 * vy / vx) + y0)
                 righty = int(((frame.shape[1] - x0) * vy / vx) + y0)
+                cv2.line(frame, (frame.shape[1] - 1, righty), (0, lefty), (0, 0, 255), 2)
+                cv2.imshow('test', frame)
+                cv2.waitKey(0)
+            elif measurement.angle and measurement.bottom_x:
+                return measurement
+            else:
+                attempts += 1
 
-                bottom_y = frame.shape[0] - 1
-                bottom_x = int((bottom_y - y0) * vx / vy + x0)
+        return measurement
 
-                #lefty = max(0, min(lefty, frame.shape[0] - 1))
-                #righty = max(0, min(righty, frame.shape[0] - 1))
-                bottom_x = max(0, min(bottom_x, frame.shape[1] - 1))
+    @traced('camera')
+    def recognize_lines_to_correct_location(self, max_attempts: int = 5) -> tuple:
+        """
+        识别地面上的胶带线，拟合出一条直线，用于校正车身角度与横向位置
 
-                if self.debug:
-                    cv2.line(frame, (frame.shape[1] - 1, righty), (0, lefty), (0, 0, 255), 2)
-                    cv2.imshow('test', frame)
-                    cv2.waitKey(0)
-                elif fitted_line_angle and bottom_x:
-                    return bottom_x, fitted_line_angle
-                else:
-                    attempts += 1
+        Args:
+            max_attempts(int): 最大尝试帧数，未检测到直线的帧也计入尝试次数
 
-        return bottom_x, fitted_line_angle
+        Returns:
+            tuple: (拟合直线与底边交点的x坐标, 拟合直线与竖直方向的夹角)，均未识别到时为(None, None)
+        """
+        measurement = self.measure_lines(max_attempts=max_attempts)
+        if measurement is None:
+            return None, None
+        return measurement.bottom_x, measurement.angle
 
 
 if __name__ == '__main__':
-    camera = Camera(device=0)
+    # 可传入摄像头序号、视频文件或画面目录作为画面来源，例如: python Detection.py frames/
+    source = make_source(sys.argv[1], pace='realtime') if len(sys.argv) > 1 else None
+    camera = Camera(device=0, source=source)
     camera.debug = True
     camera.open()
 
@@ -0,0 +1,395 @@
+"""
+提供画面来源抽象的模块
+
+主要功能包括:
+- 实时摄像头(V4L设备)画面读取
+- 视频文件回放
+- 图片/NPY画面目录回放
+- 内存中的画面列表(合成画面)
+- 录制画面到目录，供回放复现现场问题
+
+回放可以尽快读取(pace='fast')，也可以按录制时的时间戳控制节奏(pace='realtime')
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+from Config import my_logger
+
+
+class FrameSource(ABC):
+    """
+    画面来源抽象基类，Camera通过该接口读取画面，子类需实现以下全部方法
+
+    属性:
+        realtime: 画面是否按真实时间产生，实时摄像头与按时间戳回放时为True，
+                  此时Camera会启用后台取帧线程，并在需要新画面时清空缓存
+
+    方法:
+        open: 打开画面来源
+        read: 读取一帧画面，返回(ret, frame)
+        release: 释放画面来源
+        isOpened: 画面来源是否已打开
+        frame_size: 画面尺寸(宽, 高)
+    """
+
+    realtime = True
+
+    @abstractmethod
+    def open(self) -> None:
+        ...
+
+    @abstractmethod
+    def read(self) -> tuple:
+        ...
+
+    @abstractmethod
+    def release(self) -> None:
+        ...
+
+    @abstractmethod
+    def isOpened(self) -> bool:
+        ...
+
+    @property
+    @abstractmethod
+    def frame_size(self) -> tuple:
+        ...
+
+
+class V4LSource(FrameSource):
+    """
+    实时摄像头画面来源
+    """
+
+    realtime = True
+
+    def __init__(self, device: int = 0) -> None:
+        """
+        Args:
+            device(int): 摄像头序号
+
+        Returns:
+            None
+        """
+        self.device_id = device
+        self.cap = None
+
+    def open(self) -> None:
+        self.cap = cv2.VideoCapture(self.device_id)
+        if not self.cap.isOpened():
+            raise RuntimeError("摄像头打开失败")
+
+    def read(self) -> tuple:
+        return self.cap.read()
+
+    def release(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    @property
+    def frame_size(self) -> tuple:
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+
+class _ReplaySource(FrameSource):
+    """
+    回放画面来源的公共部分，负责按时间戳控制回放节奏
+    """
+
+    def __init__(self, pace: str = 'fast', loop: bool = False) -> None:
+        """
+        Args:
+            pace(str): 'fast'表示尽快读取，'realtime'表示按录制时的时间戳控制节奏
+            loop(bool): 读取到末尾后是否从头开始
+
+        Returns:
+            None
+        """
+        if pace not in ('fast', 'realtime'):
+            raise ValueError(f'不支持的回放节奏: {pace}')
+        self.pace = pace
+        self.loop = loop
+        self.realtime = pace == 'realtime'
+        self._start_time = None
+        self._first_timestamp = None
+
+    def _wait_until(self, timestamp: float) -> None:
+        """
+        按时间戳控制回放节奏，timestamp为录制时的时间，单位为秒
+
+        Returns:
+            None
+        """
+        if not self.realtime:
+            return
+        if self._start_time is None:
+            self._start_time = time.monotonic()
+            self._first_timestamp = timestamp
+        delay = (timestamp - self._first_timestamp) - (time.monotonic() - self._start_time)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _rewind(self) -> None:
+        self._start_time = None
+        self._first_timestamp = None
+
+
+class VideoFileSource(_ReplaySource):
+    """
+    视频文件回放画面来源，时间戳取自视频中每帧的播放时间
+    """
+
+    def __init__(self, path: str, pace: str = 'fast', loop: bool = False) -> None:
+        """
+        Args:
+            path(str): 视频文件路径
+            pace(str): 'fast'表示尽快读取，'realtime'表示按视频帧时间控制节奏
+            loop(bool): 读取到末尾后是否从头开始
+
+        Returns:
+            None
+        """
+        super().__init__(pace=pace, loop=loop)
+        self.path = path
+        self.cap = None
+
+    def open(self) -> None:
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"视频文件打开失败: {self.path}")
+
+    def read(self) -> tuple:
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._rewind()
+            ret, frame = self.cap.read()
+        if ret:
+            self._wait_until(self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+        return ret, frame
+
+    def release(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    @property
+    def frame_size(self) -> tuple:
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+
+class ImageDirectorySource(_ReplaySource):
+    """
+    图片/NPY画面目录回放画面来源
+
+    目录中的png/jpg/npy文件按文件名排序回放；若目录中存在timestamps.txt(每行一个时间戳，单位为秒，
+    与排序后的画面一一对应，FrameRecorder会自动生成)，则按其中的时间戳控制节奏，否则按fps计算时间戳
+    """
+
+    def __init__(self, directory: str, pace: str = 'fast', loop: bool = False, fps: float = 30.0) -> None:
+        """
+        Args:
+            directory(str): 画面所在目录
+            pace(str): 'fast'表示尽快读取，'realtime'表示按时间戳控制节奏
+            loop(bool): 读取到末尾后是否从头开始
+            fps(float): 没有timestamps.txt时使用的帧率
+
+        Returns:
+            None
+        """
+        super().__init__(pace=pace, loop=loop)
+        self.directory = directory
+        self.fps = fps
+        self.paths = []
+        self.timestamps = []
+        self._index = 0
+        self._frame_size = None
+
+    def open(self) -> None:
+        if not os.path.isdir(self.directory):
+            raise RuntimeError(f"画面目录不存在: {self.directory}")
+        self.paths = [os.path.join(self.directory, name) for name in sorted(os.listdir(self.directory))
+                      if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.npy'))]
+        if not self.paths:
+            raise RuntimeError(f"画面目录中没有画面: {self.directory}")
+
+        timestamps_path = os.path.join(self.directory, 'timestamps.txt')
+        if os.path.exists(timestamps_path):
+            with open(timestamps_path) as f:
+                self.timestamps = [float(line) for line in f if line.strip()]
+        if len(self.timestamps) != len(self.paths):
+            self.timestamps = [index / self.fps for index in range(len(self.paths))]
+
+        self._index = 0
+        frame = self._load(self.paths[0])
+        self._frame_size = (frame.shape[1], frame.shape[0])
+        my_logger.info(f'画面目录{self.directory}中共有{len(self.paths)}帧')
+
+    @staticmethod
+    def _load(path: str) -> np.ndarray:
+        if path.endswith('.npy'):
+            return np.load(path)
+        return cv2.imread(path)
+
+    def read(self) -> tuple:
+        if self._index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self._index = 0
+            self._rewind()
+        frame = self._load(self.paths[self._index])
+        self._wait_until(self.timestamps[self._index])
+        self._index += 1
+        return frame is not None, frame
+
+    def release(self) -> None:
+        self.paths = []
+        self._index = 0
+
+    def isOpened(self) -> bool:
+        return bool(self.paths)
+
+    @property
+    def frame_size(self) -> tuple:
+        return self._frame_size
+
+
+class MemorySource(FrameSource):
+    """
+    内存中的画面来源，循环返回画面列表中各帧的副本，用于基准测试中的合成画面。
+    子类可以在open中生成self.frames后调用本类的open
+    """
+
+    realtime = False
+
+    def __init__(self, frames: list = None) -> None:
+        """
+        Args:
+            frames(list): 画面列表
+
+        Returns:
+            None
+        """
+        self.frames = list(frames) if frames is not None else []
+        self._index = 0
+        self._opened = False
+
+    def open(self) -> None:
+        self._index = 0
+        self._opened = True
+
+    def read(self) -> tuple:
+        if not self._opened or not self.frames:
+            return False, None
+        frame = self.frames[self._index % len(self.frames)].copy()
+        self._index += 1
+        return True, frame
+
+    def release(self) -> None:
+        self._opened = False
+
+    def isOpened(self) -> bool:
+        return self._opened and bool(self.frames)
+
+    @property
+    def frame_size(self) -> tuple:
+        height, width = self.frames[0].shape[:2]
+        return width, height
+
+
+class FrameRecorder:
+    """
+    将画面录制到目录中，生成的目录可直接由ImageDirectorySource回放
+
+    方法:
+        write: 写入一帧画面
+        close: 写入时间戳文件
+    """
+
+    def __init__(self, directory: str, fmt: str = 'npy') -> None:
+        """
+        Args:
+            directory(str): 保存目录
+            fmt(str): 'npy'(无损且写入快)或'png'
+
+        Returns:
+            None
+        """
+        if fmt not in ('npy', 'png'):
+            raise ValueError(f'不支持的录制格式: {fmt}')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fmt = fmt
+        self.timestamps = []
+
+    def write(self, frame: np.ndarray, timestamp: float = None) -> None:
+        """
+        写入一帧画面
+
+        Args:
+            frame(np.ndarray): 画面
+            timestamp(float): 采集时间戳，单位为秒，默认使用当前time.monotonic()
+
+        Returns:
+            None
+        """
+        path = os.path.join(self.directory, f'{len(self.timestamps):06d}.{self.fmt}')
+        if self.fmt == 'npy':
+            np.save(path, frame)
+        else:
+            cv2.imwrite(path, frame)
+        self.timestamps.append(time.monotonic() if timestamp is None else timestamp)
+
+    def close(self) -> None:
+        with open(os.path.join(self.directory, 'timestamps.txt'), 'w') as f:
+            f.writelines(f'{timestamp:.6f}\n' for timestamp in self.timestamps)
+        my_logger.info(f'共录制{len(self.timestamps)}帧画面到{self.directory}')
+
+
+def make_source(spec: str or int, pace: str = 'fast', loop: bool = False) -> FrameSource:
+    """
+    根据描述创建画面来源: 整数或纯数字字符串为摄像头序号，目录为画面目录，其余视为视频文件
+
+    Args:
+        spec(str or int): 画面来源描述
+        pace(str): 回放节奏，仅对回放来源有效
+        loop(bool): 回放到末尾后是否从头开始
+
+    Returns:
+        FrameSource: 画面来源
+    """
+    if isinstance(spec, int) or str(spec).isdigit():
+        return V4LSource(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, pace=pace, loop=loop)
+    return VideoFileSource(spec, pace=pace, loop=loop)
+
+
+if __name__ == '__main__':
+    # 从摄像头录制画面: python FrameSource.py [摄像头序号] [保存目录] [帧数]
+    import sys
+
+    device = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    directory = sys.argv[2] if len(sys.argv) > 2 else 'frames'
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    source = V4LSource(device)
+    source.open()
+    recorder = FrameRecorder(directory)
+    for _ in range(count):
+        ret, frame = source.read()
+        if ret:
+            recorder.write(frame)
+    recorder.close()
+    source.release()
@@ -0,0 +1,102 @@
+"""
+提供舵机动作序列加载与编译功能的模块
+
+主要功能包括:
+- 从JSON文件加载舵机动作序列并检查
+- 启动时将序列编译为预先编码好的指令帧与日志信息，执行时不再检查参数、构建列表
+
+序列文件格式(见grab_sequences.json):
+    {
+        "序列名(GrabMode成员名，或Highest、Advance)": [
+            {"pose": {"舵机名(MoveMode成员名)": 角度, ...}, "dwell": 可选，收到反馈后的等待时间},
+            {"sleep": 秒},
+            ...
+        ],
+        ...
+    }
+同一pose中的舵机可以同时运动: 下位机不支持姿态帧时按书写顺序逐个发送，支持时合并为一个姿态帧；
+未指定dwell时按ServoTiming根据转动角度计算等待时间，指定时逐个发送的每条指令(或姿态帧)之后均等待dwell秒
+"""
+
+import json
+from collections import namedtuple
+
+from Config import MoveMode, grab_sequence_file
+from modules.Protocol import SERVO_CHANNELS, FrameEncoder, command_value, encode_pose
+
+# 编译后的单条舵机指令: 舵机、角度、指令帧与日志信息
+ServoCommand = namedtuple('ServoCommand', ['channel', 'angle', 'frame', 'log_msg'])
+
+# 编译后的序列步骤，sleep步骤的pose为None
+# pose: {舵机: 角度}；commands: 逐个发送时的指令；pose_frame: 姿态帧；pose_log_msg: 姿态帧日志信息；
+# dwell: 指定的等待时间，None表示按转动角度计算；sleep: sleep步骤的等待时间
+SequenceStep = namedtuple('SequenceStep', ['pose', 'commands', 'pose_frame', 'pose_log_msg', 'dwell', 'sleep'])
+
+
+def load_sequences(path: str = None) -> dict:
+    """
+    从JSON文件加载舵机动作序列并检查
+
+    Args:
+        path(str): 序列文件路径，默认使用Config.grab_sequence_file
+
+    Returns:
+        dict: {序列名: [('pose', {舵机MoveMode: 角度}, dwell) 或 ('sleep', 秒, None), ...]}
+    """
+    path = grab_sequence_file if path is None else path
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+
+    sequences = {}
+    for name, steps in raw.items():
+        parsed = []
+        for index, step in enumerate(steps):
+            where = f'{path}中序列{name}的第{index + 1}步'
+            if 'sleep' in step:
+                seconds = float(step['sleep'])
+                if seconds < 0:
+                    raise ValueError(f'{where}: 等待时间不能为负数')
+                parsed.append(('sleep', seconds, None))
+                continue
+            if 'pose' not in step or not step['pose']:
+                raise ValueError(f'{where}: 需要pose或sleep')
+
+            pose = {}
+            for channel_name, angle in step['pose'].items():
+                if channel_name not in MoveMode.__members__ or MoveMode[channel_name] not in SERVO_CHANNELS:
+                    raise ValueError(f'{where}: 无法识别的舵机{channel_name}')
+                if not 0 <= int(angle) <= 180:
+                    raise ValueError(f'{where}: {channel_name}的角度{angle}超出[0, 180]')
+                pose[MoveMode[channel_name]] = int(angle)
+            dwell = step.get('dwell')
+            parsed.append(('pose', pose, None if dwell is None else float(dwell)))
+        sequences[name] = parsed
+    return sequences
+
+
+def compile_sequences(sequences: dict) -> dict:
+    """
+    将舵机动作序列编译为预先编码好的指令帧
+
+    Args:
+        sequences(dict): load_sequences的返回值
+
+    Returns:
+        dict: {序列名: (SequenceStep, ...)}
+    """
+    encoder = FrameEncoder()
+    compiled = {}
+    for name, steps in sequences.items():
+        compiled_steps = []
+        for kind, value, dwell in steps:
+            if kind == 'sleep':
+                compiled_steps.append(SequenceStep(None, (), None, None, None, value))
+                continue
+            commands = tuple(ServoCommand(channel, angle,
+                                          bytes(encoder.encode(channel, command_value(channel, rotation_angle=angle))),
+                                          f'{channel.name}参数为{angle}')
+                             for channel, angle in value.items())
+            pose_log_msg = '姿态' + '，'.join(f'{channel.name}: {angle}' for channel, angle in value.items())
+            compiled_steps.append(SequenceStep(value, commands, bytes(encode_pose(value)), pose_log_msg, dwell, 0.0))
+        compiled[name] = tuple(compiled_steps)
+    return compiled
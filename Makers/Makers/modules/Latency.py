@@ -0,0 +1,193 @@
+"""
+提供指令期限计算与指令延迟统计功能的模块
+
+主要功能包括:
+- 按指令的预计耗时计算等待动作完成反馈的期限
+- 按MoveMode统计从发送指令到收到动作完成反馈的延迟，给出直方图与汇总，运行结束时输出
+
+期限 = margin + scale * 预计耗时，预计耗时的计算方式见Config.ack_deadline_params
+"""
+
+import json
+import threading
+
+import numpy as np
+
+from Config import my_logger, MoveMode, ack_deadline_params
+from modules.Protocol import DISTANCE_MODES, ROTATION_MODES
+
+
+def expected_duration(mode: MoveMode, value: int, params: dict = None) -> float:
+    """
+    计算一条指令的预计执行耗时
+
+    Args:
+        mode(MoveMode): 指令模式
+        value(int): 帧中的参数，运动为毫米，旋转为rotate的参数(720为90°)
+        params(dict): 期限参数，默认使用Config.ack_deadline_params
+
+    Returns:
+        float: 预计耗时，单位为秒
+    """
+    params = ack_deadline_params if params is None else params
+    if mode in DISTANCE_MODES:
+        return params['overhead'] + value / 1000 / params['speed']
+    if mode in ROTATION_MODES:
+        return params['overhead'] + value / params['turn_speed']
+    if mode == MoveMode.Calibration:
+        return params['calibration']
+    return params['servo']
+
+
+def ack_deadline(expected: float, params: dict = None) -> float:
+    """
+    由预计耗时计算等待动作完成反馈的期限
+
+    Args:
+        expected(float): 预计耗时，单位为秒
+        params(dict): 期限参数，默认使用Config.ack_deadline_params
+
+    Returns:
+        float: 期限，单位为秒
+    """
+    params = ack_deadline_params if params is None else params
+    return params['margin'] + params['scale'] * expected
+
+
+class LatencyStats:
+    """
+    按MoveMode统计从发送指令到收到动作完成反馈的延迟，可在多个线程中记录
+
+    方法:
+        record: 记录一次延迟
+        extend: 记录同一模式的多次延迟
+        samples: 某一模式的全部延迟
+        histogram: 某一模式的延迟直方图
+        summary: 各模式的次数、总耗时、分位数与相对预计耗时的倍数
+        dump: 按总耗时从高到低输出汇总，可同时保存为JSON
+        reset: 清空统计
+    """
+
+    # 直方图各区间的上界，单位为秒，最后一个区间没有上界
+    BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+
+    def __init__(self) -> None:
+        self._samples = {}
+        self._expected = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode: MoveMode, seconds: float, expected: float = None) -> None:
+        """
+        记录一次延迟
+
+        Args:
+            mode(MoveMode): 指令模式
+            seconds(float): 从发送到收到反馈的时间，单位为秒
+            expected(float): 预计耗时，用于发现下位机变慢
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._samples.setdefault(mode, []).append(seconds)
+            if expected:
+                self._expected.setdefault(mode, []).append(seconds / expected)
+
+    def extend(self, mode: MoveMode, seconds: list, expected: float = None) -> None:
+        """
+        记录同一模式、同一预计耗时的多次延迟，如离线统计日志时
+
+        Args:
+            mode(MoveMode): 指令模式
+            seconds(list): 各次从发送到收到反馈的时间，单位为秒
+            expected(float): 预计耗时
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._samples.setdefault(mode, []).extend(seconds)
+            if expected:
+                self._expected.setdefault(mode, []).extend(sample / expected for sample in seconds)
+
+    def samples(self, mode: MoveMode) -> list:
+        """
+        Args:
+            mode(MoveMode): 指令模式
+
+        Returns:
+            list: 该模式的全部延迟，单位为秒
+        """
+        with self._lock:
+            return list(self._samples.get(mode, []))
+
+    def histogram(self, mode: MoveMode) -> list:
+        """
+        Args:
+            mode(MoveMode): 指令模式
+
+        Returns:
+            list: [(区间上界秒, 次数), ...]，最后一个区间的上界为None
+        """
+        counts = np.bincount(np.searchsorted(self.BUCKETS, self.samples(mode)), minlength=len(self.BUCKETS) + 1)
+        return list(zip(self.BUCKETS + (None,), counts.tolist()))
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: {模式名: {'count', 'total', 'mean', 'p50', 'p95', 'max', 'vs_expected'}}，时间单位为秒，
+                  vs_expected为实际耗时与预计耗时之比的中位数
+        """
+        with self._lock:
+            items = [(mode, np.array(samples), list(self._expected.get(mode, [])))
+                     for mode, samples in self._samples.items()]
+        result = {}
+        for mode, samples, ratios in items:
+            result[mode.name] = {
+                'count': int(samples.size),
+                'total': float(samples.sum()),
+                'mean': float(samples.mean()),
+                'p50': float(np.percentile(samples, 50)),
+                'p95': float(np.percentile(samples, 95)),
+                'max': float(samples.max()),
+                'vs_expected': float(np.median(ratios)) if ratios else None,
+            }
+        return result
+
+    def dump(self, path: str = None) -> dict:
+        """
+        按总耗时从高到低在日志中输出各模式的延迟汇总
+
+        Args:
+            path(str): 同时保存汇总与直方图的JSON文件路径，None表示不保存
+
+        Returns:
+            dict: summary的返回值
+        """
+        summary = self.summary()
+        if not summary:
+            my_logger.info('没有记录到指令延迟')
+            return summary
+
+        lines = [f'{"模式":<12}{"次数":>6}{"总耗时s":>10}{"平均ms":>10}{"p50 ms":>10}{"p95 ms":>10}{"最大ms":>10}{"实际/预计":>10}']
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]['total']):
+            ratio = f'{stats["vs_expected"]:.2f}' if stats['vs_expected'] is not None else '-'
+            lines.append(f'{name:<12}{stats["count"]:>6}{stats["total"]:>10.2f}{stats["mean"] * 1000:>10.1f}'
+                         f'{stats["p50"] * 1000:>10.1f}{stats["p95"] * 1000:>10.1f}{stats["max"] * 1000:>10.1f}{ratio:>10}')
+        my_logger.info('指令延迟统计:\n' + '\n'.join(lines))
+
+        if path is not None:
+            with self._lock:
+                modes = list(self._samples)
+            report = {
+                'summary': summary,
+                'histograms': {mode.name: self.histogram(mode) for mode in modes},
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._expected.clear()
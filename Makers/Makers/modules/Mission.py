@@ -0,0 +1,206 @@
+"""
+提供任务阶段图与调度功能的模块
+
+主要功能包括:
+- 把任务写成阶段图: 每个阶段声明占用的执行机构(底盘、机械臂、摄像头)与依赖的阶段
+- 调度执行: 依赖均已完成的阶段立即开始，没有依赖关系且不占用同一执行机构的阶段同时进行
+- 每次执行后在日志中输出关键路径、各执行机构的占用时间与同时执行节省的时间
+
+阶段默认依赖前一个添加的阶段，与直线脚本的执行顺序相同；只有显式声明了after的阶段才可能与前面的阶段同时进行，例如:
+
+    mission.add('align', ..., resources=(CHASSIS, CAMERA))
+    mission.add('shift', ..., resources=(CHASSIS,))
+    # 底盘横移的同时摆好抓取姿态
+    mission.add('ready', ..., resources=(ARM,), after='align')
+    mission.add('grab', ..., resources=(CHASSIS, ARM, CAMERA))
+
+占用同一执行机构的阶段总是按添加顺序依次执行，因此grab在shift与ready都完成后才开始
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+
+from Config import my_logger
+from modules.Trace import tracer
+
+# 执行机构
+CHASSIS = 'chassis'
+ARM = 'arm'
+CAMERA = 'camera'
+RESOURCES = (CHASSIS, ARM, CAMERA)
+
+# 阶段: 名称、无参数的可调用对象、占用的执行机构、开始前需完成的阶段(含因占用同一执行机构产生的依赖)
+Stage = namedtuple('Stage', ['name', 'action', 'resources', 'after'])
+# 阶段的执行时间，相对任务开始时刻，单位为秒
+StageRecord = namedtuple('StageRecord', ['start', 'end'])
+
+
+class Mission:
+    """
+    任务阶段图，阶段按依赖关系与执行机构占用情况调度执行
+
+    方法:
+        add: 添加阶段
+        run: 执行所有阶段，返回执行报告
+        report: 由最近一次执行的各阶段时间计算关键路径等统计
+    """
+
+    def __init__(self, name: str) -> None:
+        """
+        Args:
+            name(str): 任务名，用于日志
+
+        Returns:
+            None
+        """
+        self.name = name
+        self.stages = {}
+        # 各阶段最近一次执行的时间
+        self.records = {}
+        self._last = None
+        self._last_user = {}
+        self._records_lock = threading.Lock()
+        self._begin = 0.0
+
+    def add(self, name: str, action, resources: tuple = (), after: str or tuple = None) -> str:
+        """
+        添加阶段，依赖的阶段需已经添加，因此阶段图中不会有环
+
+        Args:
+            name(str): 阶段名，不能重复
+            action: 无参数的可调用对象
+            resources(tuple): 占用的执行机构，取值见RESOURCES
+            after(str or tuple): 开始前需完成的阶段名，None表示前一个添加的阶段，()表示只按执行机构排队
+
+        Returns:
+            str: 阶段名
+        """
+        if name in self.stages:
+            raise ValueError(f'阶段{name}已存在')
+        resources = tuple(resources)
+        for resource in resources:
+            if resource not in RESOURCES:
+                raise ValueError(f'阶段{name}占用了未知的执行机构{resource}，可选{RESOURCES}')
+
+        if after is None:
+            after = () if self._last is None else (self._last,)
+        elif isinstance(after, str):
+            after = (after,)
+        for dependency in after:
+            if dependency not in self.stages:
+                raise ValueError(f'阶段{name}依赖的阶段{dependency}需先添加')
+
+        # 占用同一执行机构的阶段按添加顺序执行
+        dependencies = list(after)
+        for resource in resources:
+            previous = self._last_user.get(resource)
+            if previous is not None and previous not in dependencies:
+                dependencies.append(previous)
+            self._last_user[resource] = name
+
+        self.stages[name] = Stage(name, action, resources, tuple(dependencies))
+        self._last = name
+        return name
+
+    def run(self) -> dict:
+        """
+        执行所有阶段。有阶段抛出异常时不再开始新的阶段，等正在执行的阶段结束后重新抛出该异常
+
+        Returns:
+            dict: 执行报告，见report
+        """
+        with self._records_lock:
+            self.records.clear()
+        done = set()
+        started = set()
+        running = {}
+        error = None
+
+        my_logger.info('开始执行任务{}，共{}个阶段', self.name, len(self.stages))
+        executor = ThreadPoolExecutor(max_workers=max(len(self.stages), 1), thread_name_prefix=f'{self.name}_stage')
+        self._begin = time.monotonic()
+        try:
+            while True:
+                if error is None:
+                    for stage in self.stages.values():
+                        if stage.name not in started and all(dependency in done for dependency in stage.after):
+                            started.add(stage.name)
+                            running[executor.submit(self.__run_stage, stage)] = stage.name
+                if not running:
+                    break
+                finished, _ = wait_futures(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    exception = future.exception()
+                    if exception is None:
+                        done.add(name)
+                    elif error is None:
+                        error = (name, exception)
+        finally:
+            executor.shutdown(wait=True)
+            tracer.complete(self.name, 'mission', self._begin, time.monotonic())
+
+        if error is not None:
+            name, exception = error
+            my_logger.error(f'任务{self.name}在阶段{name}出错，已完成{len(done)}/{len(self.stages)}个阶段: {exception!r}')
+            self.report()
+            raise exception
+        return self.report()
+
+    def __run_stage(self, stage: Stage) -> None:
+        start = time.monotonic() - self._begin
+        my_logger.info('开始阶段{}', stage.name)
+        try:
+            with tracer.span(stage.name, 'stage', resources=stage.resources):
+                stage.action()
+        finally:
+            end = time.monotonic() - self._begin
+            with self._records_lock:
+                self.records[stage.name] = StageRecord(start, end)
+            my_logger.info('阶段{}结束，耗时{:.2f}s', stage.name, end - start)
+
+    def report(self) -> dict:
+        """
+        由最近一次执行的各阶段时间计算关键路径并在日志中输出
+
+        关键路径从最后结束的阶段开始，每次回溯到其依赖中最后结束的阶段，即实际决定该阶段开始时刻的阶段；
+        缩短关键路径以外的阶段不会缩短任务总耗时
+
+        Returns:
+            dict: {'makespan': 总耗时, 'serial': 各阶段耗时之和, 'critical_path': [(阶段名, 耗时, 开始前的等待)],
+                   'resources': {执行机构: 占用时间}}，时间单位为秒
+        """
+        with self._records_lock:
+            records = dict(self.records)
+        if not records:
+            return {}
+
+        path = []
+        name = max(records, key=lambda stage: records[stage].end)
+        while name is not None:
+            finished = [dependency for dependency in self.stages[name].after if dependency in records]
+            previous = max(finished, key=lambda stage: records[stage].end, default=None)
+            gap = records[name].start - (records[previous].end if previous is not None else 0.0)
+            path.append((name, records[name].end - records[name].start, gap))
+            name = previous
+        path.reverse()
+
+        makespan = max(record.end for record in records.values())
+        serial = sum(record.end - record.start for record in records.values())
+        resources = {resource: sum(record.end - record.start for stage, record in records.items()
+                                   if resource in self.stages[stage].resources) for resource in RESOURCES}
+
+        lines = [f'{"关键路径阶段":<36}{"耗时s":>8}{"等待s":>8}']
+        lines += [f'{stage:<36}{duration:>8.2f}{gap:>8.2f}' for stage, duration, gap in path]
+        lines.append(f'总耗时{makespan:.2f}s，各阶段耗时之和{serial:.2f}s，同时执行节省{serial - makespan:.2f}s；占用时间: ' +
+                     '，'.join(f'{resource} {busy:.2f}s' for resource, busy in resources.items()))
+        my_logger.info(f'任务{self.name}执行报告:\n' + '\n'.join(lines))
+
+        return {
+            'makespan': makespan,
+            'serial': serial,
+            'critical_path': path,
+            'resources': resources,
+        }
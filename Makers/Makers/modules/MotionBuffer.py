@@ -0,0 +1,182 @@
+"""
+提供底盘运动合并功能的模块
+
+主要功能包括:
+- 暂存最近一次底盘运动，与紧接着的底盘运动合并后再发送，减少加减速与等待反馈的次数:
+    - 同方向的运动距离相加，如move_X(1.9)后紧接着move_X(1.85)合并为move_X(3.75)
+    - 连续旋转的参数相加，相互抵消时不发送
+    - 相邻且距离相等的前后与左右运动合并为一次斜向运动(见Config.motion_buffer_params，默认关闭)
+- 调用舵机等其他指令或摄像头取帧前先发送暂存的运动
+
+只合并相邻的运动，不调整顺序，合并前后小车的终点相同；斜向合并会把折线路径变为斜线，需通过参数开启。
+暂存的运动在下一条指令、flush或摄像头取帧时才发送，在两条运动之间sleep或等待输入时应先调用flush
+"""
+
+import functools
+import threading
+
+from Config import my_logger, motion_buffer_params
+from modules.MoveControl import CommandLane, MoveControl
+
+# 各类底盘运动对应的MoveControl方法
+_SEND_METHODS = {
+    'X': 'move_X',
+    'Y': 'move_Y',
+    'TL': 'move_Topleft_Lowerright',
+    'TR': 'move_Topright_Lowerleft',
+    'R': 'rotate',
+}
+
+
+class MotionBuffer:
+    """
+    放在MoveControl之前的底盘运动合并缓存，接口与MoveControl一致
+
+    底盘运动(move_X、move_Y、两个斜向运动与rotate)先暂存，能与下一条运动合并时合并，否则发送暂存的运动后暂存新的运动；
+    其他方法在调用前先发送暂存的运动，再调用MoveControl中的同名方法
+
+    方法:
+        move_X、move_Y、move_Topleft_Lowerright、move_Topright_Lowerleft、rotate: 暂存底盘运动
+        flush: 发送暂存的运动并等待执行完毕，可作为Camera.before_capture
+    """
+
+    def __init__(self, control: MoveControl, params: dict = None) -> None:
+        """
+        Args:
+            control(MoveControl): 实际发送指令的MoveControl
+            params(dict): 合并参数，默认使用Config.motion_buffer_params
+
+        Returns:
+            None
+        """
+        self.control = control
+        self.params = dict(motion_buffer_params if params is None else params)
+        # 暂存的运动: [类型, 距离(米)或rotate的参数]，None表示没有暂存的运动
+        self._pending = None
+        # 任务阶段可能在不同线程中调用底盘运动与其他方法(见Mission.py)，暂存与发送在锁内完成
+        self._lock = threading.RLock()
+        # 合并统计: 收到的运动数、实际发送的运动数、合并次数、斜向合并次数、相互抵消次数
+        self.stats = {'received': 0, 'sent': 0, 'merged': 0, 'diagonal': 0, 'cancelled': 0}
+
+    def __getattr__(self, name: str):
+        if name == 'control':
+            raise AttributeError(name)
+        attr = getattr(self.control, name)
+        if isinstance(attr, CommandLane):
+            # 通道中的指令与暂存的运动没有先后关系，先发送暂存的运动
+            self.flush()
+            return attr
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def flushed(*args, **kwargs):
+            self.flush()
+            return attr(*args, **kwargs)
+
+        return flushed
+
+    def move_X(self, distance: float) -> None:
+        self.__push('X', distance)
+
+    def move_Y(self, distance: float) -> None:
+        self.__push('Y', distance)
+
+    def move_Topleft_Lowerright(self, distance: float) -> None:
+        self.__push('TL', distance)
+
+    def move_Topright_Lowerleft(self, distance: float) -> None:
+        self.__push('TR', distance)
+
+    def rotate(self, angle: int) -> None:
+        self.__push('R', angle)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        发送暂存的运动，并与MoveControl.flush一样等待所有已发送的指令执行完毕
+
+        Args:
+            timeout(float): 传给MoveControl.flush
+
+        Returns:
+            bool: 是否发送了暂存的运动
+        """
+        with self._lock:
+            sent = self._pending is not None
+            if sent:
+                kind, value = self._pending
+                self._pending = None
+                self.stats['sent'] += 1
+                getattr(self.control, _SEND_METHODS[kind])(value)
+        self.control.flush(timeout)
+        return sent
+
+    def __push(self, kind: str, value: float) -> None:
+        """
+        暂存一条底盘运动，能与暂存的运动合并时合并，否则先发送暂存的运动
+
+        Args:
+            kind(str): 运动类型，见_SEND_METHODS
+            value(float): 距离(米)或rotate的参数
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.stats['received'] += 1
+            if self._pending is None:
+                self._pending = [kind, value]
+                return
+
+            merged = self.__merge(self._pending, kind, value)
+            if merged is None:
+                self.flush()
+                self._pending = [kind, value]
+                return
+
+            self.stats['merged'] += 1
+            my_logger.debug('合并底盘运动: {} + {} -> {}', self._pending, [kind, value], merged)
+            if merged[1] == 0:
+                self.stats['cancelled'] += 1
+                self._pending = None
+            else:
+                self._pending = merged
+
+    def __merge(self, pending: list, kind: str, value: float) -> list or None:
+        """
+        合并两条相邻的底盘运动
+
+        Args:
+            pending(list): 暂存的运动
+            kind(str): 新运动的类型
+            value(float): 新运动的距离或角度
+
+        Returns:
+            list or None: 合并后的运动，值为0表示相互抵消；不能合并时为None
+        """
+        pending_kind, pending_value = pending
+        if kind == pending_kind:
+            if kind == 'R':
+                # rotate的参数不是度(720为90°)，只相加，不按整圈折算
+                total = pending_value + value
+                if abs(total) > self.params['max_rotation']:
+                    return None
+                return [kind, total]
+            total = round(pending_value + value, 3)
+            if abs(total) > self.params['max_distance']:
+                return None
+            return [kind, total]
+
+        if {kind, pending_kind} == {'X', 'Y'} and self.params['diagonal']:
+            x, y = (value, pending_value) if kind == 'X' else (pending_value, value)
+            if x == 0 or y == 0 or abs(abs(x) - abs(y)) > self.params['diagonal_tolerance']:
+                return None
+            distance = round((abs(x) + abs(y)) / 2 * self.params['diagonal_scale'], 3)
+            if distance > self.params['max_distance']:
+                return None
+            self.stats['diagonal'] += 1
+            # 前后为正方向(前)，左右为正方向(左)时为左上；符号相反时为右上，后退时取负
+            diagonal_kind = 'TL' if (x > 0) == (y > 0) else 'TR'
+            return [diagonal_kind, distance if x > 0 else -distance]
+
+        return None
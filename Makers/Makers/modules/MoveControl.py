@@ -7,11 +7,134 @@
 - 控制舵机运动模式
 """
 
+import functools
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait as wait_futures
+
 import serial
 
-from Config import my_logger, MoveMode, GrabMode
+from Config import my_logger, MoveMode, GrabMode, Feedback, ack_deadline_params
 from modules.Detection import Camera
+from modules.GrabSequence import compile_sequences, load_sequences
+from modules.Latency import LatencyStats, ack_deadline, expected_duration
+from modules.Protocol import (CHASSIS_MODES, COMMAND_LOGS, DISTANCE_MODES, IDEMPOTENT_MODES, ROTATION_MODES, SENT_LOG,
+                              SEQUENCE_MODES, SERVO_MODES, FrameEncoder, FrameText, command_value, encode_pose)
+from modules.ServoTiming import ServoTiming
+from modules.SerialReader import SerialReader
+from modules.Trace import traced, tracer
+
+
+class CommandFuture(Future):
+    """
+    单帧指令的Future，结果为动作完成反馈的接收时间戳，同时记录计算期限与重发所需的信息
+    """
+
+    def __init__(self, mode: MoveMode, expected: float, deadline_at: float) -> None:
+        """
+        Args:
+            mode(MoveMode): 指令模式
+            expected(float): 预计耗时，单位为秒
+            deadline_at(float): 等待反馈的截止时刻(time.monotonic)
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.mode = mode
+        self.lane = 'chassis' if mode in CHASSIS_MODES else 'servo'
+        self.expected = expected
+        self.deadline_at = deadline_at
+        # 可以重发的指令保存一份指令帧
+        self.frame = None
+        self.seq = None
+        self.sent_at = None
+        self.retransmits = 0
+
+
+class CommandLane:
+    """
+    底盘或舵机的指令通道，在通道自己的线程中按调用顺序执行MoveControl的方法，调用立即返回Future
+
+    两个通道的调用可以同时进行: 带序号协议下两个通道的指令交替写入串口，分别等待各自的反馈与舵机等待时间；
+    原协议下反馈不带序号，两个通道的指令仍逐条收发，只是不再阻塞调用方。
+    同一通道中的调用保持调用顺序，不同通道之间没有先后顺序，需要先后顺序时使用MoveControl.barrier
+
+    方法:
+        与MoveControl同名的方法: 交给通道线程执行，返回Future，结果为原方法的返回值
+        submit: 在通道线程中执行任意可调用对象
+        wait: 等待通道中已提交的调用执行完毕
+        busy: 通道中是否有尚未执行完的调用
+        close: 等待通道中已提交的调用执行完后停止通道线程
+    """
+
+    def __init__(self, name: str, control: 'MoveControl', methods: tuple) -> None:
+        """
+        Args:
+            name(str): 通道名，用于线程名与日志
+            control(MoveControl): 执行指令的MoveControl
+            methods(tuple): 通道支持的MoveControl方法名
+
+        Returns:
+            None
+        """
+        self.name = name
+        self.control = control
+        self.methods = frozenset(methods)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{name}_lane')
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        if name.startswith('_') or name not in self.__dict__.get('methods', ()):
+            raise AttributeError(f'{self.__dict__.get("name")}通道不支持{name}')
+        method = getattr(self.control, name)
+
+        @functools.wraps(method)
+        def submitted(*args, **kwargs) -> Future:
+            return self.submit(method, *args, **kwargs)
+
+        return submitted
+
+    def submit(self, method, *args, **kwargs) -> Future:
+        """
+        在通道线程中执行method(*args, **kwargs)
+
+        Returns:
+            Future: 执行完毕时完成，结果为method的返回值
+        """
+        future = self._executor.submit(method, *args, **kwargs)
+        with self._lock:
+            self._futures = [pending for pending in self._futures if not pending.done()]
+            self._futures.append(future)
+        return future
+
+    def busy(self) -> bool:
+        with self._lock:
+            return any(not future.done() for future in self._futures)
+
+    def wait(self, timeout: float = None) -> None:
+        """
+        等待通道中已提交的调用执行完毕，有调用抛出异常时重新抛出第一个异常
+
+        Args:
+            timeout(float): 最长等待时间，单位为秒，None表示一直等待，超时抛出TimeoutError
+
+        Returns:
+            None
+        """
+        with self._lock:
+            futures = list(self._futures)
+        _, not_done = wait_futures(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError(f'{self.name}通道在{timeout}s内未执行完{len(not_done)}个调用')
+        with self._lock:
+            self._futures = [future for future in self._futures if future not in futures]
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
 
 
 class MoveControl:
@@ -22,9 +145,18 @@ class MoveControl:
 
     方法:
         __init__: 进行串口初始化
-        __wait_for_action_done: 等待下位机完成动作
+        __wait_for_action_done: 原协议下等待下位机完成动作，超过期限时重发或报错
+        wait_ack: 等待指令的动作完成反馈，超过期限时重发或报错
         wait_for_start_cmd: 等待下位机发送启动指令
+        close: 停止串口读取线程并关闭串口
+        reconnect: 重新打开串口
+        invalidate_servo_state: 清空舵机状态缓存
         __send_serial_msg: 向下位机发送各模式指令
+        submit: 发送单帧指令但不等待执行完毕，返回在收到对应反馈时完成的Future
+        flush: 等待所有已发送的指令执行完毕
+        barrier: 等待底盘与舵机通道中的调用及所有已发送的指令执行完毕
+        pose: 同时设置多个舵机的角度
+        run_sequence: 执行舵机动作序列
         move_X: 控制小车前后运动
         move_Y: 控制小车左右运动
         move_Topleft_Lowerright: 控制小车左上-右下运动
@@ -40,24 +172,49 @@ class MoveControl:
         backdoor: 控制后门
         cirque: 控制圆环
         clear_buffer: 清空缓存区
+
+    属性chassis_lane与servo_lane为底盘与舵机的指令通道(见CommandLane)，例如在小车移动的同时调整姿态:
+
+        control.servo_lane.highest()
+        control.chassis_lane.move_X(0.6)
+        control.barrier()
     """
 
-    def __init__(self, port: str, baudrate: int) -> None:
+    # 各通道支持的方法；校准会清空舵机状态缓存，不放入通道，应在barrier之后直接调用
+    CHASSIS_METHODS = ('move_X', 'move_Y', 'move_Topleft_Lowerright', 'move_Topright_Lowerleft', 'rotate')
+    SERVO_METHODS = ('servo', 'bigarm', 'forearm', 'frontpaws', 'hindpaws', 'frontdoor', 'backdoor', 'cirque', 'pose',
+                     'run_sequence', 'highest', 'advance')
+
+    def __init__(self, port: str, baudrate: int, protocol: str = 'legacy', window: int = 4,
+                 serial_port=None, pose_frames: bool = False, parallel_lanes: bool = False) -> None:
         """
         串口初始化
 
         Args:
             port(str): 设备端口号
             baudrate(int): 波特率
+            protocol(str): 通信协议，'legacy'为原协议，每条指令发送后等待执行完毕；
+                           'sequenced'为带序号的协议，指令帧为[0xFF, 模式, 高字节, 低字节, 序号, 0xFE]，
+                           反馈帧为[0xFF, 0x01, 序号, 0xFE]，最多可同时有window条指令等待反馈
+            window(int): 带序号协议下同时等待反馈的最大指令数
+            serial_port: 已打开的串口对象，用于注入模拟串口(见Simulator.py)，指定时忽略port与baudrate
+            pose_frames(bool): 下位机是否支持多舵机姿态帧(MoveMode.Pose)，不支持时姿态按舵机逐个发送
+            parallel_lanes(bool): 下位机是否同时执行底盘与舵机指令，是时两者的期限分别从各自已发送指令预计执行完的时刻算起
 
         Returns:
             None
         """
+        if protocol not in ('legacy', 'sequenced'):
+            raise ValueError(f'不支持的通信协议: {protocol}')
+
         my_logger.info(f'正在初始化串口')
-        try:
-            self._serial = serial.Serial(port, baudrate)
-        except serial.SerialException as e:
-            my_logger.error(e)
+        if serial_port is not None:
+            self._serial = serial_port
+        else:
+            try:
+                self._serial = serial.Serial(port, baudrate)
+            except serial.SerialException as e:
+                my_logger.error(e)
 
         if self._serial.is_open:
             my_logger.info("串口成功初始化")
@@ -66,239 +223,455 @@ class MoveControl:
 
         self.buffer_format = [0xFF, 0x00, 0x00, 0xFE]
 
-    def __wait_for_action_done(self) -> None:
+        # 等待动作完成反馈的最长时间，单位为秒，None表示按每条指令的预计耗时计算期限(见Config.ack_deadline_params)
+        self.ack_timeout = None
+        self.max_retransmits = ack_deadline_params['retransmits']
+        # 各模式从发送到收到反馈的延迟，close时输出
+        self.latency = LatencyStats()
+        # 带序号协议下下位机预计执行完已发送指令的时刻，排队中的指令的期限从该时刻算起；
+        # 下位机同时执行底盘与舵机指令时按通道分别记录
+        self.parallel_lanes = parallel_lanes
+        self._busy_until = {}
+
+        # 下位机反馈由后台线程读取解析，按类型放入队列
+        # 带序号协议下等待反馈的指令，序号取值为0~0xFD，避开帧头帧尾
+        self.protocol = protocol
+        self._window_size = window
+        self._window = threading.BoundedSemaphore(window)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_seq = 0
+        # 单帧指令编码进复用的buffer，编码与写入串口在_write_lock内完成
+        self._encoder = FrameEncoder(sequenced=protocol == 'sequenced')
+        self._write_lock = threading.Lock()
+        # 原协议下反馈不带序号，同一时间只能有一条指令在等待反馈
+        self._exchange_lock = threading.Lock()
+
+        self.__start_reader()
+
+        self.pose_frames = pose_frames
+        # 各舵机最近一次发送的角度，与之相同的舵机指令会被跳过；校准或重连后清空
+        self._servo_state = {}
+        # 舵机指令收到反馈后按转动角度计算等待时间
+        self.servo_timing = ServoTiming()
+        # 舵机动作序列在启动时编译为预先编码好的指令帧
+        self.sequences = compile_sequences(load_sequences())
+        self._servo_methods = {
+            MoveMode.Bigarm: self.bigarm,
+            MoveMode.Forearm: self.forearm,
+            MoveMode.Frontpaws: self.frontpaws,
+            MoveMode.Hindpaws: self.hindpaws,
+            MoveMode.Frontdoor: self.frontdoor,
+            MoveMode.Backdoor: self.backdoor,
+            MoveMode.Cirque: self.cirque,
+        }
+
+        self.chassis_lane = CommandLane('chassis', self, self.CHASSIS_METHODS)
+        self.servo_lane = CommandLane('servo', self, self.SERVO_METHODS)
+
+    def __start_reader(self) -> None:
         """
-        上位机向下位机发送动作指令后，下位机应该在动作执行结束后向上位机反馈动作结束的命令
-        此方法用于等待下位机的结束指令[0xFF, 0x01, 0xFE]
+        启动串口读取线程，下位机反馈由后台线程读取解析，按类型放入队列
 
         Returns:
             None
         """
-        while True:
-            head = ord(self._serial.read(1))
-            if head == 0xFF:
-                data = ord(self._serial.read(1))
-                if data == 0x01:
-                    self._serial.read(1)
-                    self._serial.reset_input_buffer()
-                    break
+        self._reader = SerialReader(self._serial)
+        if self.protocol == 'sequenced':
+            self._reader.subscribe(Feedback.ActionDone, self.__on_action_done)
+        self._reader.start()
 
-    def wait_for_start_cmd(self) -> None:
+    def reconnect(self) -> None:
         """
-        等待下位机的开启指令，指令设置为[0xFF, 0x10, 0xFE]
+        重新打开串口并重启读取线程。尚未收到反馈的指令以ConnectionError结束，舵机状态缓存清空
 
         Returns:
-            None: 函数结束代表受到了指令
+            None
+        """
+        my_logger.info(f'正在重新连接串口')
+        self._reader.stop()
+        self._serial.close()
+
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._next_seq = 0
+            self._busy_until.clear()
+        self._window = threading.BoundedSemaphore(self._window_size)
+        for future in pending:
+            future.set_exception(ConnectionError('串口已重新连接，指令结果未知'))
+
+        self._serial.open()
+        self.__start_reader()
+        self.invalidate_servo_state()
+        my_logger.info(f'串口重新连接成功')
+
+    def invalidate_servo_state(self) -> None:
+        """
+        清空舵机状态缓存，之后的舵机指令都会实际发送
+
+        Returns:
+            None
+        """
+        self._servo_state.clear()
+
+    def __servo_unchanged(self, mode: MoveMode, angle: int, force: bool) -> bool:
+        """
+        判断舵机指令的角度是否与上次发送的相同
+
+        Args:
+            mode(MoveMode): 舵机
+            angle(int): 角度，按与__send_serial_msg相同的方式取绝对值并截取到[0, 180]
+            force(bool): 为True时总是返回False
+
+        Returns:
+            bool: 相同且未强制发送时为True
+        """
+        if force:
+            return False
+        angle = abs(int(angle))
+        if angle > 180:
+            angle %= 180
+        if self._servo_state.get(mode) != angle:
+            return False
+        my_logger.debug('{}已处于{}°，跳过该指令', mode.name, angle)
+        return True
+
+    def __wait_for_action_done(self, future: CommandFuture) -> float:
+        """
+        上位机向下位机发送动作指令后，下位机应该在动作执行结束后向上位机反馈动作结束的命令
+        此方法用于在原协议下等待下位机的结束指令[0xFF, 0x01, 0xFE]，超过期限仍未收到时重发或抛出TimeoutError
+
+        Args:
+            future(CommandFuture): 已发送的指令
+
+        Returns:
+            float: 反馈的接收时间戳
         """
         while True:
-            head = ord(self._serial.read(1))
-            if head == 0xFF:
-                data = ord(self._serial.read(1))
-                if data == 0x10:
-                    self._serial.read(1)
-                    self._serial.reset_input_buffer()
-                    my_logger.info(f"接收到了下位机的启动消息！")
-                    break
+            try:
+                timestamp, _ = self._reader.wait(Feedback.ActionDone,
+                                                 timeout=max(future.deadline_at - time.monotonic(), 0.0))
+                break
+            except TimeoutError:
+                self.__retransmit(future)
+        self.latency.record(future.mode, timestamp - future.sent_at, future.expected)
+        tracer.async_span(future.mode.name, 'frame', future.sent_at, timestamp, {'retransmits': future.retransmits})
+        return timestamp
+
+    def __deadline(self, mode: MoveMode, value: int) -> tuple:
+        """
+        计算指令的预计耗时与等待反馈的截止时刻，带序号协议下从已发送指令预计执行完的时刻算起
 
-    def __send_serial_msg(self, mode: MoveMode, grab_mode: GrabMode = None, distance: float = None,
-                          rotation_angle: int = None) -> None:
+        Args:
+            mode(MoveMode): 指令模式
+            value(int): 帧中的参数
+
+        Returns:
+            tuple: (预计耗时秒, 截止时刻)
+        """
+        now = time.monotonic()
+        expected = expected_duration(mode, value)
+        start = now
+        if self.protocol == 'sequenced':
+            timeline = self.__timeline(mode)
+            start = max(now, self._busy_until.get(timeline, 0.0))
+            self._busy_until[timeline] = start + expected
+        deadline = self.ack_timeout if self.ack_timeout is not None else ack_deadline(expected)
+        return expected, start + deadline
+
+    def __timeline(self, mode: MoveMode) -> str or None:
+        """
+        Args:
+            mode(MoveMode): 指令模式
+
+        Returns:
+            str or None: 下位机同时执行底盘与舵机指令时为指令所在的通道，否则所有指令依次执行，为None
+        """
+        if not self.parallel_lanes:
+            return None
+        return 'chassis' if mode in CHASSIS_MODES else 'servo'
+
+    def __retransmit(self, future: CommandFuture) -> None:
         """
-        发送串口指令给下位机，在被调用时会先对输入的数据进行检查；发送完指令后调用self.__wait_for_action_done()等待下位机反馈
+        等待反馈超时后重发指令。只重发参数为绝对角度的指令，运动与旋转重复执行会多走，超时时直接报错
 
         Args:
-            mode (MoveMode): 运动模式，详情见Config.py
-            grab_mode(GrabMode): 舵机模式，详情见Config.py
-            distance (float): 运动距离，单位为mm
-            rotation_angle (int): 旋转角度，单位为度
+            future(CommandFuture): 超时的指令
+
         Returns:
-            None: 函数结束代表发送成功并且收到了下位机的执行结束消息
+            None
+        """
+        name = future.mode.name
+        if future.frame is None or future.retransmits >= self.max_retransmits:
+            reason = f'已重发{future.retransmits}次' if future.frame is not None else '该指令不能重发'
+            raise TimeoutError(f'{name}指令在期限内未收到动作完成反馈({reason}，预计耗时{future.expected:.2f}s)，'
+                               f'请检查串口连接与下位机')
+        future.retransmits += 1
+        my_logger.warning(f'{name}指令等待反馈超时，第{future.retransmits}次重发')
+        with self._write_lock:
+            future.sent_at = time.monotonic()
+            future.deadline_at = future.sent_at + (self.ack_timeout if self.ack_timeout is not None
+                                                   else ack_deadline(future.expected))
+            self._serial.write(future.frame)
+
+    def wait_ack(self, future: CommandFuture) -> float:
         """
-        buffer = []
-        log_msg = f''
+        等待指令的动作完成反馈，超过期限时重发可以重发的指令，仍未收到时抛出TimeoutError
+
+        Args:
+            future(CommandFuture): submit等方法返回的Future
 
-        # 对输入数据进行检查
-        if mode in [MoveMode.Forward, MoveMode.Backward, MoveMode.Leftward, MoveMode.Rightward, MoveMode.Topleft,
-                    MoveMode.Topright, MoveMode.Lowerleft, MoveMode.Lowerright]:
-            if distance is None:
-                raise ValueError
-            if -32.768 <= distance <= 32.767:
+        Returns:
+            float: 反馈的接收时间戳
+        """
+        while True:
+            try:
+                return future.result(timeout=max(future.deadline_at - time.monotonic(), 0.0))
+            except FutureTimeoutError:
                 pass
-            else:
-                my_logger.warning(f"距离设置范围过大，目前支持[-32.768, 32.767] m。截取距离的低十六位")
+            try:
+                self.__retransmit(future)
+            except TimeoutError as e:
+                # 放弃这条指令，释放其占用的窗口
+                with self._pending_lock:
+                    abandoned = self._pending.get(future.seq) is future
+                    if abandoned:
+                        del self._pending[future.seq]
+                if abandoned:
+                    self._window.release()
+                    future.set_exception(e)
+                raise
+
+    def __on_action_done(self, timestamp: float, payload: bytes) -> None:
+        """
+        带序号协议下，在读取线程中处理动作完成反馈，完成序号对应的Future
 
-        elif mode in [MoveMode.Turnleft, MoveMode.Turnright]:
-            if rotation_angle is None:
-                raise ValueError
-            rotation_angle = abs(rotation_angle)
+        Args:
+            timestamp(float): 接收时间戳
+            payload(bytes): 反馈数据，第一个字节为序号
 
-        elif mode in [MoveMode.Calibration, MoveMode.Servo, MoveMode.Highest, MoveMode.Advance]:
-            pass
+        Returns:
+            None
+        """
+        if not payload:
+            my_logger.warning(f'带序号协议下接收到了不带序号的动作完成反馈')
+            return
+        with self._pending_lock:
+            future = self._pending.pop(payload[0], None)
+            # 下位机执行完这条指令，之后预计只需执行同一时间线上仍在等待反馈的指令
+            if future is not None:
+                timeline = self.__timeline(future.mode)
+                self._busy_until[timeline] = timestamp + sum(
+                    pending.expected for pending in self._pending.values()
+                    if self.__timeline(pending.mode) == timeline)
+        if future is None:
+            my_logger.warning(f'接收到了未知序号{payload[0]}的动作完成反馈')
+            return
+        self._window.release()
+        my_logger.debug('序号{}的指令执行完毕', payload[0])
+        self.latency.record(future.mode, timestamp - future.sent_at, future.expected)
+        tracer.async_span(future.mode.name, 'frame', future.sent_at, timestamp,
+                          {'seq': future.seq, 'retransmits': future.retransmits})
+        future.set_result(timestamp)
+
+    def __transmit(self, frame: bytes or None, log_msg: str, *log_args, mode: MoveMode = None,
+                   value: int = 0) -> Future:
+        """
+        发送一帧指令。原协议下等待执行完毕后返回已完成的Future；
+        带序号协议下在帧尾前插入序号，窗口已满时先等待，发送后立即返回
 
-        elif mode in [MoveMode.Bigarm, MoveMode.Forearm, MoveMode.Frontpaws, MoveMode.Hindpaws, MoveMode.Frontdoor,
-                      MoveMode.Backdoor, MoveMode.Cirque]:
-            if rotation_angle is None:
-                raise ValueError
-            rotation_angle = abs(rotation_angle)
-            if rotation_angle > 180:
-                rotation_angle %= 180
-                my_logger.warning(f"舵机模式下，输入的角度不在[-180，180]之间，将取值为{rotation_angle}")
+        Args:
+            frame(bytes or None): 预先编码好的不含序号的指令帧(姿态帧、编译好的序列)，为None时按mode与value编码单帧指令
+            log_msg(str): 预先编码的帧的日志信息；单帧指令使用Protocol.COMMAND_LOGS中的模板，此参数被忽略
+            *log_args: 单帧指令日志模板的参数(模式名、原始距离、帧中的参数)，只在日志需要输出时才格式化
+            mode(MoveMode): frame为None时的模式
+            value(int): frame为None时帧中的参数
 
+        Returns:
+            CommandFuture: 收到动作完成反馈时完成，结果为反馈的接收时间戳
+        """
+        if frame is None:
+            template = COMMAND_LOGS[mode]
         else:
-            my_logger.error(f"无法识别的Move模式：{mode}")
+            template = SENT_LOG + log_msg
+            mode = MoveMode(frame[1])
+        if self.protocol == 'legacy':
+            with self._exchange_lock:
+                # 同一时间只有一条指令在执行，发送前到达的动作完成反馈不属于这条指令
+                stale = self._reader.discard(Feedback.ActionDone)
+                if stale:
+                    my_logger.warning(f'丢弃了{stale}条过期的动作完成反馈')
+                future = CommandFuture(mode, *self.__deadline(mode, value))
+                with self._write_lock:
+                    if frame is None:
+                        frame = self._encoder.encode(mode, value)
+                    if mode in IDEMPOTENT_MODES:
+                        future.frame = bytes(frame)
+                    future.sent_at = time.monotonic()
+                    send_num = self._serial.write(frame)
+                    my_logger.debug(template, send_num, FrameText(frame), *log_args)
+                future.set_result(self.__wait_for_action_done(future))
+            return future
+
+        if not self._window.acquire(blocking=False):
+            # 窗口已满，等待期限最早的指令，超过期限时重发或报错并释放窗口
+            with self._pending_lock:
+                oldest = min(self._pending.values(), key=lambda pending: pending.deadline_at, default=None)
+            if oldest is not None:
+                self.wait_ack(oldest)
+            if not self._window.acquire(timeout=self.ack_timeout):
+                raise TimeoutError(f'等待发送窗口超时({self.ack_timeout}s)')
+        with self._pending_lock:
+            future = CommandFuture(mode, *self.__deadline(mode, value))
+            seq = self._next_seq
+            self._next_seq = (seq + 1) % 0xFE
+            self._pending[seq] = future
+            future.seq = seq
+        with self._write_lock:
+            if frame is None:
+                frame = self._encoder.encode(mode, value, seq)
+            else:
+                frame = frame[:-1] + bytes((seq, frame[-1]))
+            if mode in IDEMPOTENT_MODES:
+                future.frame = bytes(frame)
+            future.sent_at = time.monotonic()
+            send_num = self._serial.write(frame)
+            my_logger.debug(template, send_num, FrameText(frame), *log_args)
+        return future
+
+    def submit(self, mode: MoveMode, distance: float = None, rotation_angle: int = None) -> Future:
+        """
+        发送单帧指令(运动、旋转、校准与单个舵机)但不等待执行完毕。
+        带序号协议下可以连续提交多条指令，不必在每条指令之间等待一次往返；原协议下仍会等待执行完毕
+
+        Args:
+            mode (MoveMode): 运动模式，不支持Servo、Highest、Advance等由多条指令组成的模式
+            distance (float): 运动距离，单位为米
+            rotation_angle (int): 旋转角度，单位为度
+
+        Returns:
+            Future: 收到动作完成反馈时完成，结果为反馈的接收时间戳；距离或角度为0的运动不发送，返回None
+        """
+        if mode in SEQUENCE_MODES:
+            raise ValueError(f'{mode.name}模式由多条指令组成，不能直接提交')
+        return self.__send_serial_msg(mode=mode, distance=distance, rotation_angle=rotation_angle, wait=False)
+
+    def flush(self, timeout: float = None) -> None:
+        """
+        等待所有已发送的指令执行完毕
 
-        if mode in [MoveMode.Forward, MoveMode.Backward, MoveMode.Leftward, MoveMode.Rightward, MoveMode.Topleft,
-                    MoveMode.Topright, MoveMode.Lowerleft, MoveMode.Lowerright]:
+        Args:
+            timeout(float): 每条指令的最长等待时间，单位为秒，None表示按各指令的期限等待(见wait_ack)
+
+        Returns:
+            None
+        """
+        with self._pending_lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            if timeout is None:
+                self.wait_ack(future)
+            else:
+                future.result(timeout=timeout)
 
-            dis_mm = int(distance * 1000)
-            high_byte: int = dis_mm // 256
-            low_byte = dis_mm % 256
+    def barrier(self, timeout: float = None) -> None:
+        """
+        等待底盘与舵机通道中已提交的调用全部执行完毕，再等待所有已发送的指令执行完毕；
+        之后的调用从小车与舵机都已停止的状态开始。有调用抛出异常时，等两个通道都结束后重新抛出第一个异常
 
-            buffer = [0xFF, mode.value, high_byte, low_byte, 0xFE]
+        Args:
+            timeout(float): 每个通道的最长等待时间，单位为秒，None表示一直等待
 
-            log_msg = f'动作模式为{mode.name}，使用米作为单位，原始移动距离为{distance}m。'
+        Returns:
+            None
+        """
+        errors = []
+        for lane in (self.chassis_lane, self.servo_lane):
+            try:
+                lane.wait(timeout)
+            except Exception as e:
+                errors.append(e)
+        self.flush(timeout)
+        if errors:
+            raise errors[0]
+
+    def wait_for_start_cmd(self, timeout: float = None) -> None:
+        """
+        等待下位机的开启指令，指令设置为[0xFF, 0x10, 0xFE]
 
-        elif mode in [MoveMode.Turnleft, MoveMode.Turnright]:
-            rotation_angle_ = abs(int(rotation_angle))
-            high_byte = rotation_angle // 256
-            low_byte = rotation_angle % 256
+        Args:
+            timeout(float): 最长等待时间，单位为秒，None表示一直等待，超时抛出TimeoutError
 
-            buffer = [0xFF, mode.value, high_byte, low_byte, 0xFE]
-            log_msg = f'动作模式为旋转，使用度作为单位，原始输入为{rotation_angle_}度'
+        Returns:
+            None: 函数结束代表受到了指令
+        """
+        self._reader.wait(Feedback.Start, timeout=timeout)
+        tracer.instant('start_cmd', 'serial')
+        my_logger.info(f"接收到了下位机的启动消息！")
 
-        elif mode == MoveMode.Calibration:
-            buffer = [0xFF, mode.value, 30, 2, 0xFE]
-            log_msg = f'动作模式为校准'
+    def close(self) -> None:
+        """
+        等待底盘与舵机通道中已提交的调用执行完，停止串口读取线程并关闭串口，并在日志中输出各模式的指令延迟统计
 
-        elif mode == MoveMode.Servo:
-            my_logger.info(f'执行{grab_mode.name}')
-            if grab_mode == GrabMode.Big_Diameter:
-                time.sleep(0.04)
-                self.frontpaws(angle=70)
-                time.sleep(0.1)
-                self.frontpaws(angle=10)
-            elif grab_mode == GrabMode.Small_Diameter:
-                pass
-            elif grab_mode == GrabMode.Platform_Low_Start:
-                self.bigarm(angle=110)
-                self.forearm(angle=58)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.cirque(angle=0)
-            elif grab_mode == GrabMode.Platform_Low_End:
-                self.hindpaws(angle=64)
-                self.frontpaws(angle=46)
-                self.forearm(angle=40)
-                self.bigarm(angle=30)
-                time.sleep(0.3)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-            elif grab_mode == GrabMode.Platform_Low_End_Circle:
-                self.hindpaws(angle=57)
-                self.frontpaws(angle=46)
-                self.cirque(angle=67)
-                self.forearm(angle=20)
-                self.forearm(angle=35)
-                self.bigarm(angle=44)
-                time.sleep(0.3)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.frontpaws(angle=60)
-            elif grab_mode == GrabMode.Platform_High_Start:
-                self.bigarm(angle=105)
-                self.forearm(angle=21)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.cirque(angle=0)
-            elif grab_mode == GrabMode.Platform_High_End:
-                self.hindpaws(angle=64)
-                self.frontpaws(angle=46)
-                self.forearm(angle=40)
-                self.bigarm(angle=30)
-                time.sleep(0.3)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.frontpaws(angle=60)
-            elif grab_mode == GrabMode.Platform_High_End_Circle:
-                self.hindpaws(angle=57)
-                self.frontpaws(angle=46)
-                self.cirque(angle=67)
-                self.forearm(angle=20)
-                self.bigarm(angle=44)
-                self.forearm(angle=35)
-                time.sleep(0.3)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.frontpaws(angle=60)
-    
-            elif grab_mode == GrabMode.Platform_Medium_Start:
-                self.bigarm(angle=110)
-                self.forearm(angle=40)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.cirque(angle=0)
-            elif grab_mode == GrabMode.Platform_Medium_End:
-                self.hindpaws(angle=64)
-                self.frontpaws(angle=46)
-                self.forearm(angle=40)
-                self.bigarm(angle=30)
-                time.sleep(0.3)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-            elif grab_mode == GrabMode.Platform_Medium_End_Circle:
-                self.hindpaws(angle=57)
-                self.frontpaws(angle=44)
-                self.cirque(angle=67)
-                self.forearm(angle=20)
-                self.forearm(angle=35)
-                self.bigarm(angle=44)
-                time.sleep(0.3)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.frontpaws(angle=60)
-            elif grab_mode == GrabMode.Put_Circle:
-                self.cirque(angle=67)
-                self.forearm(angle=48)
-                self.bigarm(angle=46)
-                self.hindpaws(angle=57)
-                self.frontpaws(angle=46)
-                self.forearm(angle=20)
-                self.bigarm(angle=90)
-                self.forearm(angle=25)
-                self.bigarm(angle=100)
-                time.sleep(0.4)
-                self.hindpaws(angle=0)
-                self.frontpaws(angle=0)
-                self.cirque(angle=0)
-
-        elif mode in [MoveMode.Bigarm, MoveMode.Forearm, MoveMode.Frontpaws, MoveMode.Hindpaws, MoveMode.Frontdoor,
-                      MoveMode.Backdoor, MoveMode.Cirque]:
-            rotation_angle_ = abs(int(rotation_angle))
-
-            buffer = [0xFF, mode.value, 0, rotation_angle_, 0xFE]
-            log_msg = f'{mode.name}参数为{rotation_angle_}'
-
-        elif mode == MoveMode.Highest:
-            my_logger.info(f'升至最高点')
-            self.bigarm(angle=90)
-            self.forearm(angle=20)
-            self.cirque(angle=0)
-            self.frontpaws(angle=0)
-            self.hindpaws(angle=0)
-
-        elif mode == MoveMode.Advance:
-            my_logger.info(f'init')
-            self.bigarm(angle=40)
-            self.forearm(angle=40)
+        Returns:
+            None
+        """
+        self.chassis_lane.close()
+        self.servo_lane.close()
+        self._reader.stop()
+        self._serial.close()
+        self.latency.dump()
 
-        else:
-            raise ValueError(f'无法识别的模式{mode}')
+    def __send_serial_msg(self, mode: MoveMode, grab_mode: GrabMode = None, distance: float = None,
+                          rotation_angle: int = None, wait: bool = True) -> Future or None:
+        """
+        发送串口指令给下位机，在被调用时会先对输入的数据进行检查；发送完指令后等待下位机反馈
 
-        if mode not in [MoveMode.Servo, MoveMode.Highest, MoveMode.Advance]:
-            send_num = self._serial.write(bytes(buffer))
-            my_logger.debug(f"向下位机发送了{send_num}个字节的数据，数据内容为{buffer}。" + log_msg)
-            self.__wait_for_action_done()
+        Args:
+            mode (MoveMode): 运动模式，详情见Config.py
+            grab_mode(GrabMode): 舵机模式，详情见Config.py
+            distance (float): 运动距离，单位为mm
+            rotation_angle (int): 旋转角度，单位为度
+            wait(bool): 是否等待执行完毕，为False时只发送指令并返回Future，仅对单帧指令有效
+        Returns:
+            Future: 单帧指令的Future，wait为True时函数结束代表发送成功并且收到了下位机的执行结束消息；
+                    距离或角度为0的运动不发送，返回None
+        """
+        if mode in SEQUENCE_MODES:
+            if mode == MoveMode.Servo:
+                my_logger.info('执行{}', grab_mode.name)
+                self.run_sequence(grab_mode.name)
+            elif mode == MoveMode.Highest:
+                my_logger.info(f'升至最高点')
+                self.run_sequence('Highest')
+            else:
+                my_logger.info(f'init')
+                self.run_sequence('Advance')
+            return None
+
+        # 检查参数并换算为帧中的参数，编码见Protocol.py
+        value = command_value(mode, distance, rotation_angle)
+        # 距离或角度为0的运动也要约2s才有反馈(见Config.ack_deadline_params)，不发送
+        if value == 0 and (mode in DISTANCE_MODES or mode in ROTATION_MODES):
+            my_logger.debug('{}的参数为0，跳过该指令', mode.name)
+            return None
+
+        # 发送前先清除该舵机的状态，发送失败或等待超时时其角度视为未知
+        servo = mode in SERVO_MODES
+        if servo:
+            self._servo_state.pop(mode, None)
+        future = self.__transmit(None, '', mode.name, distance, value, mode=mode, value=value)
+        if wait:
+            self.wait_ack(future)
             my_logger.info(f"接收到串口消息，下位机动作执行完毕")
+            if servo:
+                self._servo_state[mode] = value
+        elif servo:
+            future.add_done_callback(functools.partial(self.__remember_servo_angles, {mode: value}))
+        return future
 
+    @traced('move')
     def move_X(self, distance: float) -> None:
         """
         控制小车前后方向上的移动
@@ -316,6 +689,7 @@ class MoveControl:
             self.__send_serial_msg(mode=MoveMode.Backward, distance=distance)
             my_logger.info(f"后退{distance}m")
 
+    @traced('move')
     def move_Y(self, distance: float) -> None:
         """
         控制小车左右方向上的移动
@@ -333,6 +707,7 @@ class MoveControl:
             self.__send_serial_msg(mode=MoveMode.Rightward, distance=distance)
             my_logger.info(f"向右{distance}m")
 
+    @traced('move')
     def move_Topleft_Lowerright(self, distance: float) -> None:
         """
         控制小车左上-右下方向上的移动
@@ -350,6 +725,7 @@ class MoveControl:
             self.__send_serial_msg(mode=MoveMode.Lowerright, distance=distance)
             my_logger.info(f"向右下{distance}m")
 
+    @traced('move')
     def move_Topright_Lowerleft(self, distance: float) -> None:
         """
         控制小车右上-左下方向上的移动
@@ -367,12 +743,13 @@ class MoveControl:
             self.__send_serial_msg(mode=MoveMode.Lowerleft, distance=distance)
             my_logger.info(f"向左下{distance}m")
 
+    @traced('move')
     def rotate(self, angle: int) -> None:
         """
         控制小车底盘旋转
 
         Args:
-            angle (int): 角度值，单位为度，范围为[-360, 360]，逆时针方向为正
+            angle (int): 下位机的旋转参数，不是度(720为90°，1440为180°)，逆时针方向为正
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
@@ -384,6 +761,7 @@ class MoveControl:
             self.__send_serial_msg(mode=MoveMode.Turnright, rotation_angle=angle)
             my_logger.info(f"向右转 {angle}m")
 
+    @traced('move')
     def calibration(self) -> None:
         """
         小车校准
@@ -392,8 +770,10 @@ class MoveControl:
             None: 延时程序，函数返回时代表动作完成
         """
         self.__send_serial_msg(mode=MoveMode.Calibration)
+        self.invalidate_servo_state()
         my_logger.info(f"进行校准")
 
+    @traced('servo')
     def servo(self, grab_mode: GrabMode) -> None:
         """
         控制舵机
@@ -406,101 +786,261 @@ class MoveControl:
         self.__send_serial_msg(mode=MoveMode.Servo, grab_mode=grab_mode)
         my_logger.info(f"选取的舵机模式为{grab_mode.name}")
 
-    def bigarm(self, angle: int) -> None:
+    @traced('servo')
+    def bigarm(self, angle: int, force: bool = False) -> None:
         """
         控制大臂
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Bigarm, angle, force):
+            return
+        previous = self._servo_state.get(MoveMode.Bigarm)
         self.__send_serial_msg(mode=MoveMode.Bigarm, rotation_angle=angle)
         my_logger.info(f"大臂角度: {angle}°")
-        time.sleep(0.4)
+        time.sleep(self.servo_timing.dwell(MoveMode.Bigarm, previous, self._servo_state[MoveMode.Bigarm]))
         pass
 
-    def forearm(self, angle: int) -> None:
+    @traced('servo')
+    def forearm(self, angle: int, force: bool = False) -> None:
         """
         控制小臂
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Forearm, angle, force):
+            return
+        previous = self._servo_state.get(MoveMode.Forearm)
         self.__send_serial_msg(mode=MoveMode.Forearm, rotation_angle=angle)
         my_logger.info(f"小臂角度: {angle}°")
-        time.sleep(0.4)
+        time.sleep(self.servo_timing.dwell(MoveMode.Forearm, previous, self._servo_state[MoveMode.Forearm]))
 
-    def frontpaws(self, angle: int) -> None:
+    @traced('servo')
+    def frontpaws(self, angle: int, force: bool = False) -> None:
         """
         控制前爪
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Frontpaws, angle, force):
+            return
+        previous = self._servo_state.get(MoveMode.Frontpaws)
         self.__send_serial_msg(mode=MoveMode.Frontpaws, rotation_angle=angle)
         my_logger.info(f"前爪角度: {angle}°")
-        time.sleep(0.2)
+        time.sleep(self.servo_timing.dwell(MoveMode.Frontpaws, previous, self._servo_state[MoveMode.Frontpaws]))
 
-    def hindpaws(self, angle: int) -> None:
+    @traced('servo')
+    def hindpaws(self, angle: int, force: bool = False) -> None:
         """
         控制后爪
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Hindpaws, angle, force):
+            return
+        previous = self._servo_state.get(MoveMode.Hindpaws)
         self.__send_serial_msg(mode=MoveMode.Hindpaws, rotation_angle=angle)
         my_logger.info(f"后爪角度: {angle}°")
-        time.sleep(0.4)
+        time.sleep(self.servo_timing.dwell(MoveMode.Hindpaws, previous, self._servo_state[MoveMode.Hindpaws]))
 
-    def frontdoor(self, angle: int) -> None:
+    @traced('servo')
+    def frontdoor(self, angle: int, force: bool = False) -> None:
         """
         控制前门
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Frontdoor, angle, force):
+            return
         self.__send_serial_msg(mode=MoveMode.Frontdoor, rotation_angle=angle)
         my_logger.info(f"前门角度: {angle}°")
 
-    def backdoor(self, angle: int) -> None:
+    @traced('servo')
+    def backdoor(self, angle: int, force: bool = False) -> None:
         """
         控制小臂
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Backdoor, angle, force):
+            return
+        previous = self._servo_state.get(MoveMode.Backdoor)
         self.__send_serial_msg(mode=MoveMode.Backdoor, rotation_angle=angle)
         my_logger.info(f"后门角度: {angle}°")
-        time.sleep(0.4)
+        time.sleep(self.servo_timing.dwell(MoveMode.Backdoor, previous, self._servo_state[MoveMode.Backdoor]))
 
-    def cirque(self, angle: int) -> None:
+    @traced('servo')
+    def cirque(self, angle: int, force: bool = False) -> None:
         """
         控制圆环
 
         Args:
             angle: 角度，范围[0, 180]
+            force: 角度与上次发送的相同时是否仍然发送
         Returns:
             None: 延时程序，函数返回时代表动作完成
         """
+        if self.__servo_unchanged(MoveMode.Cirque, angle, force):
+            return
+        previous = self._servo_state.get(MoveMode.Cirque)
         self.__send_serial_msg(mode=MoveMode.Cirque, rotation_angle=angle)
         my_logger.info(f"圆环角度: {angle}°")
-        time.sleep(0.4)
+        time.sleep(self.servo_timing.dwell(MoveMode.Cirque, previous, self._servo_state[MoveMode.Cirque]))
+
+    @traced('servo')
+    def pose(self, pose: dict, wait: bool = True, force: bool = False) -> Future or None:
+        """
+        同时设置多个舵机的角度，角度与上次发送的相同的舵机会被跳过
+
+        下位机支持姿态帧时只发送一帧，收到反馈后等待各舵机按转动角度计算的等待时间中的最大值；
+        否则按pose中的顺序逐个调用对应的舵机方法，与逐条发送完全相同
+
+        Args:
+            pose(dict): {舵机MoveMode: 角度}
+            wait(bool): 是否等待执行完毕，为False时只发送姿态帧并返回Future，仅在支持姿态帧时有效
+            force(bool): 角度与上次发送的相同时是否仍然发送
+
+        Returns:
+            Future: 姿态帧的Future，逐个发送或所有舵机均被跳过时为None
+        """
+        if not self.pose_frames:
+            for channel, angle in pose.items():
+                self._servo_methods[channel](angle=angle, force=force)
+            return None
+
+        pose = {channel: angle for channel, angle in pose.items()
+                if not self.__servo_unchanged(channel, angle, force)}
+        if not pose:
+            return None
+
+        buffer = bytes(encode_pose(pose))
+        log_msg = '姿态' + '，'.join(f'{MoveMode(channel).name}: {angle}' for channel, angle in pose.items())
+        previous = {channel: self._servo_state.pop(channel, None) for channel in pose}
+        future = self.__transmit(buffer, log_msg)
+        angles = {channel: abs(int(angle)) for channel, angle in pose.items()}
+        if not wait:
+            future.add_done_callback(functools.partial(self.__remember_servo_angles, angles))
+            return future
+        self.wait_ack(future)
+        my_logger.info(f"接收到串口消息，下位机动作执行完毕")
+        self._servo_state.update(angles)
+        time.sleep(max(self.servo_timing.dwell(channel, previous[channel], angles[channel]) for channel in pose))
+        return future
+
+    def __remember_servo_angles(self, angles: dict, future: Future) -> None:
+        """
+        不等待执行完毕(wait=False)时，在收到动作完成反馈后再记录舵机角度；超时、出错或取消时角度仍视为未知
+
+        Args:
+            angles(dict): {舵机MoveMode: 角度}
+            future(Future): 指令的Future
+
+        Returns:
+            None
+        """
+        if not future.cancelled() and future.exception() is None:
+            self._servo_state.update(angles)
+
+    @traced('servo')
+    def run_sequence(self, sequence: str or tuple, force: bool = False) -> None:
+        """
+        执行编译好的舵机动作序列，直接发送预先编码的指令帧，不再逐条检查参数与构建指令
+
+        下位机支持姿态帧时每个姿态发送一帧，否则按书写顺序逐个发送；角度与上次发送的相同的舵机会被跳过，
+        姿态中所有舵机均未变化时整个姿态被跳过
+
+        Args:
+            sequence(str or tuple): 序列名(见grab_sequences.json)或compile_sequences编译出的序列
+            force(bool): 角度与上次发送的相同的舵机是否仍然发送
+
+        Returns:
+            None: 延时程序，函数返回时代表动作完成
+        """
+        steps = self.sequences[sequence] if isinstance(sequence, str) else sequence
+        for step in steps:
+            if step.pose is None:
+                time.sleep(step.sleep)
+            elif self.pose_frames:
+                self.__run_pose_step(step, force)
+            else:
+                for command in step.commands:
+                    self.__run_servo_command(command, step.dwell, force)
+
+    def __run_servo_command(self, command, dwell: float or None, force: bool) -> None:
+        """
+        发送一条编译好的舵机指令并等待
+
+        Args:
+            command(ServoCommand): 编译好的舵机指令
+            dwell(float or None): 指定的等待时间，None表示按转动角度计算
+            force(bool): 角度与上次发送的相同时是否仍然发送
+
+        Returns:
+            None
+        """
+        if not force and self._servo_state.get(command.channel) == command.angle:
+            my_logger.debug('{}已处于{}°，跳过该指令', command.channel.name, command.angle)
+            return
+        previous = self._servo_state.pop(command.channel, None)
+        self.wait_ack(self.__transmit(command.frame, command.log_msg))
+        my_logger.info(f"接收到串口消息，下位机动作执行完毕")
+        self._servo_state[command.channel] = command.angle
+        time.sleep(self.servo_timing.dwell(command.channel, previous, command.angle) if dwell is None else dwell)
+
+    def __run_pose_step(self, step, force: bool) -> None:
+        """
+        以一个姿态帧发送编译好的姿态步骤并等待，姿态帧中未变化的舵机会以相同角度重发
+
+        Args:
+            step(SequenceStep): 编译好的姿态步骤
+            force(bool): 所有舵机的角度均与上次发送的相同时是否仍然发送
+
+        Returns:
+            None
+        """
+        if not force and all(self._servo_state.get(channel) == angle for channel, angle in step.pose.items()):
+            my_logger.debug('{}已到位，跳过该姿态', step.pose_log_msg)
+            return
+        previous = {channel: self._servo_state.pop(channel, None) for channel in step.pose}
+        self.wait_ack(self.__transmit(step.pose_frame, step.pose_log_msg))
+        my_logger.info(f"接收到串口消息，下位机动作执行完毕")
+        self._servo_state.update(step.pose)
+        if step.dwell is not None:
+            time.sleep(step.dwell)
+        else:
+            time.sleep(max(self.servo_timing.dwell(channel, previous[channel], angle)
+                           for channel, angle in step.pose.items()))
 
+    @traced('servo')
     def highest(self) -> None:
         self.__send_serial_msg(mode=MoveMode.Highest)
         return None
         
+    @traced('servo')
     def advance(self) -> None:
         self.__send_serial_msg(mode=MoveMode.Advance)
 
@@ -513,6 +1053,7 @@ class MoveControl:
         """
         self._serial.reset_input_buffer()
         self._serial.reset_output_buffer()
+        self._reader.discard()
 
 
 if __name__ == '__main__':
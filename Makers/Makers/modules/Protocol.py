@@ -0,0 +1,200 @@
+"""
+提供上位机指令帧编码与解码功能的模块
+
+主要功能包括:
+- 单帧指令的参数检查与编码，按struct打包进复用的bytearray
+- 多舵机姿态帧(MoveMode.Pose)的编码与解码
+- 各模式指令帧长度的计算
+- 发送日志的模板，日志只在需要输出时才格式化
+
+单帧指令格式为[0xFF, 模式, 参数高字节, 参数低字节, 0xFE]，带序号协议在帧尾前加一个序号字节。
+
+姿态帧格式为[0xFF, 0x16, 通道掩码, 大臂, 小臂, 前爪, 后爪, 前门, 后门, 圆环, 0xFE]，
+通道掩码的第i位对应SERVO_CHANNELS中的第i个舵机，未置位的通道角度写0且由下位机忽略；
+角度范围为[0, 180]，掩码小于0x80，帧中除帧头帧尾外不会出现0xFF与0xFE
+"""
+
+import struct
+
+from Config import my_logger, MoveMode
+
+# 姿态帧中各舵机通道的顺序
+SERVO_CHANNELS = (MoveMode.Bigarm, MoveMode.Forearm, MoveMode.Frontpaws, MoveMode.Hindpaws, MoveMode.Frontdoor,
+                  MoveMode.Backdoor, MoveMode.Cirque)
+
+# 各类模式，参数分别为距离(毫米)、旋转角度与舵机角度；SEQUENCE_MODES由多条指令组成
+DISTANCE_MODES = frozenset({MoveMode.Forward, MoveMode.Backward, MoveMode.Leftward, MoveMode.Rightward,
+                            MoveMode.Topleft, MoveMode.Topright, MoveMode.Lowerleft, MoveMode.Lowerright})
+ROTATION_MODES = frozenset({MoveMode.Turnleft, MoveMode.Turnright})
+SERVO_MODES = frozenset(SERVO_CHANNELS)
+SEQUENCE_MODES = frozenset({MoveMode.Servo, MoveMode.Highest, MoveMode.Advance})
+# 参数为绝对角度、重复执行结果不变的模式，等待反馈超时后可以重发
+IDEMPOTENT_MODES = SERVO_MODES | {MoveMode.Pose}
+# 底盘指令，其余指令(舵机、姿态帧)由舵机执行，两者是相互独立的执行机构
+CHASSIS_MODES = DISTANCE_MODES | ROTATION_MODES | {MoveMode.Calibration}
+
+# 校准指令的参数，即[30, 2]
+CALIBRATION_VALUE = 30 * 256 + 2
+
+# 单帧指令: 帧头、模式、16位大端参数、(序号、)帧尾
+COMMAND_FRAME = struct.Struct('>BBHB')
+SEQUENCED_COMMAND_FRAME = struct.Struct('>BBHBB')
+
+# 不含序号时各类指令帧的长度
+FRAME_LENGTH = COMMAND_FRAME.size
+POSE_FRAME_LENGTH = 4 + len(SERVO_CHANNELS)
+
+# 发送日志模板，参数依次为: 发送字节数、FrameText(指令帧)、模式名、原始距离、帧中的参数
+SENT_LOG = '向下位机发送了{0}个字节的数据，数据内容为{1}。'
+COMMAND_LOGS = {mode: SENT_LOG + '动作模式为{2}，使用米作为单位，原始移动距离为{3}m。' for mode in DISTANCE_MODES}
+COMMAND_LOGS.update({mode: SENT_LOG + '动作模式为旋转，使用度作为单位，原始输入为{4}度' for mode in ROTATION_MODES})
+COMMAND_LOGS.update({mode: SENT_LOG + '{2}参数为{4}' for mode in SERVO_MODES})
+COMMAND_LOGS[MoveMode.Calibration] = SENT_LOG + '动作模式为校准'
+
+
+class FrameText:
+    """
+    指令帧的日志表示，只在日志需要输出时才转换为[0xFF, ...]形式的文本
+    """
+
+    __slots__ = ('frame',)
+
+    def __init__(self, frame: bytes or bytearray) -> None:
+        self.frame = frame
+
+    def __str__(self) -> str:
+        return str(list(self.frame))
+
+
+class FrameEncoder:
+    """
+    单帧指令编码器，将指令按struct打包进复用的bytearray，编码时不再构建列表与bytes
+
+    encode返回的buffer会在下一次编码时被覆盖，调用方应在下一次编码前写入串口
+
+    方法:
+        encode: 编码一条单帧指令
+    """
+
+    def __init__(self, sequenced: bool = False) -> None:
+        """
+        Args:
+            sequenced(bool): 是否为带序号协议
+
+        Returns:
+            None
+        """
+        self.sequenced = sequenced
+        self._frame = SEQUENCED_COMMAND_FRAME if sequenced else COMMAND_FRAME
+        self.buffer = bytearray(self._frame.size)
+
+    def encode(self, mode: int, value: int, seq: int = 0) -> bytearray:
+        """
+        编码一条单帧指令
+
+        Args:
+            mode(int): 模式
+            value(int): 参数，范围[0, 65535]
+            seq(int): 序号，仅带序号协议使用
+
+        Returns:
+            bytearray: 复用的指令帧
+        """
+        if self.sequenced:
+            self._frame.pack_into(self.buffer, 0, 0xFF, mode, value, seq, 0xFE)
+        else:
+            self._frame.pack_into(self.buffer, 0, 0xFF, mode, value, 0xFE)
+        return self.buffer
+
+
+def command_value(mode: MoveMode, distance: float = None, rotation_angle: int = None) -> int:
+    """
+    检查单帧指令的参数，并换算为帧中的16位参数
+
+    Args:
+        mode(MoveMode): 运动、旋转、校准或单个舵机模式
+        distance(float): 运动距离，单位为米
+        rotation_angle(int): 旋转或舵机角度，单位为度
+
+    Returns:
+        int: 帧中的参数
+    """
+    if mode in DISTANCE_MODES:
+        if distance is None:
+            raise ValueError(f'{mode.name}模式需要距离')
+        if not -32.768 <= distance <= 32.767:
+            my_logger.warning(f"距离设置范围过大，目前支持[-32.768, 32.767] m。截取距离的低十六位")
+        return int(distance * 1000) & 0xFFFF
+
+    if mode in SERVO_MODES:
+        if rotation_angle is None:
+            raise ValueError(f'{mode.name}模式需要角度')
+        angle = abs(int(rotation_angle))
+        if angle > 180:
+            angle %= 180
+            my_logger.warning(f"舵机模式下，输入的角度不在[-180，180]之间，将取值为{angle}")
+        return angle
+
+    if mode in ROTATION_MODES:
+        if rotation_angle is None:
+            raise ValueError(f'{mode.name}模式需要角度')
+        return abs(int(rotation_angle))
+
+    if mode == MoveMode.Calibration:
+        return CALIBRATION_VALUE
+
+    raise ValueError(f'无法识别的模式{mode}')
+
+
+def frame_length(mode: int, sequenced: bool = False) -> int:
+    """
+    计算指令帧长度
+
+    Args:
+        mode(int): 帧中的模式字节
+        sequenced(bool): 是否为带序号协议
+
+    Returns:
+        int: 帧长度
+    """
+    length = POSE_FRAME_LENGTH if mode == MoveMode.Pose else FRAME_LENGTH
+    return length + 1 if sequenced else length
+
+
+def encode_pose(pose: dict) -> list:
+    """
+    将姿态编码为姿态帧
+
+    Args:
+        pose(dict): {舵机MoveMode: 角度}
+
+    Returns:
+        list: 不含序号的姿态帧
+    """
+    mask = 0
+    angles = [0] * len(SERVO_CHANNELS)
+    for channel, angle in pose.items():
+        index = SERVO_CHANNELS.index(channel)
+        angle = abs(int(angle))
+        if angle > 180:
+            raise ValueError(f'{MoveMode(channel).name}的角度{angle}超出[0, 180]')
+        mask |= 1 << index
+        angles[index] = angle
+    if not mask:
+        raise ValueError('姿态中没有任何舵机')
+    return [0xFF, MoveMode.Pose.value, mask] + angles + [0xFE]
+
+
+def decode_pose(frame: bytes or list) -> dict:
+    """
+    解码姿态帧
+
+    Args:
+        frame(bytes or list): 姿态帧，可以带序号
+
+    Returns:
+        dict: {舵机MoveMode: 角度}
+    """
+    mask = frame[2]
+    return {channel: frame[3 + index] for index, channel in enumerate(SERVO_CHANNELS) if mask & (1 << index)}
+
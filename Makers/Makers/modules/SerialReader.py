@@ -0,0 +1,256 @@
+"""
+提供下位机反馈帧解析与后台读取功能的模块
+
+主要功能包括:
+- 按[0xFF, 类型, 数据..., 0xFE]格式解析反馈帧，遇到错误字节时自动重新同步
+- 后台线程批量读取串口数据，将解析出的反馈按类型放入各自的队列
+- 带超时的等待指定类型的反馈
+"""
+
+import queue
+import threading
+import time
+
+from Config import my_logger, Feedback
+
+# 已定义的反馈类型值
+_feedback_values = {feedback.value for feedback in Feedback}
+
+
+class FrameParser:
+    """
+    反馈帧解析状态机
+
+    按字节推进三种状态: 等待帧头0xFF、读取类型、读取数据直到帧尾0xFE。
+    读取类型或数据时再次遇到0xFF，视为上一帧已损坏，以该字节作为新的帧头重新同步；
+    数据超过max_payload字节仍未遇到帧尾时丢弃该帧
+
+    方法:
+        feed: 送入一段字节数据，返回其中解析出的完整反馈帧
+    """
+
+    HEAD = 0xFF
+    TAIL = 0xFE
+
+    _WAIT_HEAD = 0
+    _WAIT_TYPE = 1
+    _PAYLOAD = 2
+
+    def __init__(self, max_payload: int = 16) -> None:
+        """
+        Args:
+            max_payload(int): 单帧数据部分的最大长度
+
+        Returns:
+            None
+        """
+        self.max_payload = max_payload
+        self._state = self._WAIT_HEAD
+        self._type = None
+        self._payload = bytearray()
+
+        # 解析统计: 完整帧数、重新同步次数、被丢弃的字节数
+        self.frames = 0
+        self.resyncs = 0
+        self.dropped = 0
+
+    def feed(self, data: bytes) -> list:
+        """
+        送入一段字节数据
+
+        Args:
+            data(bytes): 从串口读到的数据，可以包含不完整的帧，剩余部分会在下次送入时继续解析
+
+        Returns:
+            list: [(类型, 数据bytes), ...]，类型为Feedback中已定义的类型时为Feedback枚举，否则为int
+        """
+        frames = []
+        for byte in data:
+            if self._state == self._WAIT_HEAD:
+                if byte == self.HEAD:
+                    self._state = self._WAIT_TYPE
+                else:
+                    self.dropped += 1
+
+            elif self._state == self._WAIT_TYPE:
+                if byte == self.HEAD:
+                    self.dropped += 1
+                elif byte == self.TAIL:
+                    # 空帧
+                    self.dropped += 2
+                    self._state = self._WAIT_HEAD
+                else:
+                    self._type = byte
+                    self._payload.clear()
+                    self._state = self._PAYLOAD
+
+            else:
+                if byte == self.TAIL:
+                    frame_type = Feedback(self._type) if self._type in _feedback_values else self._type
+                    frames.append((frame_type, bytes(self._payload)))
+                    self.frames += 1
+                    self._state = self._WAIT_HEAD
+                elif byte == self.HEAD:
+                    self.resyncs += 1
+                    self.dropped += 2 + len(self._payload)
+                    self._state = self._WAIT_TYPE
+                elif len(self._payload) >= self.max_payload:
+                    self.resyncs += 1
+                    self.dropped += 3 + len(self._payload)
+                    self._state = self._WAIT_HEAD
+                else:
+                    self._payload.append(byte)
+
+        return frames
+
+
+class SerialReader:
+    """
+    串口后台读取线程
+
+    线程以较短的超时批量读取串口中已到达的数据，交给FrameParser解析，
+    并将每个反馈帧的数据按类型放入各自的队列，由wait取出；通过subscribe注册了回调的类型则直接在读取线程中调用回调
+
+    方法:
+        start: 启动读取线程
+        stop: 停止读取线程
+        subscribe: 注册某一类型反馈的回调
+        wait: 等待指定类型的反馈
+        discard: 丢弃指定类型尚未取出的反馈
+    """
+
+    def __init__(self, port, poll_interval: float = 0.05) -> None:
+        """
+        Args:
+            port: 已打开的串口对象，需支持read、in_waiting与timeout属性(如serial.Serial)
+            poll_interval(float): 没有数据时单次读取的超时时间，单位为秒，决定stop的响应速度
+
+        Returns:
+            None
+        """
+        self.port = port
+        self.poll_interval = poll_interval
+        self.parser = FrameParser()
+
+        self._queues = {}
+        self._queues_lock = threading.Lock()
+        self._handlers = {}
+        self._thread = None
+        self._running = False
+
+    def _queue(self, frame_type) -> queue.Queue:
+        with self._queues_lock:
+            if frame_type not in self._queues:
+                self._queues[frame_type] = queue.Queue()
+            return self._queues[frame_type]
+
+    def start(self) -> None:
+        """
+        启动读取线程
+
+        Returns:
+            None
+        """
+        if self._thread is not None:
+            return
+        self.port.timeout = self.poll_interval
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name='SerialReader', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止读取线程
+
+        Returns:
+            None
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _read_loop(self) -> None:
+        while self._running:
+            try:
+                # 先阻塞读取1个字节(受timeout限制)，再一次读出其余已到达的数据
+                data = self.port.read(1)
+                if not data:
+                    continue
+                waiting = self.port.in_waiting
+                if waiting:
+                    data += self.port.read(waiting)
+            except Exception as e:
+                if self._running:
+                    my_logger.error(f'串口读取失败: {e}')
+                    time.sleep(self.poll_interval)
+                continue
+
+            for frame_type, payload in self.parser.feed(data):
+                if not isinstance(frame_type, Feedback):
+                    my_logger.debug(f'接收到未定义类型的反馈帧: 类型{frame_type}，数据{list(payload)}')
+                handler = self._handlers.get(frame_type)
+                if handler is None:
+                    self._queue(frame_type).put((time.monotonic(), payload))
+                    continue
+                try:
+                    handler(time.monotonic(), payload)
+                except Exception as e:
+                    my_logger.error(f'处理反馈{frame_type!r}时出错: {e}')
+
+    def subscribe(self, frame_type: Feedback or int, handler) -> None:
+        """
+        注册某一类型反馈的回调，注册后该类型的反馈不再放入队列。回调在读取线程中执行，应尽快返回
+
+        Args:
+            frame_type(Feedback or int): 反馈类型
+            handler: 回调函数，参数为(接收时间戳time.monotonic, 数据bytes)，传入None表示取消注册
+
+        Returns:
+            None
+        """
+        if handler is None:
+            self._handlers.pop(frame_type, None)
+        else:
+            self._handlers[frame_type] = handler
+
+    def wait(self, frame_type: Feedback or int, timeout: float = None) -> tuple:
+        """
+        等待指定类型的反馈，已经到达但尚未取出的反馈会立即返回
+
+        Args:
+            frame_type(Feedback or int): 反馈类型
+            timeout(float): 最长等待时间，单位为秒，None表示一直等待
+
+        Returns:
+            tuple: (接收时间戳time.monotonic, 数据bytes)
+
+        Raises:
+            TimeoutError: 超时仍未收到反馈
+        """
+        try:
+            return self._queue(frame_type).get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f'等待下位机反馈{frame_type!r}超时({timeout}s)') from None
+
+    def discard(self, frame_type: Feedback or int = None) -> int:
+        """
+        丢弃尚未取出的反馈
+
+        Args:
+            frame_type(Feedback or int): 反馈类型，None表示所有类型
+
+        Returns:
+            int: 丢弃的反馈数量
+        """
+        with self._queues_lock:
+            queues = list(self._queues.values()) if frame_type is None else [self._queues.get(frame_type)]
+        count = 0
+        for frame_queue in queues:
+            while frame_queue is not None:
+                try:
+                    frame_queue.get_nowait()
+                except queue.Empty:
+                    break
+                count += 1
+        return count
@@ -0,0 +1,100 @@
+"""
+提供舵机运动耗时模型的模块
+
+主要功能包括:
+- 按转动角度计算舵机指令收到反馈后的等待时间
+- 根据实测的(转动角度, 耗时)数据拟合各舵机的转速与稳定时间
+
+等待时间 = settle + |目标角度 - 当前角度| / rate，并截取到[0, max]；当前角度未知时等待max
+"""
+
+import numpy as np
+from Config import my_logger, servo_motion
+
+
+class ServoTiming:
+    """
+    舵机运动耗时模型
+
+    方法:
+        dwell: 计算一次转动的等待时间
+        fit: 根据实测数据拟合某一舵机的转速与稳定时间
+    """
+
+    def __init__(self, params: dict = None) -> None:
+        """
+        Args:
+            params(dict): {舵机MoveMode: {'rate': 度/秒, 'settle': 秒, 'max': 秒}}，默认使用Config.servo_motion
+
+        Returns:
+            None
+        """
+        self.params = {channel: dict(value) for channel, value in (servo_motion if params is None else params).items()}
+
+    def dwell(self, channel, current: int or None, target: int) -> float:
+        """
+        计算一次转动的等待时间
+
+        Args:
+            channel(MoveMode): 舵机
+            current(int or None): 当前角度，None表示未知
+            target(int): 目标角度
+
+        Returns:
+            float: 等待时间，单位为秒
+        """
+        param = self.params[channel]
+        if current is None or not param['rate']:
+            return param['max']
+        return min(param['settle'] + abs(target - current) / param['rate'], param['max'])
+
+    def fit(self, channel, samples: list) -> dict:
+        """
+        根据实测数据以最小二乘拟合某一舵机的转速与稳定时间，并更新到模型中
+
+        Args:
+            channel(MoveMode): 舵机
+            samples(list): [(转动角度, 实测耗时秒), ...]，至少需要两个不同的转动角度
+
+        Returns:
+            dict: 更新后的参数
+        """
+        deltas = np.array([abs(delta) for delta, _ in samples], dtype=np.float64)
+        times = np.array([seconds for _, seconds in samples], dtype=np.float64)
+        if len(np.unique(deltas)) < 2:
+            raise ValueError('拟合至少需要两个不同的转动角度')
+
+        slope, settle = np.polyfit(deltas, times, 1)
+        if slope <= 0:
+            raise ValueError(f'拟合得到的耗时不随角度增加(斜率{slope:.5f})，请检查数据')
+
+        param = self.params[channel]
+        param['rate'] = float(1 / slope)
+        param['settle'] = float(max(settle, 0.0))
+        my_logger.info(f'{channel.name}: 转速{param["rate"]:.1f}°/s，稳定时间{param["settle"]:.3f}s')
+        return param
+
+
+if __name__ == '__main__':
+    # 根据实测数据拟合参数: python ServoTiming.py samples.csv
+    # csv每行为: 舵机名(如Bigarm),转动角度,实测耗时秒
+    import sys
+    from Config import MoveMode
+
+    timing = ServoTiming()
+    samples = {}
+    with open(sys.argv[1]) as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            name, delta, seconds = line.strip().split(',')
+            samples.setdefault(MoveMode[name], []).append((float(delta), float(seconds)))
+
+    for channel, channel_samples in samples.items():
+        timing.fit(channel, channel_samples)
+
+    print('servo_motion = {')
+    for channel, param in timing.params.items():
+        print(f"    MoveMode.{channel.name}: {{'rate': {param['rate']:.0f}, 'settle': {param['settle']:.3f}, "
+              f"'max': {param['max']}}},")
+    print('}')
@@ -0,0 +1,587 @@
+"""
+提供下位机模拟功能的模块，用于在没有硬件的情况下测试串口通信与主流程
+
+主要功能包括:
+- 内存中的串口对(LoopbackSerial)，接口与serial.Serial一致，可注入MoveControl
+- 虚拟下位机(VirtualLowerMachine)，解析上位机指令帧，按模拟耗时依次执行并反馈动作完成，可模拟耗时抖动与丢字节
+- 伪终端(PtySerial)，作为独立进程运行时虚拟下位机连接在伪终端上，上位机用MoveControl(port=伪终端路径)即可连接
+
+作为独立进程运行(仅Linux):
+    python modules/Simulator.py --link /tmp/ttyVIRT [--protocol sequenced] [--time-scale 0.1] [--jitter 0.02] ...
+启动后上位机将串口设为/tmp/ttyVIRT(或打印出的/dev/pts/N)；下位机在收到第一帧后空闲--start-delay秒时发送启动指令，
+也可以随时按回车发送；Ctrl+C或kill退出时打印执行统计
+"""
+
+import os
+import queue
+import random
+import select
+import signal
+import threading
+import time
+from collections import deque
+
+from Config import my_logger, MoveMode
+from modules.Protocol import CHASSIS_MODES, decode_pose, frame_length
+
+
+class LoopbackSerial:
+    """
+    内存中的串口端点，由pair成对创建，一端写入的数据可在另一端读出
+
+    指定baudrate时按每字节10位计算传输耗时，数据在传输完成(再加上latency)后才能被对端读出，用于模拟真实串口的往返延迟
+
+    方法:
+        pair: 创建一对相连的端点
+        write: 向对端写入数据
+        read: 读取数据，受timeout限制
+        in_waiting: 已到达但尚未读取的字节数
+        reset_input_buffer: 清空接收缓存
+        reset_output_buffer: 清空发送缓存(无操作)
+        open: 重新打开端点
+        close: 关闭端点
+    """
+
+    def __init__(self, baudrate: int = None, latency: float = 0.0) -> None:
+        """
+        Args:
+            baudrate(int): 模拟的波特率，None表示不模拟传输耗时
+            latency(float): 额外的单向延迟，单位为秒
+
+        Returns:
+            None
+        """
+        self.baudrate = baudrate
+        self.latency = latency
+        self.timeout = None
+        self.is_open = True
+        self.peer = None
+        # 接收缓存: [[可读出的时间, 数据], ...]
+        self._chunks = deque()
+        self._cond = threading.Condition()
+        self._line_free = 0.0
+
+    @classmethod
+    def pair(cls, baudrate: int = None, latency: float = 0.0) -> tuple:
+        """
+        创建一对相连的端点
+
+        Args:
+            baudrate(int): 模拟的波特率，None表示不模拟传输耗时
+            latency(float): 额外的单向延迟，单位为秒
+
+        Returns:
+            tuple: (上位机端, 下位机端)
+        """
+        host, device = cls(baudrate, latency), cls(baudrate, latency)
+        host.peer, device.peer = device, host
+        return host, device
+
+    def _receive(self, data: bytes, ready: float) -> None:
+        with self._cond:
+            self._chunks.append([ready, bytearray(data)])
+            self._cond.notify_all()
+
+    def _available(self, now: float) -> int:
+        return sum(len(data) for ready, data in self._chunks if ready <= now)
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise IOError('串口已关闭')
+        now = time.monotonic()
+        ready = now
+        if self.baudrate:
+            self._line_free = max(now, self._line_free) + len(data) * 10 / self.baudrate
+            ready = self._line_free
+        self.peer._receive(bytes(data), ready + self.latency)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._cond:
+            while self.is_open:
+                now = time.monotonic()
+                if self._available(now):
+                    break
+                wait = max(self._chunks[0][0] - now, 0.0) if self._chunks else None
+                if deadline is not None:
+                    if now >= deadline:
+                        break
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._cond.wait(wait)
+
+            now = time.monotonic()
+            data = bytearray()
+            while self._chunks and self._chunks[0][0] <= now and len(data) < size:
+                chunk = self._chunks[0][1]
+                taken = chunk[:size - len(data)]
+                data += taken
+                del chunk[:len(taken)]
+                if not chunk:
+                    self._chunks.popleft()
+            return bytes(data)
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            return self._available(time.monotonic())
+
+    def reset_input_buffer(self) -> None:
+        with self._cond:
+            now = time.monotonic()
+            while self._chunks and self._chunks[0][0] <= now:
+                self._chunks.popleft()
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def open(self) -> None:
+        with self._cond:
+            self.is_open = True
+
+    def close(self) -> None:
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+
+class PtySerial:
+    """
+    伪终端的主端，接口与serial.Serial中VirtualLowerMachine用到的部分一致，从端路径由name给出
+
+    上位机关闭从端时读取返回空数据，之后重新打开从端可以继续通信
+
+    方法:
+        read: 读取数据，受timeout限制
+        in_waiting: 已到达但尚未读取的字节数
+        write: 向上位机写入数据
+        close: 关闭伪终端
+    """
+
+    def __init__(self) -> None:
+        import pty
+        import tty
+
+        self._master, self._slave = pty.openpty()
+        # 原始模式，不做回显与换行符转换；上位机用pyserial打开时也会设置为原始模式
+        tty.setraw(self._slave)
+        self.name = os.ttyname(self._slave)
+        self.timeout = None
+        self.is_open = True
+
+    def read(self, size: int = 1) -> bytes:
+        readable, _, _ = select.select([self._master], [], [], self.timeout)
+        if not readable:
+            return b''
+        try:
+            return os.read(self._master, size)
+        except OSError:
+            # 从端没有被打开时读取主端会出错(EIO)，等待上位机打开
+            time.sleep(self.timeout or 0.01)
+            return b''
+
+    @property
+    def in_waiting(self) -> int:
+        import fcntl
+        import struct
+        import termios
+
+        return struct.unpack('I', fcntl.ioctl(self._master, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+    def write(self, data: bytes) -> int:
+        return os.write(self._master, data)
+
+    def close(self) -> None:
+        if self.is_open:
+            self.is_open = False
+            os.close(self._master)
+            os.close(self._slave)
+
+
+class VirtualLowerMachine:
+    """
+    虚拟下位机，在后台线程中解析上位机指令帧，按顺序执行并反馈动作完成
+
+    指令帧长度由模式决定，原协议为[0xFF, 模式, 高字节, 低字节, 0xFE]，带序号协议为[0xFF, 模式, 高字节, 低字节, 序号, 0xFE]，
+    姿态帧(MoveMode.Pose)格式见Protocol.py，带序号时同样在帧尾前加一个序号字节；
+    数据字节可能等于0xFF或0xFE，因此按帧长而不是按帧尾分帧，帧尾不正确时从下一个0xFF重新同步。
+    每条指令的执行耗时由duration计算，加上[0, jitter]的随机抖动，乘以time_scale后以sleep模拟；
+    drop_rate大于0时，接收到的每个字节与发出的反馈中的每个字节均以该概率被丢弃；
+    parallel为True时底盘指令与舵机指令分别在各自的线程中按接收顺序执行，两者可以同时进行(需带序号协议)
+
+    方法:
+        start: 启动下位机线程
+        stop: 停止下位机线程
+        send_start: 发送启动指令[0xFF, 0x10, 0xFE]
+        duration: 计算一条指令的模拟执行耗时
+        idle_time: 距上次接收或执行完指令的空闲时间
+    """
+
+    MOVE_MODES = {MoveMode.Forward, MoveMode.Backward, MoveMode.Leftward, MoveMode.Rightward, MoveMode.Topleft,
+                  MoveMode.Topright, MoveMode.Lowerleft, MoveMode.Lowerright}
+    TURN_MODES = {MoveMode.Turnleft, MoveMode.Turnright}
+
+    def __init__(self, port: LoopbackSerial or PtySerial, protocol: str = 'legacy', time_scale: float = 1.0,
+                 speed: float = 0.5, turn_speed: float = 720, servo_time: float = 0.02,
+                 overhead: float = 0.05, jitter: float = 0.0, drop_rate: float = 0.0, seed: int = None,
+                 parallel: bool = False) -> None:
+        """
+        Args:
+            port(LoopbackSerial or PtySerial): 下位机端的串口
+            protocol(str): 'legacy'或'sequenced'，与MoveControl一致
+            time_scale(float): 模拟耗时的缩放倍数，测试时可设为较小的值
+            speed(float): 平移速度，单位为m/s
+            turn_speed(float): 旋转速度，单位为旋转指令单位/s
+            servo_time(float): 舵机指令耗时，单位为秒
+            overhead(float): 每条运动指令的固定耗时(加减速)，单位为秒
+            jitter(float): 每条指令耗时的随机抖动上限，单位为秒
+            drop_rate(float): 每个字节被丢弃的概率
+            seed(int): 抖动与丢字节的随机种子
+            parallel(bool): 是否同时执行底盘指令与舵机指令
+
+        Returns:
+            None
+        """
+        if protocol not in ('legacy', 'sequenced'):
+            raise ValueError(f'不支持的通信协议: {protocol}')
+        self.port = port
+        self.protocol = protocol
+        self.time_scale = time_scale
+        self.speed = speed
+        self.turn_speed = turn_speed
+        self.servo_time = servo_time
+        self.overhead = overhead
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.parallel = parallel
+        self._random = random.Random(seed)
+
+        # 已执行的指令: (模式, 参数, 序号, 开始时间, 结束时间)
+        self.executed = []
+        # 各舵机当前角度
+        self.servos = {}
+        # 帧尾错误次数、被丢弃的字节数
+        self.errors = 0
+        self.dropped = 0
+
+        self._rx = bytearray()
+        self._commands = deque()
+        # 正在执行或已分配给执行线程、尚未执行完的指令数
+        self._executing = 0
+        self._executing_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_active = None
+        self._thread = None
+        self._running = False
+        # parallel为True时底盘与舵机的指令队列与执行线程
+        self._lanes = {}
+        self._workers = []
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.port.timeout = 0.01
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='VirtualLowerMachine', daemon=True)
+        self._thread.start()
+        if self.parallel:
+            for lane in ('chassis', 'servo'):
+                self._lanes[lane] = queue.Queue()
+                worker = threading.Thread(target=self._run_lane, args=(self._lanes[lane],),
+                                          name=f'VirtualLowerMachine-{lane}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+        self._workers.clear()
+        self._lanes.clear()
+
+    def send_start(self) -> None:
+        self.port.write(bytes([0xFF, 0x10, 0xFE]))
+
+    def idle_time(self) -> float or None:
+        """
+        距上次接收数据或执行完指令的空闲时间
+
+        Returns:
+            float or None: 空闲时间，单位为秒；尚未接收到数据时为None，有指令正在执行或等待执行时为0
+        """
+        if self._last_active is None:
+            return None
+        if self._executing or self._commands:
+            return 0.0
+        return time.monotonic() - self._last_active
+
+    def duration(self, mode: MoveMode, value: int) -> float:
+        """
+        计算一条指令的模拟执行耗时(未乘time_scale)
+
+        Args:
+            mode(MoveMode): 指令模式
+            value(int): 指令参数，运动为毫米，旋转为角度，舵机为角度，姿态帧为{舵机: 角度}
+
+        Returns:
+            float: 耗时，单位为秒
+        """
+        if mode in self.MOVE_MODES:
+            return self.overhead + value / 1000 / self.speed
+        if mode in self.TURN_MODES:
+            return self.overhead + value / self.turn_speed
+        if mode == MoveMode.Calibration:
+            return 0.5
+        return self.servo_time
+
+    def _drop(self, data: bytes) -> bytes:
+        if not self.drop_rate:
+            return data
+        kept = bytes(byte for byte in data if self._random.random() >= self.drop_rate)
+        self.dropped += len(data) - len(kept)
+        return kept
+
+    def _parse(self) -> None:
+        while True:
+            head = self._rx.find(0xFF)
+            if head < 0:
+                self._rx.clear()
+                return
+            del self._rx[:head]
+            if len(self._rx) < 2:
+                return
+            length = frame_length(self._rx[1], self.protocol == 'sequenced')
+            if len(self._rx) < length:
+                return
+            frame = self._rx[:length]
+            if frame[-1] != 0xFE:
+                self.errors += 1
+                del self._rx[:1]
+                continue
+            del self._rx[:length]
+            seq = frame[-2] if self.protocol == 'sequenced' else None
+            if frame[1] == MoveMode.Pose:
+                self._commands.append((frame[1], decode_pose(frame), seq))
+            else:
+                self._commands.append((frame[1], frame[2] * 256 + frame[3], seq))
+
+    def _execute(self, mode_value: int, value: int, seq: int or None) -> None:
+        start = time.monotonic()
+        try:
+            mode = MoveMode(mode_value)
+        except ValueError:
+            my_logger.warning(f'虚拟下位机接收到未知模式{mode_value}')
+            mode = None
+        if mode is not None:
+            seconds = self.duration(mode, value)
+            if self.jitter:
+                seconds += self._random.uniform(0, self.jitter)
+            time.sleep(seconds * self.time_scale)
+            if mode == MoveMode.Pose:
+                self.servos.update(value)
+            elif mode not in self.MOVE_MODES and mode not in self.TURN_MODES and mode != MoveMode.Calibration:
+                self.servos[mode] = value
+        self.executed.append((mode, value, seq, start, time.monotonic()))
+
+        ack = [0xFF, 0x01, 0xFE] if seq is None else [0xFF, 0x01, seq, 0xFE]
+        with self._write_lock:
+            ack = self._drop(bytes(ack))
+            if ack:
+                self.port.write(ack)
+
+    def _run(self) -> None:
+        while self._running:
+            data = self.port.read(64)
+            if data:
+                waiting = self.port.in_waiting
+                if waiting:
+                    data += self.port.read(waiting)
+                self._last_active = time.monotonic()
+                self._rx += self._drop(data)
+                self._parse()
+            while self._commands:
+                command = self._commands.popleft()
+                with self._executing_lock:
+                    self._executing += 1
+                if self.parallel:
+                    self._lanes['chassis' if command[0] in CHASSIS_MODES else 'servo'].put(command)
+                    continue
+                self._execute(*command)
+                self._finish()
+                # 逐条执行时每执行完一条就重新读取串口
+                break
+
+    def _run_lane(self, commands: queue.Queue) -> None:
+        while self._running:
+            try:
+                command = commands.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            self._execute(*command)
+            self._finish()
+
+    def _finish(self) -> None:
+        self._last_active = time.monotonic()
+        with self._executing_lock:
+            self._executing -= 1
+
+
+def make_simulated_serial(protocol: str = 'legacy', baudrate: int = 9600, latency: float = 0.002,
+                          **kwargs) -> tuple:
+    """
+    创建一对模拟串口并启动连接在下位机端的虚拟下位机
+
+    Args:
+        protocol(str): 通信协议
+        baudrate(int): 模拟的波特率，None表示不模拟传输耗时
+        latency(float): 额外的单向延迟(USB转串口、下位机中断处理等)，单位为秒
+        **kwargs: 传给VirtualLowerMachine的其他参数
+
+    Returns:
+        tuple: (上位机端串口, 虚拟下位机)
+    """
+    host, device = LoopbackSerial.pair(baudrate, latency)
+    machine = VirtualLowerMachine(device, protocol=protocol, **kwargs)
+    machine.start()
+    return host, machine
+
+
+def compare_protocols() -> None:
+    """
+    对比原协议逐条发送、带序号协议流水线发送与姿态帧执行Put_Circle序列的耗时(不含舵机等待时间)
+
+    Returns:
+        None
+    """
+    from modules.GrabSequence import compile_sequences, load_sequences
+    from modules.MoveControl import MoveControl
+
+    steps = [step for step in compile_sequences(load_sequences())['Put_Circle'] if step.pose is not None]
+    sequence = [(command.channel, command.angle) for step in steps for command in step.commands]
+    poses = [step.pose for step in steps]
+
+    for name, protocol, pose_frames in (('legacy', 'legacy', False), ('sequenced', 'sequenced', False),
+                                        ('pose', 'legacy', True)):
+        host, machine = make_simulated_serial(protocol, servo_time=0.02)
+        control = MoveControl(port=None, baudrate=None, protocol=protocol, serial_port=host, pose_frames=pose_frames)
+        start = time.perf_counter()
+        if pose_frames:
+            for pose in poses:
+                control.pose(pose, wait=False).result()
+        else:
+            for mode, angle in sequence:
+                control.submit(mode, rotation_angle=angle)
+        control.flush()
+        elapsed = time.perf_counter() - start
+        print(f'{name:>10}: 下位机执行{len(machine.executed)}帧，耗时{elapsed * 1000:.1f} ms，舵机状态{dict(machine.servos)}')
+        control.close()
+        machine.stop()
+
+
+def run_pty(link: str = None, start_delay: float = 1.0, verbose: bool = False, **kwargs) -> None:
+    """
+    在伪终端上运行虚拟下位机，直到Ctrl+C
+
+    Args:
+        link(str): 指向伪终端从端的符号链接路径，None表示不创建
+        start_delay(float): 收到第一帧后空闲多少秒时自动发送启动指令，负数表示只在按回车时发送
+        verbose(bool): 是否打印每条执行完的指令
+        **kwargs: 传给VirtualLowerMachine的其他参数
+
+    Returns:
+        None
+    """
+    port = PtySerial()
+    if link is not None:
+        if os.path.islink(link):
+            os.unlink(link)
+        os.symlink(port.name, link)
+    machine = VirtualLowerMachine(port, **kwargs)
+    machine.start()
+    print(f'虚拟下位机已启动，串口为{port.name}' + (f'(链接{link})' if link else '') + '，按回车发送启动指令，Ctrl+C退出')
+
+    def read_stdin():
+        while True:
+            if not os.read(0, 1024):
+                return
+            machine.send_start()
+            print('已发送启动指令')
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    # kill与Ctrl+C一样正常退出并打印统计
+    signal.signal(signal.SIGTERM, interrupt)
+    threading.Thread(target=read_stdin, name='Stdin', daemon=True).start()
+
+    started = start_delay < 0
+    shown = 0
+    begin = None
+    try:
+        while True:
+            time.sleep(0.02)
+            executed = machine.executed
+            if executed and begin is None:
+                begin = executed[0][3]
+            if verbose:
+                for mode, value, seq, start, end in executed[shown:]:
+                    name = mode.name if mode is not None else '未知模式'
+                    print(f'{start - begin:9.3f}s {name:<12}{value}' + ('' if seq is None else f' #{seq}'))
+                shown = len(executed)
+            idle = machine.idle_time()
+            if not started and idle is not None and idle > start_delay:
+                machine.send_start()
+                started = True
+                print('已自动发送启动指令')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        machine.stop()
+        port.close()
+        if link is not None and os.path.islink(link):
+            os.unlink(link)
+
+    executed = machine.executed
+    busy = sum(end - start for _, _, _, start, end in executed)
+    span = executed[-1][4] - executed[0][3] if executed else 0.0
+    counts = {}
+    for mode, *_ in executed:
+        name = mode.name if mode is not None else '未知模式'
+        counts[name] = counts.get(name, 0) + 1
+    print(f'执行{len(executed)}帧，执行耗时{busy:.2f}s，首帧到末帧{span:.2f}s，'
+          f'空闲(上位机耗时){span - busy:.2f}s，帧尾错误{machine.errors}次，丢弃{machine.dropped}字节')
+    for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f'    {name:<12}{count}')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='虚拟下位机')
+    parser.add_argument('--compare', action='store_true', help='不启动伪终端，只对比各协议执行Put_Circle序列的耗时')
+    parser.add_argument('--link', default=None, help='指向伪终端的符号链接，如/tmp/ttyVIRT')
+    parser.add_argument('--protocol', default='legacy', choices=('legacy', 'sequenced'), help='通信协议')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='模拟耗时的缩放倍数')
+    parser.add_argument('--speed', type=float, default=0.5, help='平移速度，m/s')
+    parser.add_argument('--turn-speed', type=float, default=720, help='旋转速度，度/s')
+    parser.add_argument('--servo-time', type=float, default=0.02, help='舵机指令耗时，s')
+    parser.add_argument('--overhead', type=float, default=0.05, help='每条运动指令的固定耗时，s')
+    parser.add_argument('--jitter', type=float, default=0.0, help='每条指令耗时的随机抖动上限，s')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='每个字节被丢弃的概率')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子')
+    parser.add_argument('--parallel', action='store_true', help='同时执行底盘指令与舵机指令(需带序号协议)')
+    parser.add_argument('--start-delay', type=float, default=1.0,
+                        help='收到第一帧后空闲多少秒时自动发送启动指令，负数表示只在按回车时发送')
+    parser.add_argument('-v', '--verbose', action='store_true', help='打印每条执行完的指令')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_protocols()
+    else:
+        run_pty(link=args.link, start_delay=args.start_delay, verbose=args.verbose, protocol=args.protocol,
+                time_scale=args.time_scale, speed=args.speed, turn_speed=args.turn_speed, servo_time=args.servo_time,
+                overhead=args.overhead, jitter=args.jitter, drop_rate=args.drop_rate, seed=args.seed,
+                parallel=args.parallel)
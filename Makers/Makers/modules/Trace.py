@@ -0,0 +1,252 @@
+"""
+提供任务时间线记录功能的模块
+
+主要功能包括:
+- 在任务阶段、运动与舵机指令、摄像头识别等位置记录耗时区间(span)
+- 把记录的区间保存为Chrome trace格式的JSON，可在chrome://tracing或https://ui.perfetto.dev中按线程查看时间线
+
+记录默认关闭，关闭时每个埋点只多一次函数调用与一次属性判断。用法:
+
+    from modules.Trace import tracer, traced
+
+    @traced('camera')
+    def measure_lines(...): ...
+
+    tracer.start()
+    with tracer.span('go_to_platform', 'stage'):
+        ...
+    tracer.save('trace.json')
+
+带序号协议下多条指令帧同时等待反馈，帧从发送到收到反馈的区间记录为异步区间(Perfetto中单独成行)
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class _NullSpan:
+    """
+    记录关闭时span返回的空上下文管理器
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """
+    记录开启时span返回的上下文管理器，退出时记录一个完整区间
+    """
+
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=repr(exc_value))
+        self.tracer.complete(self.name, self.category, self.start, time.monotonic(), self.args)
+
+
+class Tracer:
+    """
+    任务时间线记录器，时间使用time.monotonic，与MoveControl、Camera中的时间戳一致，可在多个线程中记录
+
+    方法:
+        start: 清空已有记录并开始记录
+        stop: 停止记录
+        span: 返回记录一个区间的上下文管理器
+        complete: 记录一个已知起止时刻的区间
+        async_span: 记录一个可能与同一线程中其他区间交叠的异步区间
+        instant: 记录一个时刻
+        events: 转换为Chrome trace事件
+        save: 保存为Chrome trace格式的JSON
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        # 记录: (类型, 名称, 分类, 开始, 结束, 线程, 参数)
+        self._records = []
+        self._threads = {}
+        self._async_ids = itertools.count(1)
+        self._origin = time.monotonic()
+
+    def start(self) -> None:
+        """
+        清空已有记录并开始记录，时间线从此刻算起
+
+        Returns:
+            None
+        """
+        self._records = []
+        self._threads = {}
+        self._origin = time.monotonic()
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def span(self, name: str, category: str, **args) -> _Span or _NullSpan:
+        """
+        Args:
+            name(str): 区间名
+            category(str): 分类，如stage、move、servo、camera
+            **args: 附加在区间上的参数
+
+        Returns:
+            上下文管理器，with块的执行时间记录为一个区间；记录关闭时为空上下文管理器
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def complete(self, name: str, category: str, start: float, end: float, args: dict = None) -> None:
+        """
+        在当前线程的时间线上记录一个区间
+
+        Args:
+            name(str): 区间名
+            category(str): 分类
+            start(float): 开始时刻(time.monotonic)
+            end(float): 结束时刻(time.monotonic)
+            args(dict): 附加参数
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        if thread.ident not in self._threads:
+            self._threads[thread.ident] = thread.name
+        self._records.append(('X', name, category, start, end, thread.ident, args))
+
+    def async_span(self, name: str, category: str, start: float, end: float, args: dict = None) -> None:
+        """
+        记录一个异步区间，如从发送指令帧到收到反馈，同一分类的异步区间可以相互交叠
+
+        Args:
+            name(str): 区间名
+            category(str): 分类，时间线中按分类成行
+            start(float): 开始时刻(time.monotonic)
+            end(float): 结束时刻(time.monotonic)
+            args(dict): 附加参数
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        self._records.append(('b', name, category, start, end, next(self._async_ids), args))
+
+    def instant(self, name: str, category: str, **args) -> None:
+        """
+        在当前线程的时间线上记录一个时刻，如收到启动指令
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        thread = threading.current_thread()
+        if thread.ident not in self._threads:
+            self._threads[thread.ident] = thread.name
+        self._records.append(('i', name, category, now, now, thread.ident, args or None))
+
+    def events(self) -> list:
+        """
+        Returns:
+            list: Chrome trace事件，时间单位为微秒，从start时刻算起
+        """
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in list(self._threads.items())]
+        for kind, name, category, start, end, ident, args in list(self._records):
+            ts = (start - self._origin) * 1e6
+            if kind == 'b':
+                event = {'name': name, 'cat': category, 'ph': 'b', 'ts': ts, 'pid': pid, 'id': ident}
+                events.append(dict(event, args=args) if args else event)
+                events.append({'name': name, 'cat': category, 'ph': 'e', 'ts': (end - self._origin) * 1e6,
+                               'pid': pid, 'id': ident})
+                continue
+            event = {'name': name, 'cat': category, 'ph': kind, 'ts': ts, 'pid': pid, 'tid': ident}
+            if kind == 'X':
+                event['dur'] = (end - start) * 1e6
+            else:
+                event['s'] = 't'
+            if args:
+                event['args'] = args
+            events.append(event)
+        return events
+
+    def save(self, path: str) -> int:
+        """
+        保存为Chrome trace格式的JSON
+
+        Args:
+            path(str): 文件路径
+
+        Returns:
+            int: 保存的事件数
+        """
+        events = self.events()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False, default=str)
+        return len(events)
+
+
+# 全局记录器，各模块的埋点都记录到这里
+tracer = Tracer()
+
+
+def traced(category: str, name: str = None):
+    """
+    把函数的每次调用记录为一个区间的装饰器
+
+    Args:
+        category(str): 分类
+        name(str): 区间名，默认为函数的限定名，如Camera.measure_lines
+
+    Returns:
+        装饰器
+    """
+
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            start = time.monotonic()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                tracer.complete(span_name, category, start, time.monotonic())
+
+        return wrapper
+
+    return decorator
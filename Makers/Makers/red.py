@@ -2,9 +2,14 @@
 主流程函数
 """
 
-from modules.Config import my_logger, GrabMode
+from modules.Config import my_logger, GrabMode, trace_params
 from modules.Detection import Camera
+from modules.Mission import ARM, CAMERA, CHASSIS, Mission
+from modules.MotionBuffer import MotionBuffer
 from modules.MoveControl import MoveControl
+from modules.Trace import tracer
+from functools import partial
+import sys
 import time
 
 
@@ -17,10 +22,12 @@ class MainControl:
     方法:
         __init__: 进行各接口实例化
         whether_continue: 暂停进程
-        start: 主流程
+        shift: 沿颁奖台横移到下一个物体
+        build_mission: 把任务写成阶段图
+        start: 主流程，按阶段图执行任务
     """
 
-    def __init__(self, port: str, baudrate: int = 9600, camera_index: int = 0) -> None:
+    def __init__(self, port: str, baudrate: int = 9600, camera_index: int = 0, merge_motion: bool = False) -> None:
         """
         设备初始化
 
@@ -28,6 +35,7 @@ class MainControl:
             port(str): 设备端口号
             baudrate(int): 波特率
             camera_index(int): 摄像头序号
+            merge_motion(bool): 是否合并相邻的底盘运动后再发送，见MotionBuffer.py
 
         Returns:
             None
@@ -38,8 +46,14 @@ class MainControl:
 
         self.camera = Camera(self.camera_index)
         self.movecontrol = MoveControl(port=port, baudrate=baudrate)
+        if merge_motion:
+            # 识别前先发送暂存的底盘运动
+            self.movecontrol = MotionBuffer(self.movecontrol)
+            self.camera.before_capture = self.movecontrol.flush
 
         self.skip = False
+        # 角度校正后小车没有运动时，位置校正复用该时刻之后识别的画面，见adjust_angle_by_lines
+        self._lines_since = None
 
     def whether_continue(self) -> None:
         """
@@ -48,6 +62,7 @@ class MainControl:
         Returns:
             None
         """
+        self.movecontrol.flush()
         while True:
             data = input('是否继续运行程序[y/s/n]:')
             if data == 'y' or data == 'Y':
@@ -78,8 +93,10 @@ class MainControl:
         self.movecontrol.move_X(distance=1.85)
 
     def turn_to_big_diameter(self) -> None:
-        self.movecontrol.highest()
-        self.movecontrol.rotate(angle=720)
+        # 升起机械臂的同时转向，识别直线前等待两者完成
+        self.movecontrol.servo_lane.highest()
+        self.movecontrol.chassis_lane.rotate(angle=720)
+        self.movecontrol.barrier()
         self.adjust_angle_by_lines()
         self.adjust_location_by_lines()
         self.movecontrol.move_X(distance=0.16)
@@ -91,7 +108,7 @@ class MainControl:
         first_skip = None
 
         while (time.time() - start_time) < 10:
-            predict_result = self.camera.detect_colors_bigmeter()
+            predict_result = self.camera.detect_colors_bigmeter(vote=True)
             if predict_result not in ['red', 'yellow']:
                 continue
             elif first_skip is None:
@@ -107,7 +124,7 @@ class MainControl:
                 break
 
         while (time.time() - start_time) < 20:  # 添加时间限制条件
-            predict_result = self.camera.detect_colors_bigmeter()
+            predict_result = self.camera.detect_colors_bigmeter(vote=True)
 
             if predict_result == 'red':
                 self.movecontrol.frontdoor(angle=66)
@@ -330,22 +347,108 @@ class MainControl:
     def adjust_angle_by_lines(self, x_move_1=None, x_move_2=None, reverse=False) -> None:
         if x_move_1 is not None:
             self.movecontrol.move_X(distance=x_move_1)
-        _, angle = self.camera.recognize_lines_to_correct_location()
-        angle = int(angle * 8)
-        if reverse:
-            angle = -angle
-        self.movecontrol.rotate(angle=angle)
+        since = time.monotonic()
+        self._lines_since = None
+        measurement = self.camera.measure_lines(newer_than=since)
+        if measurement is None:
+            my_logger.warning('未识别到地面胶带线，跳过角度校正')
+        else:
+            angle = int(measurement.angle * 8)
+            if reverse:
+                angle = -angle
+            self.movecontrol.rotate(angle=angle)
+            if angle == 0 and x_move_2 is None:
+                # 角度为0时不发送旋转，小车没有运动，紧接着的位置校正可以直接使用这次的识别结果；
+                # 旋转后画面中的横向偏差会变化，位置校正需重新识别
+                self._lines_since = since
         if x_move_2 is not None:
             self.movecontrol.move_X(distance=x_move_2)
 
     def adjust_location_by_lines(self) -> None:
-        distance, _ = self.camera.recognize_lines_to_correct_location()
+        measurement = self.camera.measure_lines(newer_than=self._lines_since)
+        self._lines_since = None
+        if measurement is None:
+            my_logger.warning('未识别到地面胶带线，跳过位置校正')
+            return
 
-        distance = (distance - self.camera.lines_central_x) * 0.001
+        distance = measurement.offset * 0.001
         distance = (distance * 100) / 100
 
         self.movecontrol.move_X(distance=distance)
 
+    def shift(self, y: float, x: float = None) -> None:
+        """
+        沿颁奖台横移到下一个物体
+
+        Args:
+            y(float): 左右移动距离，单位为米
+            x(float): 之后前后移动的距离，单位为米，None表示不移动
+
+        Returns:
+            None
+        """
+        self.movecontrol.move_Y(distance=y)
+        if x is not None:
+            self.movecontrol.move_X(distance=x)
+
+    def build_mission(self) -> Mission:
+        """
+        把开始指令之后的任务写成阶段图，各阶段声明占用的执行机构，默认依赖前一个阶段；
+        底盘横移的同时摆好下一个物体的抓取姿态、离开颁奖台的同时升起机械臂
+
+        Returns:
+            Mission: 任务阶段图
+        """
+        control = self.movecontrol
+        mission = Mission('red')
+
+        mission.add('go_to_big_diameter', self.go_to_big_diameter, (CHASSIS,))
+        mission.add('turn_to_big_diameter', self.turn_to_big_diameter, (CHASSIS, ARM, CAMERA))
+        mission.add('grab_ball_from_big_diameter', self.grab_ball_from_big_diameter, (ARM, CAMERA))
+        mission.add('turn_away_from_big_diameter', self.turn_away_from_big_diameter_to_warehouse, (CHASSIS, ARM, CAMERA))
+        mission.add('put_down_balls', self.put_down_items, (ARM,))
+        mission.add('go_back_to_diameter', self.go_back_to_diameter, (CHASSIS, ARM))
+
+        mission.add('go_to_platform', self.go_to_platform, (CHASSIS, ARM, CAMERA))
+        mission.add('platform_low_start', partial(control.servo, grab_mode=GrabMode.Platform_Low_Start), (ARM,))
+        mission.add('grab_platform_low_1', self.grab_from_platform_low, (CHASSIS, ARM, CAMERA))
+        mission.add('shift_low', partial(self.shift, -0.1, x=-0.03), (CHASSIS,))
+        mission.add('grab_platform_low_2', self.grab_from_platform_low, (CHASSIS, ARM, CAMERA))
+        mission.add('highest_low', control.highest, (ARM,))
+        mission.add('align_low', partial(self.adjust_angle_by_lines, x_move_1=-0.15, x_move_2=0.1), (CHASSIS, CAMERA))
+
+        mission.add('shift_to_high', partial(self.shift, -0.16), (CHASSIS,))
+        mission.add('platform_high_start_1', partial(control.servo, grab_mode=GrabMode.Platform_High_Start), (ARM,),
+                    after='align_low')
+        mission.add('grab_platform_high_1', self.grab_from_platform_high, (CHASSIS, ARM, CAMERA))
+        mission.add('shift_high_1', partial(self.shift, -0.09, x=-0.02), (CHASSIS,))
+        mission.add('grab_platform_high_2', self.grab_from_platform_high, (CHASSIS, ARM, CAMERA))
+        mission.add('highest_high_1', control.highest, (ARM,))
+        mission.add('align_high_1', partial(self.adjust_angle_by_lines, x_move_1=-0.15, x_move_2=0.1), (CHASSIS, CAMERA))
+
+        mission.add('shift_high_2', partial(self.shift, -0.09), (CHASSIS,))
+        mission.add('platform_high_start_2', partial(control.servo, grab_mode=GrabMode.Platform_High_Start), (ARM,),
+                    after='align_high_1')
+        mission.add('grab_platform_high_3', self.grab_from_platform_high, (CHASSIS, ARM, CAMERA))
+        mission.add('shift_high_3', partial(self.shift, -0.09), (CHASSIS,))
+        mission.add('grab_platform_high_4', self.grab_from_platform_high, (CHASSIS, ARM, CAMERA))
+        mission.add('highest_high_2', control.highest, (ARM,))
+        mission.add('align_high_2', partial(self.adjust_angle_by_lines, x_move_1=-0.15, x_move_2=0.1), (CHASSIS, CAMERA))
+
+        mission.add('shift_to_medium', partial(self.shift, -0.11), (CHASSIS,))
+        mission.add('platform_medium_start', partial(control.servo, grab_mode=GrabMode.Platform_Medium_Start), (ARM,),
+                    after='align_high_2')
+        mission.add('grab_platform_medium_1', self.grab_from_platform_medium, (CHASSIS, ARM, CAMERA))
+        mission.add('shift_medium', partial(self.shift, -0.09), (CHASSIS,))
+        mission.add('grab_platform_medium_2', self.grab_from_platform_medium, (CHASSIS, ARM, CAMERA))
+        mission.add('leave_platform', partial(self.shift, -0.09), (CHASSIS,))
+        mission.add('highest_medium', control.highest, (ARM,), after='grab_platform_medium_2')
+
+        mission.add('go_to_ware_house', self.go_to_ware_house, (CHASSIS, ARM, CAMERA))
+        mission.add('put_down_items', self.put_down_items, (ARM,))
+        mission.add('go_home', self.go_home, (CHASSIS, ARM))
+        return mission
+
     def start(self) -> None:
 
         my_logger.info(f'进行初始化')
@@ -355,87 +458,8 @@ class MainControl:
         my_logger.info(f'接收到开始指令，开始执行任务')
         time.sleep(0.6)
 
-        my_logger.info(f'-------------------前往大圆盘-------------------')
-
-        self.go_to_big_diameter()
-        my_logger.info(f'抵达大圆盘')
-
-        my_logger.info(f'转向大圆盘')
-        self.turn_to_big_diameter()
-
-        my_logger.info(f'准备抓取小球')
-        self.grab_ball_from_big_diameter()
-
-        my_logger.info(f'转离大圆盘')
-        self.turn_away_from_big_diameter_to_warehouse()
-        self.put_down_items()
-        self.go_back_to_diameter()
-
-        my_logger.info(f'-------------------大圆盘任务结束-------------------')
-
-        my_logger.info(f'-------------------前往颁奖台-------------------')
-
-        self.go_to_platform()
-
-        self.movecontrol.servo(grab_mode=GrabMode.Platform_Low_Start)
-
-        my_logger.info(f'颁奖台-低，第一个物体')
-        self.grab_from_platform_low()
-        self.movecontrol.move_Y(distance=-0.1)
-        self.movecontrol.move_X(distance=-0.03)
-
-        my_logger.info(f'颁奖台-低，第二个物体')
-        self.grab_from_platform_low()
-        self.movecontrol.highest()
-
-        self.adjust_angle_by_lines(x_move_1=-0.15, x_move_2=0.1)
-
-        self.movecontrol.move_Y(distance=-0.16)
-
-        self.movecontrol.servo(grab_mode=GrabMode.Platform_High_Start)
-        my_logger.info(f'颁奖台-高，第一个物体')
-        self.grab_from_platform_high()
-        self.movecontrol.move_Y(distance=-0.09)
-        self.movecontrol.move_X(distance=-0.02)
-        my_logger.info(f'颁奖台-高，第二个物体')
-        self.grab_from_platform_high()
-        self.movecontrol.highest()
-
-        self.adjust_angle_by_lines(x_move_1=-0.15, x_move_2=0.1)
-
-        self.movecontrol.move_Y(distance=-0.09)
-
-        self.movecontrol.servo(grab_mode=GrabMode.Platform_High_Start)
-        my_logger.info(f'颁奖台-高，第三个物体')
-        self.grab_from_platform_high()
-        self.movecontrol.move_Y(distance=-0.09)
-        my_logger.info(f'颁奖台-高，第四个物体')
-        self.grab_from_platform_high()
-        self.movecontrol.highest()
-
-        self.adjust_angle_by_lines(x_move_1=-0.15, x_move_2=0.1)
-
-        self.movecontrol.move_Y(distance=-0.11)
-
-        self.movecontrol.servo(grab_mode=GrabMode.Platform_Medium_Start)
-        my_logger.info(f'颁奖台-中，第一个物体')
-        self.grab_from_platform_medium()
-        self.movecontrol.move_Y(distance=-0.09)
-        my_logger.info(f'颁奖台-中，第二个物体')
-        self.grab_from_platform_medium()
-        self.movecontrol.move_Y(distance=-0.09)
-        self.movecontrol.highest()
-
-        my_logger.info(f'-------------------颁奖台任务结束 -------------------')
-
-        my_logger.info(f'-------------------前往仓储区-------------------')
-        self.go_to_ware_house()
-        my_logger.info(f'-------------------抵达仓储区-------------------')
-
-        my_logger.info(f'-------------------准备投放物料-------------------')
-        self.put_down_items()
-        my_logger.info(f'-------------------物理投放结束-------------------')
-        self.go_home()
+        # 各阶段按依赖关系执行，结束后输出关键路径
+        self.build_mission().run()
 
     def run(self):
         self.camera.open()
@@ -446,11 +470,20 @@ class MainControl:
 
 
 if __name__ == '__main__':
-    stm_port = '/dev/ttyUSB0'
+    # 可以指定串口，如虚拟下位机的伪终端: python red.py /tmp/ttyVIRT
+    stm_port = sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB0'
     stm_baudrate = 9600
     cam_index = 0
 
+    if trace_params['enabled']:
+        tracer.start()
     control = MainControl(port=stm_port, baudrate=stm_baudrate, camera_index=cam_index)
 
-    control.start()
+    try:
+        control.start()
+    finally:
+        # 关闭串口并输出各模式的指令延迟统计，中途出错时也保存时间线
+        control.movecontrol.close()
+        if tracer.enabled:
+            my_logger.info(f'任务时间线已保存到{trace_params["path"]}，共{tracer.save(trace_params["path"])}个事件')
     # control.run()
@@ -0,0 +1,111 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from Config import MoveMode
+from modules.AsyncControl import AsyncCamera, AsyncMoveControl
+from modules.Detection import Camera
+from modules.FrameSource import MemorySource
+from modules.MoveControl import MoveControl
+from modules.Simulator import make_simulated_serial
+
+
+def numbered_frames(count: int) -> list:
+    return [np.full((48, 64, 3), index, dtype=np.uint8) for index in range(count)]
+
+
+@pytest.fixture(params=['legacy', 'sequenced'])
+def simulated(request):
+    host, machine = make_simulated_serial(request.param, baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol=request.param, serial_port=host)
+    control.servo_timing.dwell = lambda *args: 0.0
+    motion = AsyncMoveControl(control)
+    yield motion, machine
+    motion.close()
+    machine.stop()
+
+
+@pytest.fixture
+def vision():
+    camera = Camera(threaded=False, source=MemorySource(numbered_frames(5)))
+    camera.open()
+    vision = AsyncCamera(camera)
+    yield vision
+    vision.close()
+    camera.release()
+
+
+def test_calls_run_in_call_order_without_await(simulated):
+    motion, machine = simulated
+
+    async def main():
+        # 调用时就交给运动线程，await的顺序不影响执行顺序
+        moves = [motion.move_X(0.1), motion.rotate(90), motion.bigarm(120), motion.move_Y(-0.2)]
+        await moves[-1]
+        await asyncio.gather(*moves)
+
+    asyncio.run(main())
+    assert [(mode, value) for mode, value, *_ in machine.executed] == [
+        (MoveMode.Forward, 100), (MoveMode.Turnleft, 90), (MoveMode.Bigarm, 120), (MoveMode.Rightward, 200)]
+
+
+def test_submit_resolves_on_action_done(simulated):
+    motion, machine = simulated
+
+    async def main():
+        futures = [motion.submit(MoveMode.Forward, distance=distance) for distance in (0.1, 0.2, 0.3)]
+        timestamps = await asyncio.gather(*futures)
+        await motion.flush()
+        return timestamps
+
+    timestamps = asyncio.run(main())
+    assert all(isinstance(timestamp, float) for timestamp in timestamps)
+    assert timestamps == sorted(timestamps)
+    assert [value for _, value, *_ in machine.executed] == [100, 200, 300]
+
+
+def test_camera_reads_frames_in_call_order(vision):
+    async def main():
+        return await asyncio.gather(*(vision.read() for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert all(ret for ret, _ in results)
+    assert [int(frame[0, 0, 0]) for _, frame in results] == [0, 1, 2, 3]
+
+
+def test_camera_runs_while_motion_is_busy(vision):
+    host, machine = make_simulated_serial('sequenced', baudrate=None, latency=0.0, time_scale=0.2)
+    motion = AsyncMoveControl(MoveControl(port=None, baudrate=None, protocol='sequenced', serial_port=host))
+
+    async def main():
+        move = motion.move_X(0.5)
+        ret, _ = await vision.read()
+        # 识别在运动线程之外执行，不需要等待运动完成
+        assert ret and not move.done()
+        await move
+
+    try:
+        asyncio.run(main())
+    finally:
+        motion.close()
+        machine.stop()
+    assert [mode for mode, *_ in machine.executed] == [MoveMode.Forward]
+
+
+def test_wait_for_timeout_leaves_command_running():
+    host, machine = make_simulated_serial('legacy', baudrate=None, latency=0.0, time_scale=0.2)
+    motion = AsyncMoveControl(MoveControl(port=None, baudrate=None, protocol='legacy', serial_port=host))
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(motion.move_X(0.5), 0.01)
+        # 超时只取消等待，后面的指令排在仍在执行的指令之后
+        await motion.move_Y(0.1)
+
+    try:
+        asyncio.run(main())
+    finally:
+        motion.close()
+        machine.stop()
+    assert [(mode, value) for mode, value, *_ in machine.executed] == [(MoveMode.Forward, 500), (MoveMode.Leftward, 100)]
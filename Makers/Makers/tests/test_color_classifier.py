@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+import pytest
+
+from Config import color_ranges
+from modules.ColorClassifier import ColorClassifier, largest_blob_components, largest_blob_contours
+from modules.Detection import Camera
+
+
+def hsv_grid(step: int = 1) -> np.ndarray:
+    # 每行一个H值，每列为一组(S, V)，覆盖HSV空间中的所有取值
+    sv = np.arange(0, 256, step, dtype=np.uint8)
+    s, v = np.meshgrid(sv, sv)
+    h = np.arange(180, dtype=np.uint8)
+    grid = np.empty((180, s.size, 3), dtype=np.uint8)
+    grid[:, :, 0] = h[:, None]
+    grid[:, :, 1] = s.ravel()
+    grid[:, :, 2] = v.ravel()
+    return grid
+
+
+def in_range_mask(hsv: np.ndarray, bounds: list) -> np.ndarray:
+    # 改为查找表之前_detect_color_common逐个区间调用cv2.inRange得到的掩膜
+    mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    for lower, upper in bounds:
+        mask = cv2.bitwise_or(mask, cv2.inRange(hsv, np.array(lower), np.array(upper)))
+    return mask
+
+
+def test_lookup_table_matches_in_range():
+    classifier = ColorClassifier(color_ranges)
+    assert classifier._hue_only
+    hsv = hsv_grid()
+    labels = classifier.classify(hsv)
+    for color_name, bounds in color_ranges.items():
+        assert np.array_equal(classifier.mask(labels, color_name), in_range_mask(hsv, bounds)), color_name
+
+
+def test_bit_lookup_tables_match_in_range():
+    # S、V范围各不相同时使用按位查找表
+    ranges = {
+        'red': [([0, 100, 100], [10, 255, 255]), ([160, 80, 120], [179, 255, 255])],
+        'blue': [([95, 60, 40], [120, 200, 255])],
+        'yellow': [([20, 100, 100], [30, 255, 200])],
+    }
+    classifier = ColorClassifier(ranges)
+    assert not classifier._hue_only
+    hsv = hsv_grid(step=3)
+    labels = classifier.classify(hsv)
+    for color_name, bounds in ranges.items():
+        assert np.array_equal(classifier.mask(labels, color_name), in_range_mask(hsv, bounds)), color_name
+
+
+@pytest.mark.parametrize('ranges', [
+    {'a': [([0, 0, 0], [20, 255, 255])], 'b': [([10, 0, 0], [30, 255, 255])]},
+    {'a': [([0, 0, 0], [20, 255, 255])], 'b': [([10, 50, 0], [30, 255, 255])]},
+])
+def test_overlapping_ranges_prefer_first_color(ranges):
+    classifier = ColorClassifier(ranges)
+    hsv = hsv_grid(step=5)
+    labels = classifier.classify(hsv)
+    mask_a = in_range_mask(hsv, ranges['a'])
+    mask_b = cv2.bitwise_and(in_range_mask(hsv, ranges['b']), cv2.bitwise_not(mask_a))
+    assert np.array_equal(classifier.mask(labels, 'a'), mask_a)
+    assert np.array_equal(classifier.mask(labels, 'b'), mask_b)
+
+
+def test_classify_bgr():
+    classifier = ColorClassifier(color_ranges)
+    frame = np.zeros((10, 30, 3), dtype=np.uint8)
+    frame[:, :10] = (0, 0, 220)
+    frame[:, 10:20] = (220, 0, 0)
+    labels = classifier.classify_bgr(frame)
+    assert (labels[:, :10] == classifier.labels['red']).all()
+    assert (labels[:, 10:20] == classifier.labels['blue']).all()
+    assert (labels[:, 20:] == 0).all()
+
+
+def blob_mask() -> np.ndarray:
+    mask = np.zeros((240, 320), dtype=np.uint8)
+    cv2.rectangle(mask, (20, 30), (79, 89), 255, -1)
+    cv2.circle(mask, (200, 120), 50, 255, -1)
+    cv2.rectangle(mask, (280, 200), (289, 209), 255, -1)
+    return mask
+
+
+def test_components_find_the_same_blob_as_contours():
+    mask = blob_mask()
+    contour_blob = largest_blob_contours(mask, 800)
+    component_blob = largest_blob_components(mask, 800)
+    # 面积的定义不同(外轮廓面积与像素数)，外接矩形相同
+    assert component_blob[1:] == contour_blob[1:] == (150, 70, 101, 101)
+    assert component_blob[0] >= contour_blob[0]
+    assert component_blob[0] == pytest.approx(contour_blob[0], rel=0.05)
+
+
+@pytest.mark.parametrize('extract', [largest_blob_contours, largest_blob_components])
+def test_blobs_below_min_area_are_ignored(extract):
+    mask = blob_mask()
+    assert extract(mask, 100000) is None
+    assert extract(np.zeros_like(mask), 0) is None
+
+
+def test_camera_blob_modes_agree():
+    frame = np.full((240, 320, 3), 120, dtype=np.uint8)
+    cv2.rectangle(frame, (20, 30), (99, 109), (0, 0, 220), -1)
+    cv2.circle(frame, (220, 150), 45, (220, 0, 0), -1)
+
+    results = {}
+    for mode in ('contours', 'components'):
+        camera = Camera()
+        camera.blob_mode = mode
+        blobs, _ = camera._detect_color_blobs(frame.copy(), 800)
+        results[mode] = ({name: blob[1:] for name, blob in blobs.items()}, camera.location_x, camera.location_y)
+    assert results['contours'] == results['components']
+    assert set(results['contours'][0]) == {'red', 'blue'}
@@ -0,0 +1,94 @@
+from concurrent.futures import Future
+
+import pytest
+
+from Config import MoveMode
+from modules.MoveControl import MoveControl
+from modules.Simulator import make_simulated_serial
+
+
+def open_control(protocol: str = 'sequenced', parallel: bool = False, time_scale: float = 0.01) -> tuple:
+    host, machine = make_simulated_serial(protocol, baudrate=None, latency=0.0, time_scale=time_scale,
+                                          parallel=parallel)
+    control = MoveControl(port=None, baudrate=None, protocol=protocol, serial_port=host, parallel_lanes=parallel)
+    control.servo_timing.dwell = lambda *args: 0.0
+    return control, machine
+
+
+def executions(machine, mode: MoveMode) -> list:
+    return [(start, end) for executed_mode, _, _, start, end in machine.executed if executed_mode == mode]
+
+
+def test_lanes_only_accept_their_methods():
+    control, machine = open_control()
+    try:
+        with pytest.raises(AttributeError):
+            control.chassis_lane.bigarm(90)
+        with pytest.raises(AttributeError):
+            control.servo_lane.move_X(0.1)
+        with pytest.raises(AttributeError):
+            control.chassis_lane.calibration()
+    finally:
+        control.close()
+        machine.stop()
+
+
+@pytest.mark.parametrize('protocol', ['legacy', 'sequenced'])
+def test_lanes_keep_call_order_and_barrier_waits_for_both(protocol):
+    control, machine = open_control(protocol)
+    try:
+        moves = [control.chassis_lane.move_X(0.1), control.chassis_lane.rotate(90), control.chassis_lane.move_Y(0.2)]
+        servos = [control.servo_lane.bigarm(120), control.servo_lane.cirque(40)]
+        assert all(isinstance(future, Future) for future in moves + servos)
+        control.barrier()
+        assert all(future.done() for future in moves + servos)
+        assert not control.chassis_lane.busy() and not control.servo_lane.busy()
+    finally:
+        control.close()
+        machine.stop()
+    executed = [(mode, value) for mode, value, *_ in machine.executed]
+    assert [command for command in executed if command[0] not in (MoveMode.Bigarm, MoveMode.Cirque)] == [
+        (MoveMode.Forward, 100), (MoveMode.Turnleft, 90), (MoveMode.Leftward, 200)]
+    assert [command for command in executed if command[0] in (MoveMode.Bigarm, MoveMode.Cirque)] == [
+        (MoveMode.Bigarm, 120), (MoveMode.Cirque, 40)]
+    assert machine.servos == {MoveMode.Bigarm: 120, MoveMode.Cirque: 40}
+
+
+def test_parallel_lower_machine_runs_lanes_together():
+    control, machine = open_control(parallel=True, time_scale=0.1)
+    try:
+        control.chassis_lane.move_X(0.5)
+        control.servo_lane.bigarm(120)
+        control.barrier()
+        control.chassis_lane.move_Y(0.1)
+        control.barrier()
+    finally:
+        control.close()
+        machine.stop()
+    (move_start, move_end), = executions(machine, MoveMode.Forward)
+    (servo_start, servo_end), = executions(machine, MoveMode.Bigarm)
+    # 小车移动的同时舵机转动
+    assert servo_start < move_end and move_start < servo_end
+    # barrier之后的指令在两者都执行完后才开始
+    (after_start, _), = executions(machine, MoveMode.Leftward)
+    assert after_start >= max(move_end, servo_end)
+
+
+def test_barrier_raises_lane_error_after_both_lanes_finish():
+    control, machine = open_control()
+
+    def fail():
+        raise ValueError('舵机通道出错')
+
+    try:
+        control.servo_lane.submit(fail)
+        move = control.chassis_lane.move_X(0.2)
+        with pytest.raises(ValueError):
+            control.barrier()
+        assert move.done() and move.exception() is None
+        # 出错的调用已被取出，之后的barrier正常返回
+        control.barrier()
+    finally:
+        control.close()
+        machine.stop()
+    assert [(mode, value) for mode, value, *_ in machine.executed] == [(MoveMode.Forward, 200)]
@@ -0,0 +1,374 @@
+import math
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from Config import line_params
+from modules.Detection import Camera
+from modules.FrameSource import FrameSource, MemorySource
+
+
+class LiveSource(FrameSource):
+    """
+    按固定间隔产生画面的实时画面来源，画面的像素值为其序号，produce帧之后不再产生画面
+    """
+
+    realtime = True
+
+    def __init__(self, interval: float = 0.005, produce: int = None) -> None:
+        self.interval = interval
+        self.produce = produce
+        self.reads = 0
+        self._opened = False
+
+    def open(self) -> None:
+        self._opened = True
+
+    def read(self) -> tuple:
+        time.sleep(self.interval)
+        if self.produce is not None and self.reads >= self.produce:
+            return False, None
+        self.reads += 1
+        return True, np.full((48, 64, 3), self.reads % 256, dtype=np.uint8)
+
+    def release(self) -> None:
+        self._opened = False
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    @property
+    def frame_size(self) -> tuple:
+        return 64, 48
+
+
+def open_camera(source: FrameSource, threaded: bool = True) -> Camera:
+    camera = Camera(threaded=threaded, source=source)
+    camera.open()
+    return camera
+
+
+def test_grabber_returns_frames_newer_than_request():
+    camera = open_camera(LiveSource())
+    try:
+        assert camera._grab_thread is not None
+        ret, _ = camera.read()
+        assert ret
+        since = time.monotonic()
+        ret, frame = camera.read(newer_than=since)
+        assert ret
+        assert camera.frame_time > since
+        # 槽位中的画面就是序号为frame_seq的那一帧
+        assert frame[0, 0, 0] == camera.frame_seq % 256
+    finally:
+        camera.release()
+
+
+def test_grabber_sequence_increases():
+    camera = open_camera(LiveSource())
+    try:
+        seqs = []
+        for _ in range(3):
+            assert camera.read(newer_than=time.monotonic())[0]
+            seqs.append(camera.frame_seq)
+        assert seqs == sorted(set(seqs))
+    finally:
+        camera.release()
+
+
+def test_grabber_times_out_without_new_frames():
+    camera = open_camera(LiveSource(produce=2))
+    try:
+        assert camera.read()[0]
+        # 等待画面来源产生完全部画面
+        time.sleep(0.05)
+        start = time.monotonic()
+        assert camera.read(newer_than=time.monotonic(), timeout=0.1) == (False, None)
+        assert time.monotonic() - start < 1.0
+    finally:
+        camera.release()
+
+
+def test_unthreaded_read_flushes_stale_frames():
+    source = LiveSource(interval=0)
+    camera = open_camera(source, threaded=False)
+    try:
+        assert camera._grab_thread is None
+        camera.read()
+        assert source.reads == 1
+        camera.read()
+        assert source.reads == 2
+        camera.read(newer_than=time.monotonic())
+        assert source.reads == 3 + camera.flush_frames
+    finally:
+        camera.release()
+
+
+def color_frame(color: str = None, shape: str = 'rect') -> np.ndarray:
+    frame = np.full((240, 320, 3), 120, dtype=np.uint8)
+    bgr = {'red': (0, 0, 220), 'blue': (220, 0, 0)}.get(color)
+    if bgr is not None and shape == 'rect':
+        cv2.rectangle(frame, (100, 80), (199, 159), bgr, -1)
+    elif bgr is not None:
+        cv2.circle(frame, (160, 120), 50, bgr, -1)
+    return frame
+
+
+def vote(frames: list, max_attempts: int = 5) -> tuple:
+    camera = open_camera(MemorySource(frames))
+    try:
+        return camera.detect_colors_platform(max_attempts=max_attempts, vote=True), camera.frame_seq
+    finally:
+        camera.release()
+
+
+@pytest.mark.parametrize('shape', ['rect', 'circle'])
+def test_vote_stops_once_the_result_cannot_change(shape):
+    # 每帧权重约为1(矩形)或0.785(圆)，第3帧后领先量超过剩余的2帧
+    assert vote([color_frame('red', shape)]) == ('red', 3)
+
+
+def test_vote_without_blobs_returns_none():
+    assert vote([color_frame()]) == (None, 3)
+
+
+def test_vote_reads_on_while_the_runner_up_can_still_win():
+    frames = [color_frame('red'), color_frame('red'), color_frame('blue'), color_frame('blue'), color_frame('blue')]
+    assert vote(frames) == ('blue', 5)
+
+
+def test_vote_without_a_clear_winner_reads_all_frames():
+    assert vote([color_frame('red'), color_frame('blue')], max_attempts=6) == ('red', 6)
+
+
+def ring_frames(count: int = 10, seed: int = 0) -> list:
+    # 灰色噪声背景上位置与半径随机的同心圆环
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        frame = np.full((480, 640, 3), 120, dtype=np.uint8)
+        center = (380 + int(rng.integers(-40, 41)), 240 + int(rng.integers(-40, 41)))
+        first_radius = int(rng.integers(60, 120))
+        for radius in range(first_radius, first_radius + 40, 8):
+            cv2.circle(frame, center, radius, (20, 20, 20), 3, cv2.LINE_AA)
+        frames.append(np.clip(frame + rng.normal(0, 12, frame.shape), 0, 255).astype(np.uint8))
+    return frames
+
+
+def ring_locations(frames: list, levels: int, profile: str = 'platform_low') -> list:
+    camera = open_camera(MemorySource(frames))
+    camera.circle_pyramid_levels = levels
+    locations = []
+    try:
+        for _ in frames:
+            camera.location_x = camera.location_y = None
+            assert camera.detect_rings(profile)
+            locations.append((camera.location_x, camera.location_y))
+    finally:
+        camera.release()
+    return locations
+
+
+def test_pyramid_levels_locate_the_same_rings():
+    frames = ring_frames()
+    expected = ring_locations(frames, 0)
+    assert ring_locations(frames, 1) == expected
+    assert ring_locations(frames, 2) == expected
+
+
+def legacy_ring(frame: np.ndarray, hough: dict) -> tuple or None:
+    # 改为按参数配置检测之前detect_circles与detect_circles_platform_low中的检测与筛选
+    height, width = frame.shape[:2]
+    frame_center = (width / 2, height / 2)
+    gray = cv2.cvtColor(cv2.medianBlur(frame[:, 130:], 5), cv2.COLOR_BGR2GRAY)
+    circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, 1, 100, **hough)
+    closest_circle = None
+    min_distance = float('inf')
+    if circles is not None:
+        for x, y, _ in np.uint16(np.around(circles))[0, :]:
+            if (frame_center[0] - width * 0.25 < x < frame_center[0] + width * 0.25 and
+                    frame_center[1] - height * 0.25 < y < frame_center[1] + height * 0.25):
+                distance = np.sqrt((x - frame_center[0]) ** 2 + (y - frame_center[1]) ** 2)
+                if distance < min_distance:
+                    min_distance = distance
+                    closest_circle = (int(x), int(y))
+    return closest_circle
+
+
+@pytest.mark.parametrize('profile, detector, hough', [
+    ('default', 'detect_circles', {'param1': 60, 'param2': 60, 'minRadius': 100, 'maxRadius': 200}),
+    ('platform_low', 'detect_circles_platform_low', {'param1': 50, 'param2': 50, 'minRadius': 50, 'maxRadius': 200}),
+])
+def test_ring_profiles_match_legacy_detectors(profile, detector, hough):
+    frames = ring_frames(count=6, seed=1)
+    camera = open_camera(MemorySource(frames))
+    try:
+        for frame in frames:
+            camera.location_x = camera.location_y = None
+            found = getattr(camera, detector)()
+            expected = legacy_ring(frame, hough)
+            assert found == (expected is not None)
+            if found:
+                assert (camera.location_x, camera.location_y) == expected
+    finally:
+        camera.release()
+
+
+def test_high_profile_finds_bright_ring():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.circle(frame, (320, 240), 140, (255, 255, 255), 25)
+    camera = open_camera(MemorySource([frame]))
+    try:
+        assert camera.detect_circles_from_high()
+        assert abs(camera.location_x - 320) <= 3 and abs(camera.location_y - 240) <= 3
+    finally:
+        camera.release()
+
+
+def test_ring_outside_window_is_ignored():
+    frames = []
+    for center_y in (240, 410):
+        frame = np.full((480, 640, 3), 120, dtype=np.uint8)
+        cv2.circle(frame, (450, center_y), 60, (20, 20, 20), 3, cv2.LINE_AA)
+        frames.append(frame)
+    camera = open_camera(MemorySource(frames))
+    try:
+        assert camera.detect_circles_platform_low()
+        # 圆心需位于画面中心±0.25倍宽高的范围内
+        assert not camera.detect_circles_platform_low()
+    finally:
+        camera.release()
+
+
+def legacy_line_points(lines: np.ndarray or None) -> np.ndarray or None:
+    # 改为数组运算之前recognize_lines_to_correct_location中逐条直线计算端点与角度的实现
+    threshold = line_params['horizontal_angle_threshold']
+    all_points = []
+    if lines is not None:
+        for line in lines:
+            rho, theta = line[0]
+            a = np.cos(theta)
+            b = np.sin(theta)
+            x0 = a * rho
+            y0 = b * rho
+            x1 = int(x0 + 1000 * (-b))
+            y1 = int(y0 + 1000 * (a))
+            x2 = int(x0 - 1000 * (-b))
+            y2 = int(y0 - 1000 * (a))
+            dx = x2 - x1
+            dy = y2 - y1
+            angle = math.degrees(math.atan(dy / dx)) if dx != 0 else 90.0
+            if threshold < abs(angle) < (180 - threshold):
+                all_points.append((x1, y1))
+                all_points.append((x2, y2))
+    if len(all_points) > 1:
+        return np.array(all_points, dtype=np.int32)
+    return None
+
+
+def vectorised_line_points(lines: np.ndarray) -> np.ndarray or None:
+    return Camera._non_horizontal_points(Camera._hough_segments(lines), line_params['horizontal_angle_threshold'])
+
+
+def test_vectorised_line_points_match_legacy():
+    rng = np.random.default_rng(0)
+    theta = np.concatenate([rng.uniform(0, np.pi, 200),
+                            [0, np.pi / 2, np.pi / 2 - np.radians(2), np.pi / 2 + np.radians(2.5)]])
+    rho = rng.uniform(-300, 600, len(theta))
+    lines = np.stack((rho, theta), axis=1).astype(np.float32)[:, np.newaxis, :]
+    assert np.array_equal(vectorised_line_points(lines), legacy_line_points(lines))
+
+
+def test_only_horizontal_lines_give_no_points():
+    lines = np.array([[[100, np.pi / 2]], [[200, np.pi / 2 + 0.01]]], dtype=np.float32)
+    assert legacy_line_points(lines) is None
+    assert vectorised_line_points(lines) is None
+
+
+def tape_frame(top_x: int, bottom_x: int, horizontal_y: int = None) -> np.ndarray:
+    frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+    cv2.line(frame, (top_x, 0), (bottom_x, 479), (255, 255, 255), 14, cv2.LINE_AA)
+    if horizontal_y is not None:
+        cv2.line(frame, (0, horizontal_y), (639, horizontal_y), (255, 255, 255), 14, cv2.LINE_AA)
+    return frame
+
+
+def tape_angle(top_x: int, bottom_x: int) -> float:
+    return math.degrees(math.atan((bottom_x - top_x) / 479))
+
+
+@pytest.mark.parametrize('line_mode', ['standard', 'probabilistic'])
+@pytest.mark.parametrize('top_x, bottom_x, horizontal_y', [(330, 370, None), (380, 320, 200), (350, 350, 300)])
+def test_recognize_lines_measures_tape(line_mode, top_x, bottom_x, horizontal_y):
+    camera = open_camera(MemorySource([tape_frame(top_x, bottom_x, horizontal_y)]))
+    camera.line_mode = line_mode
+    try:
+        x, angle = camera.recognize_lines_to_correct_location(max_attempts=1)
+    finally:
+        camera.release()
+    # 横向胶带被角度阈值滤除，不影响拟合结果；x为裁剪后(250:450)的坐标
+    assert angle == pytest.approx(tape_angle(top_x, bottom_x), abs=1.0)
+    assert x == pytest.approx(bottom_x - 250, abs=4)
+
+
+def test_standard_line_points_match_legacy_on_tape():
+    camera = Camera()
+    for top_x, bottom_x, horizontal_y in [(340, 360, None), (380, 320, 200), (300, 420, 120)]:
+        frame = tape_frame(top_x, bottom_x, horizontal_y)[:, 250:450]
+        _, binary_image = cv2.threshold(frame, 210, 255, cv2.THRESH_BINARY)
+        kernel = np.ones((5, 5), np.uint8)
+        edges = cv2.Canny(cv2.dilate(cv2.erode(binary_image, kernel, iterations=2), kernel, iterations=2), 50, 150)
+        lines = cv2.HoughLines(edges, 1, np.pi / 180, line_params['threshold'])
+        assert np.array_equal(camera._line_points(edges), legacy_line_points(lines))
+
+
+@pytest.fixture
+def line_camera(monkeypatch):
+    camera = open_camera(MemorySource([tape_frame(330, 370)]))
+    camera.detections = 0
+    measure_line_frame = camera._measure_line_frame
+
+    def counted(frame):
+        camera.detections += 1
+        return measure_line_frame(frame)
+
+    monkeypatch.setattr(camera, '_measure_line_frame', counted)
+    yield camera
+    camera.release()
+
+
+def test_measure_lines_result(line_camera):
+    measurement = line_camera.measure_lines()
+    assert measurement.angle == pytest.approx(tape_angle(330, 370), abs=1.0)
+    assert measurement.offset == measurement.bottom_x - 100
+    assert measurement.seq == line_camera.frame_seq
+    assert measurement.timestamp == line_camera.frame_time
+    assert 0 < measurement.confidence <= 1
+
+
+def test_measure_lines_rereads_by_default(line_camera):
+    first = line_camera.measure_lines()
+    second = line_camera.measure_lines()
+    assert second.seq == first.seq + 1
+    assert line_camera.detections == 2
+
+
+def test_measure_lines_reuses_cached_result_for_earlier_request(line_camera):
+    since = time.monotonic()
+    first = line_camera.measure_lines(newer_than=since)
+    second = line_camera.measure_lines(newer_than=since)
+    assert second is first
+    assert line_camera.frame_seq == first.seq
+    assert line_camera.detections == 1
+    # 要求更新的画面时重新识别
+    assert line_camera.measure_lines(newer_than=first.timestamp).seq == first.seq + 1
+    assert line_camera.detections == 2
+
+
+def test_measure_lines_cache_is_bounded(line_camera):
+    line_camera.line_cache_size = 3
+    for _ in range(5):
+        line_camera.measure_lines()
+    assert list(line_camera._line_cache) == [3, 4, 5]
@@ -0,0 +1,135 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.Detection import Camera
+from modules.FrameSource import (FrameRecorder, FrameSource, ImageDirectorySource, MemorySource, V4LSource,
+                                 VideoFileSource, make_source)
+
+
+def make_frames(count: int = 3) -> list:
+    return [np.full((24, 32, 3), index * 40, dtype=np.uint8) for index in range(count)]
+
+
+def record(directory, frames: list, fmt: str = 'npy', interval: float = None) -> None:
+    recorder = FrameRecorder(str(directory), fmt=fmt)
+    for index, frame in enumerate(frames):
+        recorder.write(frame, timestamp=None if interval is None else 100 + index * interval)
+    recorder.close()
+
+
+def read_all(source: FrameSource, count: int) -> list:
+    return [source.read() for _ in range(count)]
+
+
+def test_frame_source_is_abstract():
+    with pytest.raises(TypeError):
+        FrameSource()
+
+
+@pytest.mark.parametrize('fmt', ['npy', 'png'])
+def test_directory_replay_returns_recorded_frames(tmp_path, fmt):
+    frames = make_frames()
+    record(tmp_path, frames, fmt=fmt)
+    source = ImageDirectorySource(str(tmp_path))
+    source.open()
+    assert source.isOpened()
+    assert source.frame_size == (32, 24)
+    assert not source.realtime
+    results = read_all(source, 4)
+    assert [ret for ret, _ in results] == [True, True, True, False]
+    for (_, frame), expected in zip(results, frames):
+        assert np.array_equal(frame, expected)
+    source.release()
+    assert not source.isOpened()
+
+
+def test_directory_replay_loops(tmp_path):
+    frames = make_frames()
+    record(tmp_path, frames)
+    source = ImageDirectorySource(str(tmp_path), loop=True)
+    source.open()
+    results = read_all(source, 7)
+    assert all(ret for ret, _ in results)
+    assert np.array_equal(results[6][1], frames[0])
+
+
+def test_directory_replay_follows_timestamps(tmp_path):
+    record(tmp_path, make_frames(), interval=0.05)
+    source = ImageDirectorySource(str(tmp_path), pace='realtime')
+    source.open()
+    assert source.realtime
+    start = time.monotonic()
+    read_all(source, 3)
+    assert time.monotonic() - start >= 0.09
+
+
+def test_empty_directory_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        ImageDirectorySource(str(tmp_path)).open()
+    with pytest.raises(ValueError):
+        ImageDirectorySource(str(tmp_path), pace='slow')
+
+
+def test_video_file_replay(tmp_path):
+    path = str(tmp_path / 'frames.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (32, 24))
+    if not writer.isOpened():
+        pytest.skip('OpenCV无法写入视频文件')
+    for frame in make_frames():
+        writer.write(frame)
+    writer.release()
+
+    source = VideoFileSource(path)
+    source.open()
+    assert source.frame_size == (32, 24)
+    assert [ret for ret, _ in read_all(source, 4)] == [True, True, True, False]
+    source.release()
+
+    source = VideoFileSource(path, loop=True)
+    source.open()
+    assert all(ret for ret, _ in read_all(source, 5))
+    source.release()
+
+
+def test_make_source(tmp_path):
+    assert isinstance(make_source(0), V4LSource)
+    assert isinstance(make_source('1'), V4LSource)
+    assert isinstance(make_source(str(tmp_path)), ImageDirectorySource)
+    source = make_source(str(tmp_path / 'run.mp4'), pace='realtime', loop=True)
+    assert isinstance(source, VideoFileSource)
+    assert source.realtime and source.loop
+
+
+def test_memory_source_cycles_copies():
+    frames = make_frames(2)
+    source = MemorySource(frames)
+    assert source.read() == (False, None)
+    source.open()
+    assert source.frame_size == (32, 24)
+    results = read_all(source, 3)
+    assert all(ret for ret, _ in results)
+    assert np.array_equal(results[2][1], frames[0])
+    # 返回的是副本，识别方法在画面上绘制不会改变画面列表
+    results[0][1][:] = 255
+    assert np.array_equal(source.read()[1], frames[1])
+    assert np.array_equal(source.read()[1], frames[0])
+
+
+def test_camera_replays_directory_in_order(tmp_path):
+    frames = make_frames()
+    record(tmp_path, frames)
+    camera = Camera(source=ImageDirectorySource(str(tmp_path)))
+    camera.open()
+    try:
+        # 尽快回放时不启用后台取帧线程，逐帧读取不跳帧
+        assert camera._grab_thread is None
+        assert (camera.frame_width, camera.frame_height) == (32, 24)
+        for expected in frames:
+            ret, frame = camera.read(newer_than=camera.frame_time)
+            assert ret and np.array_equal(frame, expected)
+        assert camera.read() == (False, None)
+    finally:
+        camera.release()
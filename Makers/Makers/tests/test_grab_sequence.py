@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from Config import MoveMode
+from modules.GrabSequence import compile_sequences, load_sequences
+from modules.Protocol import FrameEncoder, command_value, decode_pose, encode_pose
+
+
+def test_compiled_frames_match_encoder():
+    encoder = FrameEncoder()
+    for name, steps in compile_sequences(load_sequences()).items():
+        for step in steps:
+            if step.pose is None:
+                continue
+            assert decode_pose(list(step.pose_frame)) == step.pose
+            assert step.pose_frame == bytes(encode_pose(step.pose))
+            for command in step.commands:
+                expected = encoder.encode(command.channel, command_value(command.channel, rotation_angle=command.angle))
+                assert command.frame == bytes(expected)
+
+
+def test_sleep_and_dwell_steps(tmp_path):
+    path = tmp_path / 'sequences.json'
+    path.write_text(json.dumps({'Highest': [
+        {'pose': {'Bigarm': 120, 'Forearm': 30}, 'dwell': 0.2},
+        {'sleep': 0.5},
+    ]}), encoding='utf-8')
+    pose_step, sleep_step = compile_sequences(load_sequences(str(path)))['Highest']
+    assert pose_step.pose == {MoveMode.Bigarm: 120, MoveMode.Forearm: 30}
+    assert [command.channel for command in pose_step.commands] == [MoveMode.Bigarm, MoveMode.Forearm]
+    assert pose_step.dwell == 0.2
+    assert sleep_step.pose is None and sleep_step.sleep == 0.5
+
+
+@pytest.mark.parametrize('step', [
+    {'pose': {'Forward': 10}},
+    {'pose': {'Bigarm': 181}},
+    {'sleep': -1},
+    {},
+])
+def test_invalid_steps(tmp_path, step):
+    path = tmp_path / 'sequences.json'
+    path.write_text(json.dumps({'Highest': [step]}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_sequences(str(path))
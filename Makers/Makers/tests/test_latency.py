@@ -0,0 +1,147 @@
+import time
+
+import pytest
+
+from Config import MoveMode, ack_deadline_params
+from modules.Latency import LatencyStats, ack_deadline, expected_duration
+from modules.MoveControl import MoveControl
+from modules.Simulator import make_simulated_serial
+
+
+class DroppingSerial:
+    """
+    丢弃前drop次写入的模拟串口，用于模拟下位机没有收到指令
+    """
+
+    def __init__(self, port, drop: int = 1) -> None:
+        self.port = port
+        self.drop = drop
+        self.dropped = []
+
+    def write(self, data: bytes) -> int:
+        if self.drop:
+            self.drop -= 1
+            self.dropped.append(bytes(data))
+            return len(data)
+        return self.port.write(data)
+
+    @property
+    def timeout(self) -> float:
+        return self.port.timeout
+
+    @timeout.setter
+    def timeout(self, value: float) -> None:
+        # SerialReader按timeout轮询，需设置到被包装的串口上
+        self.port.timeout = value
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+
+@pytest.fixture(params=['legacy', 'sequenced'])
+def dropping(request):
+    host, machine = make_simulated_serial(request.param, baudrate=None, latency=0.0, time_scale=0.01)
+    port = DroppingSerial(host)
+    control = MoveControl(port=None, baudrate=None, protocol=request.param, serial_port=port)
+    control.ack_timeout = 0.2
+    yield control, machine, port
+    control.close()
+    machine.stop()
+
+
+def test_expected_duration():
+    params = ack_deadline_params
+    assert expected_duration(MoveMode.Forward, 1000) == pytest.approx(params['overhead'] + 1 / params['speed'])
+    assert expected_duration(MoveMode.Turnleft, 720) == pytest.approx(params['overhead'] + 720 / params['turn_speed'])
+    assert expected_duration(MoveMode.Calibration, 0) == params['calibration']
+    assert expected_duration(MoveMode.Bigarm, 90) == params['servo']
+    assert expected_duration(MoveMode.Pose, {MoveMode.Bigarm: 90}) == params['servo']
+
+
+def test_ack_deadline():
+    params = dict(ack_deadline_params, margin=0.5, scale=2.0)
+    assert ack_deadline(3.0, params) == pytest.approx(6.5)
+    # 零距离的运动也有约2s的固定耗时，期限不低于实测的最慢值
+    assert ack_deadline(expected_duration(MoveMode.Turnleft, 0)) >= 3.0
+
+
+def test_sequenced_deadlines_follow_queue():
+    host, machine = make_simulated_serial('sequenced', baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol='sequenced', serial_port=host)
+    try:
+        futures = [control.submit(MoveMode.Forward, distance=1.0) for _ in range(3)]
+        control.flush()
+    finally:
+        control.close()
+        machine.stop()
+    expected = expected_duration(MoveMode.Forward, 1000)
+    # 每条指令的期限从前面的指令预计执行完的时刻算起
+    gaps = [second.deadline_at - first.deadline_at for first, second in zip(futures, futures[1:])]
+    assert gaps == [pytest.approx(expected, abs=0.05)] * 2
+    assert futures[0].deadline_at - futures[0].sent_at == pytest.approx(ack_deadline(expected), abs=0.05)
+
+
+def test_servo_command_is_retransmitted(dropping):
+    control, machine, port = dropping
+    future = control.submit(MoveMode.Bigarm, rotation_angle=90)
+    control.wait_ack(future)
+    assert future.retransmits == 1
+    assert len(port.dropped) == 1
+    assert [(mode, value) for mode, value, *_ in machine.executed] == [(MoveMode.Bigarm, 90)]
+    assert control.latency.samples(MoveMode.Bigarm)
+
+
+def test_move_is_not_retransmitted(dropping):
+    control, machine, port = dropping
+    start = time.monotonic()
+    # 原协议下submit等待反馈，超时在submit中抛出
+    with pytest.raises(TimeoutError):
+        control.wait_ack(control.submit(MoveMode.Forward, distance=0.1))
+    assert time.monotonic() - start < 1.0
+    assert len(port.dropped) == 1
+    assert machine.executed == []
+
+
+def test_retransmits_are_limited(dropping):
+    control, machine, port = dropping
+    port.drop = control.max_retransmits + 1
+    with pytest.raises(TimeoutError):
+        control.wait_ack(control.submit(MoveMode.Cirque, rotation_angle=40))
+    assert len(port.dropped) == control.max_retransmits + 1
+    assert machine.executed == []
+    # 放弃的指令不再占用窗口，之后的指令可以正常发送
+    control.wait_ack(control.submit(MoveMode.Cirque, rotation_angle=40))
+    assert [(mode, value) for mode, value, *_ in machine.executed] == [(MoveMode.Cirque, 40)]
+
+
+@pytest.mark.parametrize('mode, kwargs', [
+    (MoveMode.Forward, {'distance': 0}),
+    (MoveMode.Leftward, {'distance': 0.0004}),
+    (MoveMode.Turnleft, {'rotation_angle': 0}),
+])
+def test_zero_length_moves_are_not_sent(mode, kwargs):
+    host, machine = make_simulated_serial('sequenced', baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol='sequenced', serial_port=host)
+    try:
+        assert control.submit(mode, **kwargs) is None
+        control.flush()
+    finally:
+        control.close()
+        machine.stop()
+    assert machine.executed == []
+
+
+def test_latency_stats():
+    stats = LatencyStats()
+    stats.record(MoveMode.Forward, 2.5, expected=2.0)
+    stats.extend(MoveMode.Forward, [3.0, 0.015], expected=2.0)
+    stats.record(MoveMode.Bigarm, 0.3)
+    summary = stats.summary()
+    assert summary['Forward']['count'] == 3
+    assert summary['Forward']['total'] == pytest.approx(5.515)
+    assert summary['Forward']['vs_expected'] == pytest.approx(1.25)
+    assert summary['Bigarm']['vs_expected'] is None
+    histogram = dict(stats.histogram(MoveMode.Forward))
+    assert histogram[0.02] == 1 and histogram[5.0] == 2 and sum(histogram.values()) == 3
+    stats.reset()
+    assert stats.summary() == {}
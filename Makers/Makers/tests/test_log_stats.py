@@ -0,0 +1,113 @@
+import gzip
+
+import pytest
+
+from Config import MoveMode
+from tools.log_stats import LogScanner, find_logs, merge, parse_frame, read_chunks, report, scan
+
+FORWARD, BACKWARD, BIGARM = MoveMode.Forward.value, MoveMode.Backward.value, MoveMode.Bigarm.value
+
+
+def line(second: float, message: str, source: str = 'modules.MoveControl:__transmit:540', level: str = 'INFO') -> str:
+    return f'2024-10-21 12:38:{second:06.3f} | {level:<8} | {source} - {message}\n'
+
+
+def sent(second: float, frame: list) -> str:
+    text = ', '.join(map(str, frame))
+    return line(second, f'向下位机发送了{len(frame)}个字节的数据，数据内容为[{text}]。', level='DEBUG')
+
+
+# 第一次运行为原协议与旧格式阶段，第二次运行为带序号协议与Mission阶段
+LOG = ''.join([
+    line(0.0, '正在初始化串口', 'modules.MoveControl:__init__:56'),
+    line(0.1, '进行初始化', '__main__:start:349'),
+    sent(0.2, [255, BIGARM, 0, 40, 254]),
+    line(0.4, '接收到串口消息，下位机动作执行完毕'),
+    sent(0.5, [255, BIGARM, 0, 40, 254]),
+    line(0.8, '接收到串口消息，下位机动作执行完毕'),
+    line(1.0, '前往大圆盘', '__main__:start:360'),
+    sent(1.0, [255, FORWARD, 1900 // 256, 1900 % 256, 254]),
+    line(3.0, '接收到串口消息，下位机动作执行完毕'),
+    line(3.5, 'Bigarm已处于40°，跳过该指令', level='DEBUG'),
+    line(4.0, '识别到红色', 'modules.Detection:detect_colors_platform:320'),
+    'Traceback (most recent call last):\n',
+    '  File "main_test.py", line 1, in <module>\n',
+    line(10.0, '正在初始化串口', 'modules.MoveControl:__init__:56'),
+    line(10.1, '开始阶段align', 'modules.Mission:__run_stage:160'),
+    sent(10.2, [255, FORWARD, 0, 200, 0, 254]),
+    sent(10.25, [255, BIGARM, 0, 90, 1, 254]),
+    line(10.3, 'Bigarm指令等待反馈超时，第1次重发', level='WARNING'),
+    line(10.7, '序号1的指令执行完毕', level='DEBUG'),
+    line(11.2, '序号0的指令执行完毕', level='DEBUG'),
+    line(11.3, '阶段align结束，耗时1.20s', 'modules.Mission:__run_stage:166'),
+    sent(11.4, [255, BACKWARD, 0, 100, 2, 254]),
+])
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / 'interface_log.log'
+    path.write_text(LOG, encoding='utf-8')
+    return path
+
+
+def approx_latency(latency: dict) -> dict:
+    return {mode: {value: pytest.approx(samples) for value, samples in values.items()}
+            for mode, values in latency.items()}
+
+
+def test_parse_frame():
+    assert parse_frame(f'255, {FORWARD}, 7, 108, 254') == (FORWARD, 1900, None)
+    assert parse_frame(f'255, {BIGARM}, 0, 90, 3, 254') == (BIGARM, 90, 3)
+    pose = [255, MoveMode.Pose.value, 0b1, 100, 0, 0, 0, 0, 0, 0, 254]
+    assert parse_frame(', '.join(map(str, pose))) == (MoveMode.Pose.value, None, None)
+
+
+def test_scan(log_file):
+    result = scan(str(log_file))
+    assert result['lines'] == LOG.count('\n')
+    assert result['runs'] == 2
+    assert result['latency'] == approx_latency({
+        BIGARM: {40: [0.2, 0.3], 90: [0.45]},
+        FORWARD: {1900: [2.0], 200: [1.0]},
+    })
+    # 第二次发送Bigarm 40为冗余指令，下一次运行中舵机角度重新计算
+    assert result['servo_sends'] == {BIGARM: [3, 1, pytest.approx(0.3)]}
+    assert result['skipped'] == {'Bigarm': 1}
+    assert result['retransmits'] == {'Bigarm': 1}
+    # 最后一个旧格式阶段持续到该次运行中最后一条loguru日志
+    assert result['stages'] == {'进行初始化': [pytest.approx(0.9)], '前往大圆盘': [pytest.approx(3.0)],
+                                'align': [pytest.approx(1.2)]}
+    assert result['unmatched'] == 1
+
+
+@pytest.mark.parametrize('size', [64, 300, 1 << 20])
+def test_chunk_boundaries_do_not_change_result(log_file, size):
+    chunks = list(read_chunks(str(log_file), size))
+    assert ''.join(chunks) == LOG
+    assert all(chunk.endswith('\n') for chunk in chunks)
+    scanner = LogScanner()
+    for chunk in chunks:
+        scanner.feed(chunk)
+    assert scanner.finish() == scan(str(log_file))
+
+
+def test_compressed_logs(tmp_path, log_file):
+    compressed = tmp_path / 'interface_log.2024-10-21.log.gz'
+    with gzip.open(compressed, 'wt', encoding='utf-8') as f:
+        f.write(LOG)
+    assert set(find_logs([str(tmp_path)])) == {str(log_file), str(compressed)}
+    assert scan(str(compressed)) == scan(str(log_file))
+
+
+def test_merge_and_report(log_file, capsys):
+    result = scan(str(log_file))
+    total = merge([result, result])
+    assert total['runs'] == 4 and total['unmatched'] == 2
+    assert total['latency'][BIGARM][40] == pytest.approx([0.2, 0.3, 0.2, 0.3])
+    assert total['servo_sends'][BIGARM][:2] == [6, 2]
+    summary = report(total, by_value=True)
+    assert summary['latency']['Forward']['count'] == 4
+    assert summary['redundant']['Bigarm'] == {'sent': 6, 'redundant': 2, 'seconds': pytest.approx(0.6), 'skipped': 2}
+    assert summary['stages']['align']['count'] == 2
+    assert '前往大圆盘' in capsys.readouterr().out
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from modules.Mission import ARM, CAMERA, CHASSIS, Mission
+
+
+class Recorder:
+    """
+    记录各阶段开始与结束的顺序
+    """
+
+    def __init__(self) -> None:
+        self.events = []
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, seconds: float = 0.0, error: Exception = None):
+        def action():
+            with self._lock:
+                self.events.append(('start', name))
+            time.sleep(seconds)
+            with self._lock:
+                self.events.append(('end', name))
+            if error is not None:
+                raise error
+
+        return action
+
+
+def grab_mission(recorder: Recorder, shift: float = 0.15, ready: float = 0.05) -> Mission:
+    mission = Mission('grab')
+    mission.add('align', recorder.stage('align', 0.05), resources=(CHASSIS, CAMERA))
+    mission.add('shift', recorder.stage('shift', shift), resources=(CHASSIS,))
+    mission.add('ready', recorder.stage('ready', ready), resources=(ARM,), after='align')
+    mission.add('grab', recorder.stage('grab', 0.05), resources=(CHASSIS, ARM, CAMERA))
+    return mission
+
+
+def test_stages_run_in_order_by_default():
+    recorder = Recorder()
+    mission = Mission('linear')
+    for name in ('a', 'b', 'c'):
+        mission.add(name, recorder.stage(name))
+    mission.run()
+    assert recorder.events == [('start', 'a'), ('end', 'a'), ('start', 'b'), ('end', 'b'), ('start', 'c'), ('end', 'c')]
+
+
+def test_shared_resources_add_dependencies():
+    mission = grab_mission(Recorder())
+    assert mission.stages['shift'].after == ('align',)
+    assert mission.stages['ready'].after == ('align',)
+    assert set(mission.stages['grab'].after) == {'ready', 'shift', 'align'}
+
+
+def test_independent_stages_overlap():
+    recorder = Recorder()
+    mission = grab_mission(recorder)
+    report = mission.run()
+    records = mission.records
+    assert records['ready'].start < records['shift'].end and records['shift'].start < records['ready'].end
+    assert records['grab'].start >= max(records['shift'].end, records['ready'].end)
+    assert recorder.events[-2:] == [('start', 'grab'), ('end', 'grab')]
+    assert report['makespan'] < report['serial']
+
+
+@pytest.mark.parametrize('shift, ready, waited_on', [(0.15, 0.05, 'shift'), (0.05, 0.15, 'ready')])
+def test_critical_path_follows_last_finished_dependency(shift, ready, waited_on):
+    report = grab_mission(Recorder(), shift=shift, ready=ready).run()
+    assert [name for name, _, _ in report['critical_path']] == ['align', waited_on, 'grab']
+    durations = {name: duration for name, duration, _ in report['critical_path']}
+    assert durations[waited_on] == pytest.approx(0.15, abs=0.05)
+    assert all(gap < 0.05 for _, _, gap in report['critical_path'])
+    assert report['resources'][ARM] == pytest.approx(ready + 0.05, abs=0.05)
+    assert report['resources'][CHASSIS] == pytest.approx(0.05 + shift + 0.05, abs=0.05)
+
+
+def test_failed_stage_stops_new_stages():
+    recorder = Recorder()
+    mission = Mission('failing')
+    mission.add('align', recorder.stage('align'), resources=(CHASSIS,))
+    mission.add('shift', recorder.stage('shift', 0.05, error=RuntimeError('底盘出错')), resources=(CHASSIS,))
+    mission.add('ready', recorder.stage('ready', 0.1), resources=(ARM,), after='align')
+    mission.add('grab', recorder.stage('grab'), resources=(CHASSIS, ARM))
+    with pytest.raises(RuntimeError):
+        mission.run()
+    # 正在执行的阶段会执行完，之后的阶段不再开始
+    assert ('end', 'ready') in recorder.events
+    assert ('start', 'grab') not in recorder.events
+    assert set(mission.records) == {'align', 'shift', 'ready'}
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'name': 'align'},
+    {'name': 'lift', 'resources': ('gripper',)},
+    {'name': 'lift', 'after': 'missing'},
+])
+def test_invalid_stages(kwargs):
+    mission = Mission('invalid')
+    mission.add('align', lambda: None, resources=(CHASSIS,))
+    with pytest.raises(ValueError):
+        mission.add(action=lambda: None, **kwargs)
+
+
+def test_report_before_run_is_empty():
+    assert grab_mission(Recorder()).report() == {}
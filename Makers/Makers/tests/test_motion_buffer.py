@@ -0,0 +1,156 @@
+import pytest
+
+from Config import MoveMode, motion_buffer_params
+from modules.MotionBuffer import MotionBuffer
+from modules.MoveControl import MoveControl
+from modules.Simulator import make_simulated_serial
+
+
+class RecordingControl:
+    """
+    记录MotionBuffer实际发送的运动，代替MoveControl
+    """
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.flushes = 0
+
+    def move_X(self, distance: float) -> None:
+        self.sent.append(('move_X', distance))
+
+    def move_Y(self, distance: float) -> None:
+        self.sent.append(('move_Y', distance))
+
+    def move_Topleft_Lowerright(self, distance: float) -> None:
+        self.sent.append(('move_Topleft_Lowerright', distance))
+
+    def move_Topright_Lowerleft(self, distance: float) -> None:
+        self.sent.append(('move_Topright_Lowerleft', distance))
+
+    def rotate(self, angle: int) -> None:
+        self.sent.append(('rotate', angle))
+
+    def bigarm(self, angle: int, force: bool = False) -> None:
+        self.sent.append(('bigarm', angle))
+
+    def flush(self, timeout: float = None) -> None:
+        self.flushes += 1
+
+
+@pytest.fixture
+def control():
+    return RecordingControl()
+
+
+def test_same_direction_moves_are_added(control):
+    buffer = MotionBuffer(control)
+    buffer.move_X(1.9)
+    buffer.move_X(1.85)
+    assert control.sent == []
+    assert buffer.flush() is True
+    assert control.sent == [('move_X', 3.75)]
+    assert buffer.stats['merged'] == 1
+
+
+@pytest.mark.parametrize('first, second, total', [(-720, -720, -1440), (720, -20, 700), (1440, 1440, 2880)])
+def test_rotations_are_added_without_wrapping(control, first, second, total):
+    buffer = MotionBuffer(control)
+    buffer.rotate(first)
+    buffer.rotate(second)
+    buffer.flush()
+    assert control.sent == [('rotate', total)]
+
+
+def test_rotation_beyond_16_bits_is_not_merged(control):
+    buffer = MotionBuffer(control)
+    buffer.rotate(0xFFFF)
+    buffer.rotate(720)
+    buffer.flush()
+    assert control.sent == [('rotate', 0xFFFF), ('rotate', 720)]
+
+
+def test_distance_beyond_limit_is_not_merged(control):
+    buffer = MotionBuffer(control)
+    buffer.move_Y(20)
+    buffer.move_Y(20)
+    buffer.flush()
+    assert control.sent == [('move_Y', 20), ('move_Y', 20)]
+
+
+def test_opposite_moves_cancel(control):
+    buffer = MotionBuffer(control)
+    buffer.move_X(0.3)
+    buffer.move_X(-0.3)
+    buffer.rotate(720)
+    buffer.rotate(-720)
+    assert buffer.flush() is False
+    assert control.sent == []
+    assert buffer.stats['cancelled'] == 2
+
+
+def test_different_directions_keep_order(control):
+    buffer = MotionBuffer(control)
+    buffer.move_X(0.3)
+    buffer.move_Y(0.3)
+    buffer.rotate(720)
+    buffer.move_X(0.1)
+    buffer.flush()
+    assert control.sent == [('move_X', 0.3), ('move_Y', 0.3), ('rotate', 720), ('move_X', 0.1)]
+
+
+def test_diagonal_is_off_by_default(control):
+    assert motion_buffer_params['diagonal'] is False
+    buffer = MotionBuffer(control)
+    buffer.move_X(0.3)
+    buffer.move_Y(0.3)
+    buffer.flush()
+    assert control.sent == [('move_X', 0.3), ('move_Y', 0.3)]
+
+
+@pytest.mark.parametrize('x, y, expected', [
+    (0.3, 0.3, ('move_Topleft_Lowerright', 0.424)),
+    (-0.3, -0.3, ('move_Topleft_Lowerright', -0.424)),
+    (0.3, -0.3, ('move_Topright_Lowerleft', 0.424)),
+    (-0.3, 0.3, ('move_Topright_Lowerleft', -0.424)),
+])
+def test_diagonal_merge(control, x, y, expected):
+    buffer = MotionBuffer(control, dict(motion_buffer_params, diagonal=True))
+    buffer.move_X(x)
+    buffer.move_Y(y)
+    buffer.flush()
+    assert control.sent == [expected]
+    assert buffer.stats['diagonal'] == 1
+
+
+def test_diagonal_needs_equal_distances(control):
+    buffer = MotionBuffer(control, dict(motion_buffer_params, diagonal=True))
+    buffer.move_X(0.3)
+    buffer.move_Y(0.2)
+    buffer.flush()
+    assert control.sent == [('move_X', 0.3), ('move_Y', 0.2)]
+
+
+def test_other_methods_flush_pending_motion(control):
+    buffer = MotionBuffer(control)
+    buffer.move_X(0.5)
+    buffer.bigarm(90)
+    assert control.sent == [('move_X', 0.5), ('bigarm', 90)]
+    assert control.flushes == 1
+
+
+def test_merged_moves_reach_lower_machine():
+    host, machine = make_simulated_serial('sequenced', baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol='sequenced', serial_port=host)
+    buffer = MotionBuffer(control)
+    try:
+        buffer.move_X(1.9)
+        buffer.move_X(1.85)
+        buffer.rotate(720)
+        buffer.rotate(-720)
+        buffer.move_Y(-0.2)
+        buffer.flush()
+    finally:
+        control.close()
+        machine.stop()
+    assert [(mode, value) for mode, value, *_ in machine.executed] == [(MoveMode.Forward, 3750),
+                                                                        (MoveMode.Rightward, 200)]
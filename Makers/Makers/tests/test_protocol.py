@@ -0,0 +1,115 @@
+import pytest
+
+from Config import MoveMode
+from modules.Protocol import (CALIBRATION_VALUE, DISTANCE_MODES, ROTATION_MODES, SERVO_CHANNELS, FrameEncoder,
+                              command_value, decode_pose, encode_pose, frame_length)
+
+
+def legacy_frame(mode: MoveMode, distance: float = None, rotation_angle: int = None) -> bytes:
+    # 改为FrameEncoder之前MoveControl逐字节拼出的指令帧
+    if mode in DISTANCE_MODES:
+        dis_mm = int(distance * 1000)
+        return bytes([0xFF, mode.value, dis_mm // 256, dis_mm % 256, 0xFE])
+    if mode in ROTATION_MODES:
+        return bytes([0xFF, mode.value, rotation_angle // 256, rotation_angle % 256, 0xFE])
+    if mode == MoveMode.Calibration:
+        return bytes([0xFF, mode.value, 30, 2, 0xFE])
+    return bytes([0xFF, mode.value, 0, abs(int(rotation_angle)), 0xFE])
+
+
+@pytest.mark.parametrize('mode', sorted(DISTANCE_MODES))
+@pytest.mark.parametrize('distance', [0.0, 0.05, 0.255, 0.256, 1.9, 3.75, 32.767])
+def test_distance_frames_match_legacy(mode, distance):
+    value = command_value(mode, distance=distance)
+    assert bytes(FrameEncoder().encode(mode, value)) == legacy_frame(mode, distance=distance)
+
+
+@pytest.mark.parametrize('mode', sorted(ROTATION_MODES))
+@pytest.mark.parametrize('angle', [1, 20, 255, 256, 720, 1440, 0xFFFF])
+def test_rotation_frames_match_legacy(mode, angle):
+    value = command_value(mode, rotation_angle=angle)
+    assert bytes(FrameEncoder().encode(mode, value)) == legacy_frame(mode, rotation_angle=angle)
+
+
+@pytest.mark.parametrize('mode', SERVO_CHANNELS)
+@pytest.mark.parametrize('angle', [0, 45, 90, 180, -30])
+def test_servo_frames_match_legacy(mode, angle):
+    value = command_value(mode, rotation_angle=angle)
+    assert bytes(FrameEncoder().encode(mode, value)) == legacy_frame(mode, rotation_angle=angle)
+
+
+def test_calibration_frame_matches_legacy():
+    value = command_value(MoveMode.Calibration)
+    assert value == CALIBRATION_VALUE
+    assert bytes(FrameEncoder().encode(MoveMode.Calibration, value)) == legacy_frame(MoveMode.Calibration)
+
+
+def test_negative_distance_wraps_to_16_bits():
+    assert command_value(MoveMode.Forward, distance=-0.5) == 0x10000 - 500
+
+
+def test_missing_parameter_raises():
+    with pytest.raises(ValueError):
+        command_value(MoveMode.Forward)
+    with pytest.raises(ValueError):
+        command_value(MoveMode.Turnleft)
+    with pytest.raises(ValueError):
+        command_value(MoveMode.Servo)
+
+
+def test_sequenced_frame():
+    encoder = FrameEncoder(sequenced=True)
+    frame = encoder.encode(MoveMode.Forward, 1900, seq=7)
+    assert bytes(frame) == bytes([0xFF, MoveMode.Forward, 1900 // 256, 1900 % 256, 7, 0xFE])
+    assert len(frame) == frame_length(MoveMode.Forward, sequenced=True)
+
+
+def test_encoder_reuses_buffer():
+    encoder = FrameEncoder()
+    first = encoder.encode(MoveMode.Forward, 100)
+    second = encoder.encode(MoveMode.Backward, 200)
+    assert first is second
+    assert bytes(second) == bytes([0xFF, MoveMode.Backward, 0, 200, 0xFE])
+
+
+def test_frame_length():
+    assert frame_length(MoveMode.Forward) == 5
+    assert frame_length(MoveMode.Forward, sequenced=True) == 6
+    assert frame_length(MoveMode.Pose) == 4 + len(SERVO_CHANNELS)
+    assert frame_length(MoveMode.Pose, sequenced=True) == 5 + len(SERVO_CHANNELS)
+
+
+@pytest.mark.parametrize('pose', [
+    {MoveMode.Bigarm: 90},
+    {MoveMode.Bigarm: 100, MoveMode.Forearm: 25, MoveMode.Cirque: 0},
+    {channel: 180 for channel in SERVO_CHANNELS},
+])
+def test_pose_round_trip(pose):
+    frame = encode_pose(pose)
+    assert len(frame) == frame_length(MoveMode.Pose)
+    assert frame[0] == 0xFF and frame[1] == MoveMode.Pose and frame[-1] == 0xFE
+    # 帧中除帧头帧尾外不会出现0xFF与0xFE
+    assert 0xFF not in frame[1:-1] and 0xFE not in frame[1:-1]
+    assert decode_pose(frame) == pose
+
+
+def test_pose_channel_mask():
+    frame = encode_pose({MoveMode.Forearm: 25, MoveMode.Cirque: 40})
+    assert frame[2] == 0b1000010
+    assert frame[3:-1] == [0, 25, 0, 0, 0, 0, 40]
+
+
+def test_pose_with_sequence_byte():
+    pose = {MoveMode.Frontpaws: 46, MoveMode.Hindpaws: 57}
+    frame = encode_pose(pose)
+    assert decode_pose(frame[:-1] + [3, 0xFE]) == pose
+    assert frame_length(MoveMode.Pose, sequenced=True) == len(frame) + 1
+
+
+def test_pose_rejects_invalid():
+    with pytest.raises(ValueError):
+        encode_pose({})
+    with pytest.raises(ValueError):
+        encode_pose({MoveMode.Bigarm: 181})
+    with pytest.raises(ValueError):
+        encode_pose({MoveMode.Forward: 10})
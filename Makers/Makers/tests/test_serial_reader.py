@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from Config import Feedback
+from modules.MoveControl import MoveControl
+from modules.SerialReader import FrameParser, SerialReader
+from modules.Simulator import LoopbackSerial, make_simulated_serial
+
+ACTION_DONE = bytes([0xFF, 0x01, 0xFE])
+
+
+def test_single_frame():
+    parser = FrameParser()
+    assert parser.feed(ACTION_DONE) == [(Feedback.ActionDone, b'')]
+    assert parser.frames == 1
+    assert parser.dropped == 0
+
+
+def test_frame_split_across_reads():
+    parser = FrameParser()
+    frame = bytes([0xFF, 0x01, 0x07, 0xFE])
+    assert parser.feed(frame[:2]) == []
+    assert parser.feed(frame[2:]) == [(Feedback.ActionDone, b'\x07')]
+
+
+def test_garbage_before_head_is_dropped():
+    parser = FrameParser()
+    assert parser.feed(b'\x00\x12\xFE' + ACTION_DONE) == [(Feedback.ActionDone, b'')]
+    assert parser.dropped == 3
+
+
+def test_resync_on_head_inside_payload():
+    # 第一帧丢失了帧尾，第二帧的帧头使解析器重新同步
+    parser = FrameParser()
+    frames = parser.feed(bytes([0xFF, 0x01, 0x05]) + ACTION_DONE)
+    assert frames == [(Feedback.ActionDone, b'')]
+    assert parser.resyncs == 1
+    assert parser.dropped == 3
+
+
+def test_repeated_head_and_empty_frame():
+    parser = FrameParser()
+    assert parser.feed(bytes([0xFF, 0xFF, 0xFF, 0xFE]) + ACTION_DONE) == [(Feedback.ActionDone, b'')]
+    assert parser.dropped == 4
+
+
+def test_payload_overflow_is_discarded():
+    parser = FrameParser(max_payload=2)
+    frames = parser.feed(bytes([0xFF, 0x01, 1, 2, 3, 0xFE]) + ACTION_DONE)
+    assert frames == [(Feedback.ActionDone, b'')]
+    assert parser.resyncs == 1
+
+
+def test_unknown_type_is_int():
+    parser = FrameParser()
+    assert parser.feed(bytes([0xFF, 0x7A, 0x01, 0xFE])) == [(0x7A, b'\x01')]
+
+
+@pytest.fixture
+def reader():
+    host, device = LoopbackSerial.pair()
+    reader = SerialReader(host, poll_interval=0.01)
+    reader.start()
+    yield reader, device
+    reader.stop()
+
+
+def test_reader_queues_feedback_by_type(reader):
+    reader, device = reader
+    device.write(bytes([0xFF, 0x7A, 0x05, 0xFE]) + ACTION_DONE[:2])
+    device.write(ACTION_DONE[2:])
+    _, payload = reader.wait(Feedback.ActionDone, timeout=1)
+    assert payload == b''
+    assert reader.wait(0x7A, timeout=1)[1] == b'\x05'
+
+
+def test_reader_wait_times_out(reader):
+    reader, _ = reader
+    with pytest.raises(TimeoutError):
+        reader.wait(Feedback.ActionDone, timeout=0.05)
+
+
+def test_reader_discard(reader):
+    reader, device = reader
+    device.write(ACTION_DONE * 3)
+    reader.wait(Feedback.ActionDone, timeout=1)
+    # 等待剩余的反馈也进入队列
+    while reader._queue(Feedback.ActionDone).qsize() < 2:
+        time.sleep(0.005)
+    assert reader.discard(Feedback.ActionDone) == 2
+    with pytest.raises(TimeoutError):
+        reader.wait(Feedback.ActionDone, timeout=0.05)
+
+
+def test_reader_subscribe_calls_handler(reader):
+    reader, device = reader
+    received = []
+    done = threading.Event()
+
+    def handler(timestamp, payload):
+        received.append(payload)
+        done.set()
+
+    reader.subscribe(Feedback.Start, handler)
+    device.write(bytes([0xFF, 0x10, 0xFE]))
+    assert done.wait(1)
+    assert received == [b'']
+    assert reader.discard(Feedback.Start) == 0
+
+
+def test_move_control_waits_for_start_command():
+    host, machine = make_simulated_serial(baudrate=None, latency=0.0)
+    control = MoveControl(port=None, baudrate=None, serial_port=host)
+    try:
+        with pytest.raises(TimeoutError):
+            control.wait_for_start_cmd(timeout=0.05)
+        machine.send_start()
+        control.wait_for_start_cmd(timeout=1)
+    finally:
+        control.close()
+        machine.stop()
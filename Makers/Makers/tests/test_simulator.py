@@ -0,0 +1,104 @@
+import pytest
+
+from Config import MoveMode
+from modules.MoveControl import MoveControl
+from modules.Simulator import make_simulated_serial
+
+
+@pytest.fixture(params=['legacy', 'sequenced'])
+def simulated(request):
+    host, machine = make_simulated_serial(request.param, baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol=request.param, serial_port=host)
+    yield control, machine
+    control.close()
+    machine.stop()
+
+
+def executed_commands(machine) -> list:
+    return [(mode, value) for mode, value, *_ in machine.executed]
+
+
+def test_moves_round_trip(simulated):
+    control, machine = simulated
+    control.move_X(1.9)
+    control.move_X(-0.25)
+    control.move_Y(0.3)
+    control.move_Y(-0.256)
+    control.rotate(720)
+    control.rotate(-1440)
+    control.calibration()
+    assert executed_commands(machine) == [
+        (MoveMode.Forward, 1900),
+        (MoveMode.Backward, 250),
+        (MoveMode.Leftward, 300),
+        (MoveMode.Rightward, 256),
+        (MoveMode.Turnleft, 720),
+        (MoveMode.Turnright, 1440),
+        (MoveMode.Calibration, 30 * 256 + 2),
+    ]
+
+
+def test_submitted_commands_round_trip(simulated):
+    control, machine = simulated
+    futures = [control.submit(MoveMode.Bigarm, rotation_angle=90),
+               control.submit(MoveMode.Forearm, rotation_angle=25),
+               control.submit(MoveMode.Forward, distance=0.5)]
+    control.flush()
+    assert all(future.done() for future in futures)
+    assert executed_commands(machine) == [(MoveMode.Bigarm, 90), (MoveMode.Forearm, 25), (MoveMode.Forward, 500)]
+    assert machine.servos == {MoveMode.Bigarm: 90, MoveMode.Forearm: 25}
+
+
+def test_legacy_commands_carry_no_sequence_number():
+    host, machine = make_simulated_serial('legacy', baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol='legacy', serial_port=host)
+    try:
+        control.move_X(0.1)
+    finally:
+        control.close()
+        machine.stop()
+    assert [seq for _, _, seq, *_ in machine.executed] == [None]
+
+
+def test_sequenced_commands_are_pipelined():
+    host, machine = make_simulated_serial('sequenced', latency=0.01, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol='sequenced', serial_port=host)
+    try:
+        futures = [control.submit(MoveMode.Forward, distance=distance) for distance in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6)]
+        # 带序号协议下submit不等待反馈，窗口内的指令可以同时等待反馈
+        assert not all(future.done() for future in futures)
+        control.flush()
+    finally:
+        control.close()
+        machine.stop()
+    sequences = [seq for _, _, seq, *_ in machine.executed]
+    assert None not in sequences
+    assert len(set(sequences)) == len(sequences)
+    assert [value for _, value, *_ in machine.executed] == [100, 200, 300, 400, 500, 600]
+
+
+
+@pytest.mark.parametrize('protocol', ['legacy', 'sequenced'])
+def test_pose_round_trip(protocol):
+    host, machine = make_simulated_serial(protocol, baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol=protocol, serial_port=host, pose_frames=True)
+    pose = {MoveMode.Bigarm: 100, MoveMode.Frontpaws: 46, MoveMode.Cirque: 0}
+    try:
+        control.wait_ack(control.pose(pose, wait=False))
+    finally:
+        control.close()
+        machine.stop()
+    assert executed_commands(machine) == [(MoveMode.Pose, pose)]
+    assert machine.servos == pose
+
+
+def test_pose_without_pose_frames_sends_each_servo():
+    host, machine = make_simulated_serial('sequenced', baudrate=None, latency=0.0, time_scale=0.01)
+    control = MoveControl(port=None, baudrate=None, protocol='sequenced', serial_port=host)
+    control.servo_timing.dwell = lambda *args: 0.0
+    try:
+        assert control.pose({MoveMode.Bigarm: 100, MoveMode.Cirque: 0}) is None
+    finally:
+        control.close()
+        machine.stop()
+    assert executed_commands(machine) == [(MoveMode.Bigarm, 100), (MoveMode.Cirque, 0)]
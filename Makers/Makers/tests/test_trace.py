@@ -0,0 +1,107 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from modules.Detection import Camera
+from modules.FrameSource import MemorySource
+from modules.Trace import Tracer, traced, tracer
+
+
+@pytest.fixture
+def recording():
+    tracer.start()
+    yield tracer
+    # 清空全局记录器中的记录，不影响其他测试
+    tracer.start()
+    tracer.stop()
+
+
+@traced('test')
+def add(a, b):
+    return a + b
+
+
+def test_disabled_tracer_records_nothing():
+    recorder = Tracer()
+    # 记录关闭时span总是返回同一个空上下文管理器
+    assert recorder.span('stage', 'stage') is recorder.span('grab', 'stage')
+    with recorder.span('stage', 'stage'):
+        pass
+    recorder.complete('move', 'move', 0.0, 1.0)
+    recorder.async_span('Forward', 'frame', 0.0, 1.0)
+    recorder.instant('start_cmd', 'serial')
+    assert recorder.events() == []
+
+
+def test_traced_function_without_recording():
+    assert not tracer.enabled
+    assert add(1, 2) == 3
+    assert tracer.events() == []
+
+
+def test_span_and_instant_events():
+    recorder = Tracer()
+    recorder.start()
+    with recorder.span('go_to_platform', 'stage', resources=('chassis',)):
+        recorder.instant('start_cmd', 'serial')
+    with pytest.raises(ValueError):
+        with recorder.span('grab', 'stage'):
+            raise ValueError('抓取失败')
+    recorder.stop()
+    events = recorder.events()
+    metadata = [event for event in events if event['ph'] == 'M']
+    assert metadata == [{'name': 'thread_name', 'ph': 'M', 'pid': metadata[0]['pid'],
+                         'tid': threading.get_ident(), 'args': {'name': threading.current_thread().name}}]
+    instant, stage, failed = [event for event in events if event['ph'] != 'M']
+    assert instant['name'] == 'start_cmd' and instant['ph'] == 'i'
+    assert stage['name'] == 'go_to_platform' and stage['ph'] == 'X' and stage['dur'] >= 0
+    assert stage['args'] == {'resources': ('chassis',)}
+    assert stage['ts'] <= instant['ts'] <= stage['ts'] + stage['dur']
+    assert 'ValueError' in failed['args']['error']
+
+
+def test_async_spans_are_paired():
+    recorder = Tracer()
+    recorder.start()
+    origin = recorder._origin
+    recorder.async_span('Forward', 'frame', origin + 0.1, origin + 0.3, {'seq': 1})
+    recorder.async_span('Bigarm', 'frame', origin + 0.2, origin + 0.25)
+    events = recorder.events()
+    assert [(event['name'], event['ph']) for event in events] == [
+        ('Forward', 'b'), ('Forward', 'e'), ('Bigarm', 'b'), ('Bigarm', 'e')]
+    assert events[0]['id'] == events[1]['id'] != events[2]['id']
+    assert events[0]['args'] == {'seq': 1}
+    assert events[1]['ts'] - events[0]['ts'] == pytest.approx(0.2e6)
+
+
+def test_start_clears_records_and_save(tmp_path):
+    recorder = Tracer()
+    recorder.start()
+    recorder.instant('old', 'serial')
+    recorder.start()
+    recorder.instant('new', 'serial')
+    path = tmp_path / 'trace' / 'trace.json'
+    assert recorder.save(str(path)) == 2
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    assert [event['name'] for event in saved['traceEvents']] == ['thread_name', 'new']
+
+
+def test_traced_function_is_recorded(recording):
+    assert add(1, 2) == 3
+    events = [event for event in recording.events() if event['ph'] == 'X']
+    assert [(event['name'], event['cat']) for event in events] == [('add', 'test')]
+
+
+def test_circle_wrappers_record_one_camera_span(recording):
+    camera = Camera(threaded=False, source=MemorySource([np.zeros((480, 640, 3), dtype=np.uint8)]))
+    camera.open()
+    try:
+        assert camera.detect_circles() is False
+        assert camera.detect_circles_platform_low() is False
+        assert camera.detect_circles_from_high() is False
+    finally:
+        camera.release()
+    events = [event for event in recording.events() if event['ph'] == 'X' and event['cat'] == 'camera']
+    assert [event['name'] for event in events] == ['Camera.detect_rings'] * 3
@@ -0,0 +1,445 @@
+"""
+interface_log.log离线统计
+
+按块读取日志，支持loguru轮转出的文件与.gz、.bz2、.xz、.zip压缩文件，多个文件在多个进程中同时统计:
+- 指令耗时: 每条指令从发送到收到动作完成反馈的时间，按MoveMode与帧中的参数(距离毫米、角度)分组，
+  原协议按"下位机动作执行完毕"与之前最近一次发送配对，带序号协议按反馈中的序号配对
+- 冗余指令: 舵机角度与同一次运行中上次发送的相同(校准后重新计算)，以及已被舵机状态缓存跳过的指令
+- 阶段耗时: 按Mission的阶段日志统计；没有阶段日志的旧日志按主流程start中的日志(如"前往大圆盘")划分阶段
+每次运行从"正在初始化串口"开始
+
+用法:
+    python tools/log_stats.py log/ [更多文件或目录] [--by-value] [--top N] [--jobs N] [--json report.json]
+"""
+
+import argparse
+import bz2
+import datetime
+import gzip
+import io
+import json
+import lzma
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'modules'))
+
+from Config import MoveMode
+from modules.Latency import LatencyStats, expected_duration
+from modules.Protocol import SERVO_MODES, frame_length
+
+# 只匹配需要统计的日志行，其余的行由正则引擎直接跳过；以换行符开头(块前补一个换行符)时正则引擎只在换行符处尝试匹配，
+# 比^加re.MULTILINE快；second为精确到秒的时间，除时间外每行只有一个命名分组匹配，
+# 依次为旧格式阶段名、指令帧、原协议反馈、反馈序号、跳过的舵机、重发的模式、新的运行、Mission阶段开始、Mission阶段结束
+LOG_PATTERN = re.compile(
+    r'\n(?P<second>[^\n]{19})\.(?P<millis>\d{3}) \| \w+ +\| '
+    r'(?:__main__:start:\d+ - (?P<legacy_stage>[^\n]*)'
+    r'|\S+ - (?:'
+    r'向下位机发送了\d+个字节的数据，数据内容为\[(?P<frame>[\d, ]+)\]'
+    r'|接收到串口消息，(?P<ack>下)位机动作执行完毕'
+    r'|序号(?P<seq>\d+)的指令执行完毕'
+    r'|(?P<skipped>\w+)已处于-?\d+°，跳过该指令'
+    r'|(?P<retransmit>\w+)指令等待反馈超时'
+    r'|(?P<run>正在)初始化串口'
+    r'|开始阶段(?P<stage_start>[^\n]+)'
+    r'|阶段(?P<stage_end>[^\n]+)结束，耗时))')
+# 任意一条loguru日志的时间，用于确定一次运行中最后一个旧格式阶段的结束时刻
+TIME_PATTERN = re.compile(r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\.(\d{3}) \|')
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def read_chunks(path: str, size: int = 1 << 23):
+    """
+    按块读取日志文件，每块都以完整的行结束；压缩文件按扩展名解压，zip中的每个文件依次读取
+
+    Args:
+        path(str): 日志文件路径
+        size(int): 每次读取的字符数
+
+    Returns:
+        generator: 文本块
+    """
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                with archive.open(member) as raw:
+                    yield from _complete_lines(io.TextIOWrapper(raw, encoding='utf-8', errors='replace'), size)
+        return
+    opener = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}.get(os.path.splitext(path)[1], open)
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        yield from _complete_lines(f, size)
+
+
+def _complete_lines(f, size: int):
+    rest = ''
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        chunk = rest + chunk
+        end = chunk.rfind('\n') + 1
+        rest = chunk[end:]
+        if end:
+            yield chunk[:end]
+    if rest:
+        yield rest + '\n'
+
+
+def parse_frame(text: str) -> tuple:
+    """
+    解析日志中的指令帧
+
+    Args:
+        text(str): 日志中方括号内的帧内容，如'255, 1, 0, 200, 0, 254'
+
+    Returns:
+        tuple: (模式值, 参数, 序号)，位姿指令的参数为None，原协议的帧序号为None
+    """
+    frame = text.split(', ')
+    mode = int(frame[1])
+    value = None if mode == MoveMode.Pose else int(frame[2]) * 256 + int(frame[3])
+    seq = int(frame[-2]) if len(frame) == frame_length(mode, sequenced=True) else None
+    return mode, value, seq
+
+
+def find_logs(paths: list) -> list:
+    """
+    展开目录中的日志文件(文件名含.log)，按修改时间排序
+
+    Args:
+        paths(list): 文件或目录
+
+    Returns:
+        list: 日志文件路径
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in os.listdir(path) if '.log' in name]
+        else:
+            files.append(path)
+    return sorted(files, key=os.path.getmtime)
+
+
+class LogScanner:
+    """
+    按块解析日志并累计统计，统计结果为只含基本类型的dict，可在进程间传递与合并
+
+    方法:
+        feed: 解析以完整的行结束的一块日志
+        finish: 结束最后一次运行并返回统计结果
+    """
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self.runs = 0
+        # {模式值: {帧中的参数: [耗时秒, ...]}}
+        self.latency = {}
+        # 发送后没有配对到反馈的指令数
+        self.unmatched = 0
+        # {模式值: [发送数, 冗余数, 冗余指令耗时秒]}
+        self.servo_sends = {}
+        # {模式名: 被舵机状态缓存跳过的指令数}
+        self.skipped = {}
+        # {模式名: 重发次数}
+        self.retransmits = {}
+        # {阶段名: [耗时秒, ...]}
+        self.stages = {}
+
+        self._second = None
+        self._frames = {}
+        self._second_value = 0.0
+        # 当前运行中最后一条被统计的日志的时间
+        self._last_time = None
+        self.__reset_run()
+
+    def __reset_run(self) -> None:
+        # 原协议下等待反馈的指令: (模式值, 参数, 发送时刻, 是否冗余)
+        self._pending = None
+        self._pending_seq = {}
+        self._servo_angles = {}
+        self._stage = None
+        self._mission_stages = {}
+
+    def feed(self, text: str) -> None:
+        """
+        解析一块日志，不是loguru格式的行(如异常堆栈)与不需要统计的行被忽略
+
+        Args:
+            text(str): 以完整的行结束的日志
+
+        Returns:
+            None
+        """
+        self.lines += text.count('\n')
+        text = '\n' + text
+        for match in LOG_PATTERN.finditer(text):
+            kind = match.lastgroup
+            value = match[kind]
+            timestamp = self.__timestamp(match[1], match[2])
+
+            if kind == 'frame':
+                self.__on_sent(timestamp, value)
+            elif kind == 'ack':
+                if self._pending is not None:
+                    self.__record(self._pending, timestamp)
+                    self._pending = None
+            elif kind == 'seq':
+                command = self._pending_seq.pop(int(value), None)
+                if command is not None:
+                    self.__record(command, timestamp)
+            elif kind == 'skipped':
+                self.skipped[value] = self.skipped.get(value, 0) + 1
+            elif kind == 'retransmit':
+                self.retransmits[value] = self.retransmits.get(value, 0) + 1
+            elif kind == 'run':
+                self.__last_time(text, match.start())
+                self.__end_run()
+                self.runs += 1
+            elif kind == 'stage_start':
+                self._mission_stages[value] = timestamp
+            elif kind == 'stage_end':
+                start = self._mission_stages.pop(value, None)
+                if start is not None:
+                    self.stages.setdefault(value, []).append(timestamp - start)
+            else:
+                self.__on_legacy_stage(timestamp, value.strip('- '))
+        self.__last_time(text, len(text))
+
+    def __timestamp(self, second: str, millis: str) -> float:
+        # 同一秒内的日志很多，只在秒变化时解析
+        if second != self._second:
+            self._second = second
+            self._second_value = (datetime.datetime.fromisoformat(second) - _EPOCH).total_seconds()
+        return self._second_value + int(millis) / 1000
+
+    def __last_time(self, text: str, end: int) -> None:
+        # 从end向前找最近一条loguru日志(跳过异常堆栈等行)，块中没有时保留上一块中的时间
+        while end > 0:
+            start = text.rfind('\n', 0, end - 1) + 1
+            match = TIME_PATTERN.match(text, start)
+            if match is not None:
+                self._last_time = self.__timestamp(*match.groups())
+                return
+            end = start
+
+    def __on_sent(self, timestamp: float, text: str) -> None:
+        # 同样的指令帧反复出现，解析结果按帧内容缓存
+        parsed = self._frames.get(text)
+        if parsed is None:
+            parsed = self._frames[text] = parse_frame(text)
+        mode, value, seq = parsed
+
+        redundant = False
+        if mode == MoveMode.Calibration:
+            # 校准后舵机角度未知
+            self._servo_angles.clear()
+        elif mode in SERVO_MODES:
+            redundant = self._servo_angles.get(mode) == value
+            self._servo_angles[mode] = value
+            sends = self.servo_sends.setdefault(mode, [0, 0, 0.0])
+            sends[0] += 1
+            sends[1] += redundant
+
+        command = (mode, value, timestamp, redundant)
+        if seq is not None:
+            self._pending_seq[seq] = command
+            return
+        if self._pending is not None:
+            self.unmatched += 1
+        self._pending = command
+
+    def __record(self, command: tuple, timestamp: float) -> None:
+        mode, value, sent_at, redundant = command
+        seconds = timestamp - sent_at
+        self.latency.setdefault(mode, {}).setdefault(value, []).append(seconds)
+        if redundant:
+            self.servo_sends[mode][2] += seconds
+
+    def __on_legacy_stage(self, timestamp: float, name: str) -> None:
+        if self._stage is not None:
+            stage, start = self._stage
+            self.stages.setdefault(stage, []).append(timestamp - start)
+        self._stage = (name, timestamp)
+
+    def __end_run(self) -> None:
+        # 最后一个旧格式阶段持续到运行中最后一条被统计的日志，未配对的指令计入unmatched
+        if self._stage is not None and self._last_time is not None:
+            stage, start = self._stage
+            self.stages.setdefault(stage, []).append(self._last_time - start)
+        self.unmatched += (self._pending is not None) + len(self._pending_seq)
+        self.__reset_run()
+
+    def finish(self) -> dict:
+        """
+        Returns:
+            dict: 统计结果
+        """
+        self.__end_run()
+        return {
+            'lines': self.lines,
+            'runs': self.runs,
+            'latency': self.latency,
+            'unmatched': self.unmatched,
+            'servo_sends': self.servo_sends,
+            'skipped': self.skipped,
+            'retransmits': self.retransmits,
+            'stages': self.stages,
+        }
+
+
+def scan(path: str) -> dict:
+    """
+    统计一个日志文件
+
+    Args:
+        path(str): 日志文件路径
+
+    Returns:
+        dict: LogScanner.finish的返回值
+    """
+    scanner = LogScanner()
+    for text in read_chunks(path):
+        scanner.feed(text)
+    return scanner.finish()
+
+
+def merge(results: list) -> dict:
+    """
+    按文件顺序合并多个文件的统计结果
+
+    Args:
+        results(list): scan的返回值
+
+    Returns:
+        dict: 合并后的统计结果，格式与scan相同
+    """
+    total = {'lines': 0, 'runs': 0, 'latency': {}, 'unmatched': 0, 'servo_sends': {}, 'skipped': {},
+             'retransmits': {}, 'stages': {}}
+    for result in results:
+        for key in ('lines', 'runs', 'unmatched'):
+            total[key] += result[key]
+        for mode, values in result['latency'].items():
+            for value, samples in values.items():
+                total['latency'].setdefault(mode, {}).setdefault(value, []).extend(samples)
+        for mode, (sent, redundant, seconds) in result['servo_sends'].items():
+            sends = total['servo_sends'].setdefault(mode, [0, 0, 0.0])
+            sends[0] += sent
+            sends[1] += redundant
+            sends[2] += seconds
+        for key in ('skipped', 'retransmits'):
+            for name, count in result[key].items():
+                total[key][name] = total[key].get(name, 0) + count
+        for name, durations in result['stages'].items():
+            total['stages'].setdefault(name, []).extend(durations)
+    return total
+
+
+def report(total: dict, by_value: bool = False, top: int = 20) -> dict:
+    """
+    打印统计结果
+
+    Args:
+        total(dict): merge的返回值
+        by_value(bool): 是否按模式与参数分组打印指令耗时
+        top(int): 按参数分组时打印总耗时最高的组数
+
+    Returns:
+        dict: 可保存为JSON的统计结果
+    """
+    stats = LatencyStats()
+    for mode, values in total['latency'].items():
+        mode = MoveMode(mode)
+        for value, samples in values.items():
+            stats.extend(mode, samples, expected_duration(mode, value) if value is not None else None)
+    summary = stats.summary()
+
+    print(f'\n指令耗时(发送到动作完成反馈)，未配对{total["unmatched"]}条')
+    print(f'{"模式":<12}{"次数":>8}{"总耗时s":>10}{"平均ms":>10}{"p50 ms":>10}{"p95 ms":>10}{"最大ms":>10}{"实际/预计":>10}')
+    for name, row in sorted(summary.items(), key=lambda item: -item[1]['total']):
+        ratio = f'{row["vs_expected"]:.2f}' if row['vs_expected'] is not None else '-'
+        print(f'{name:<12}{row["count"]:>8}{row["total"]:>10.2f}{row["mean"] * 1000:>10.1f}{row["p50"] * 1000:>10.1f}'
+              f'{row["p95"] * 1000:>10.1f}{row["max"] * 1000:>10.1f}{ratio:>10}')
+
+    groups = []
+    for mode, values in total['latency'].items():
+        for value, samples in values.items():
+            samples = np.asarray(samples)
+            groups.append((MoveMode(mode).name, value, samples.size, float(samples.sum()),
+                           float(np.percentile(samples, 50)), float(np.percentile(samples, 95))))
+    groups.sort(key=lambda group: -group[3])
+    if by_value:
+        print(f'\n按参数分组的指令耗时(总耗时最高的{top}组，参数为距离毫米或角度)')
+        print(f'{"模式":<12}{"参数":>8}{"次数":>8}{"总耗时s":>10}{"p50 ms":>10}{"p95 ms":>10}')
+        for name, value, count, seconds, p50, p95 in groups[:top]:
+            print(f'{name:<12}{"-" if value is None else value:>8}{count:>8}{seconds:>10.2f}{p50 * 1000:>10.1f}'
+                  f'{p95 * 1000:>10.1f}')
+
+    print('\n冗余舵机指令(角度与上次发送的相同)')
+    print(f'{"舵机":<12}{"发送":>8}{"冗余":>8}{"占比":>8}{"冗余耗时s":>12}{"已跳过":>8}')
+    redundant = {}
+    for mode, (sent, count, seconds) in sorted(total['servo_sends'].items(), key=lambda item: -item[1][1]):
+        name = MoveMode(mode).name
+        redundant[name] = {'sent': sent, 'redundant': count, 'seconds': seconds, 'skipped': total['skipped'].get(name, 0)}
+        print(f'{name:<12}{sent:>8}{count:>8}{count / sent:>8.1%}{seconds:>12.2f}{total["skipped"].get(name, 0):>8}')
+    if total['retransmits']:
+        print('重发: ' + '，'.join(f'{name} {count}次' for name, count in total['retransmits'].items()))
+
+    print('\n阶段耗时(按首次出现的顺序)')
+    print(f'{"阶段":<30}{"次数":>6}{"平均s":>8}{"p50 s":>8}{"最大s":>8}{"总计s":>10}')
+    stages = {}
+    for name, durations in total['stages'].items():
+        durations = np.asarray(durations)
+        stages[name] = {'count': int(durations.size), 'mean': float(durations.mean()),
+                        'p50': float(np.percentile(durations, 50)), 'max': float(durations.max()),
+                        'total': float(durations.sum())}
+        row = stages[name]
+        print(f'{name:<30}{row["count"]:>6}{row["mean"]:>8.2f}{row["p50"]:>8.2f}{row["max"]:>8.2f}{row["total"]:>10.2f}')
+
+    return {
+        'lines': total['lines'],
+        'runs': total['runs'],
+        'unmatched': total['unmatched'],
+        'latency': summary,
+        'latency_by_value': [dict(zip(('mode', 'value', 'count', 'total', 'p50', 'p95'), group)) for group in groups],
+        'redundant': redundant,
+        'retransmits': total['retransmits'],
+        'stages': stages,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='interface_log.log离线统计')
+    parser.add_argument('paths', nargs='+', help='日志文件或目录，目录中文件名含.log的文件都会被统计')
+    parser.add_argument('--by-value', action='store_true', help='按模式与参数分组打印指令耗时')
+    parser.add_argument('--top', type=int, default=20, help='按参数分组时打印的组数')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='同时统计的文件数')
+    parser.add_argument('--json', default=None, help='同时把统计结果保存为JSON')
+    args = parser.parse_args()
+
+    files = find_logs(args.paths)
+    if not files:
+        parser.error('没有找到日志文件')
+    start = time.perf_counter()
+    if len(files) == 1 or args.jobs <= 1:
+        results = [scan(path) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(files))) as executor:
+            results = list(executor.map(scan, files))
+    total = merge(results)
+    elapsed = time.perf_counter() - start
+    print(f'统计了{len(files)}个文件，{total["lines"]}行，{total["runs"]}次运行，耗时{elapsed:.2f}s'
+          f'({total["lines"] / max(elapsed, 1e-9) / 1e6:.2f}M行/s)')
+
+    result = report(total, by_value=args.by_value, top=args.top)
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)